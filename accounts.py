@@ -0,0 +1,191 @@
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token, get_jwt, verify_jwt_in_request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, User, Admin, Stat
+from cache import TTLCache
+from stats import increment_stat
+
+ROLES = {'user': User, 'admin': Admin}
+# Stat row bumped by every change to an account's status or token version
+ACCOUNTS_VERSION = 'version:accounts'
+
+# ((active, token_version), accounts version) per principal. An entry is
+# only used while the accounts version it was read under is current, so a
+# change made through any worker takes effect in all of them within
+# ACCOUNT_STATUS_RECHECK_MS. Sized by create_app from
+# ACCOUNT_STATUS_CACHE_SIZE and _TTL.
+status_cache = TTLCache()
+
+
+class PolledVersion:
+    """This process's copy of a version row, re-read at most every interval seconds.
+
+    Keeps the version check off the hot path: in the common case it costs
+    no query at all, and a bump committed by another worker is picked up
+    within interval. expire() makes the next call read it again, for
+    changes this process commits itself.
+    """
+
+    def __init__(self, read, interval=1.0):
+        self.read = read
+        self.interval = interval
+        self.reads = 0
+        self._value = None
+        self._next_read = 0.0
+        self._expirations = 0
+        self._lock = threading.Lock()
+
+    def current(self):
+        if time.monotonic() >= self._next_read:
+            with self._lock:
+                if time.monotonic() >= self._next_read:
+                    expirations = self._expirations
+                    started = time.monotonic()
+                    self._value = self.read()
+                    self.reads += 1
+                    # An expire() during the read may have come after a
+                    # commit the read did not see; leave it in force
+                    if self._expirations == expirations:
+                        self._next_read = started + self.interval
+        return self._value
+
+    def expire(self):
+        self._expirations += 1
+        self._next_read = 0.0
+
+
+def create_token(role, principal):
+    """Issue an access token for a User or Admin.
+
+    The identity has the same {'id', 'email'} shape for both. The role and
+    the principal's current token version travel as signed claims, so
+    authorization needs no lookup and bumping the version revokes every
+    token issued before.
+    """
+    return create_access_token(
+        identity={'id': principal.id, 'email': principal.email},
+        additional_claims={'role': role, 'ver': principal.token_version or 0}
+    )
+
+
+def read_accounts_version():
+    return db.session.execute(
+        db.select(Stat.value).where(Stat.name == ACCOUNTS_VERSION), bind_arguments={'bind': db.engine}
+    ).scalar() or 0
+
+
+# Re-read every ACCOUNT_STATUS_RECHECK_MS (set by create_app)
+accounts_version = PolledVersion(read_accounts_version)
+
+
+@event.listens_for(Session, 'after_commit')
+def expire_accounts_version(session):
+    # This worker's own changes take effect on its next request
+    if session.info.pop('accounts_changed', False):
+        accounts_version.expire()
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_account_change(session):
+    session.info.pop('accounts_changed', None)
+
+
+def account_status(role, principal_id):
+    """Return (active, token_version) for a principal, cached.
+
+    Usually costs no query: the accounts version is this process's polled
+    copy, and the principal is read only when that moved or its entry
+    expired. Both reads go to the primary: a lagging replica would hand
+    back a revoked or deactivated principal's old status and cache it.
+    """
+    key = (role, principal_id)
+    # Take the version first: a change that commits after it was read moves
+    # the version past the one stored with the entry, which is then dropped
+    version = accounts_version.current()
+    cached = status_cache.get(key)
+    if cached is not None and cached[1] == version:
+        return cached[0]
+    principal = db.session.get(ROLES[role], principal_id, bind_arguments={'bind': db.engine})
+    if principal is None:
+        status = (False, None)
+    else:
+        active = principal.isActive if role == 'user' else True
+        status = (bool(active), principal.token_version or 0)
+    status_cache.set(key, (status, version))
+    return status
+
+
+def token_problem(jwt_data):
+    """Why a decoded token may no longer be used, or None if it is fine."""
+    role = jwt_data.get('role')
+    identity = jwt_data.get('sub')
+    if role not in ROLES or not isinstance(identity, dict) or 'id' not in identity:
+        # Issued before role claims existed; the client has to log in again
+        return 'revoked'
+    active, version = account_status(role, identity['id'])
+    if version is None or jwt_data.get('ver') != version:
+        return 'revoked'
+    if not active:
+        return 'deactivated'
+    return None
+
+
+def revoke_tokens(role, principal_id):
+    """Invalidate every token issued so far to a principal.
+
+    Returns False if the principal does not exist. Runs in the caller's
+    transaction, together with account_changed().
+    """
+    model = ROLES[role]
+    result = db.session.execute(
+        db.update(model).where(model.id == principal_id)
+        .values(token_version=db.func.coalesce(model.token_version, 0) + 1),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount != 1:
+        return False
+    account_changed()
+    return True
+
+
+def account_changed():
+    """Drop cached account statuses when the caller commits.
+
+    Call it in the transaction that changes an account's isActive or
+    token_version. This worker sees the change on its next request, the
+    others within ACCOUNT_STATUS_RECHECK_MS.
+    """
+    increment_stat(ACCOUNTS_VERSION)
+    db.session.info['accounts_changed'] = True
+
+
+def admin_required(fn):
+    """Like @jwt_required(), but only admin tokens get through.
+
+    The role is read from the signed claims; the account check in
+    app.check_account_status is mostly served from status_cache.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        if get_jwt().get('role') != 'admin':
+            return jsonify({"msg": "Admin access required"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def user_required(fn):
+    """Like @jwt_required(), but only user tokens get through."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        if get_jwt().get('role') != 'user':
+            return jsonify({"msg": "User access required"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
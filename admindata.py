@@ -2,6 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash,check_password_hash
 from flask_cors import CORS
+from config import Config
 
 # Initialize Flask app and database
 app = Flask(__name__)
@@ -27,7 +28,7 @@ with app.app_context():
 
 def add_admin(email, password):
     """Add an admin user to the database."""
-    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+    hashed_password = generate_password_hash(password, method=Config.PASSWORD_HASH_METHOD)
     new_admin = Admin(email=email, password=hashed_password)
     
     try:
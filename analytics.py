@@ -0,0 +1,165 @@
+"""Donation time series served from rollup tables.
+
+Every donation adds its amount to one DonationRollup row and one
+DonorRollup row per granularity (day, week starting Monday, month), in the
+same transaction that inserts it. A time series therefore reads one row
+per bucket, however many donations the range holds. Dates are UTC.
+"""
+import itertools
+from datetime import date, datetime, timedelta
+
+from database import insert_ignore
+from models import db, Donation, DonationRollup, DonorRollup
+
+GRANULARITIES = ('day', 'week', 'month')
+# Buckets returned when ?from= is omitted, ending at ?to= (default today)
+DEFAULT_BUCKETS = {'day': 30, 'week': 12, 'month': 12}
+MAX_BUCKETS = 1000
+REBUILD_BATCH = 1000
+
+
+def bucket_start(day, granularity):
+    """First day of the day, week or month containing day."""
+    if isinstance(day, datetime):
+        day = day.date()
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def shift(bucket, granularity, count):
+    """The bucket count periods after (or before, if negative) bucket."""
+    if granularity == 'month':
+        month = bucket.year * 12 + bucket.month - 1 + count
+        return date(month // 12, month % 12 + 1, 1)
+    return bucket + timedelta(days=count * (7 if granularity == 'week' else 1))
+
+
+def bucket_count(start, end, granularity):
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return (end - start).days // (7 if granularity == 'week' else 1) + 1
+
+
+def add_to_row(model, key, increments):
+    """Add increments to the row with primary key `key`, creating it if missing.
+
+    Runs in the caller's transaction and returns True if the row was
+    created. The UPDATE goes first because the row usually exists already.
+    """
+    update = db.update(model) \
+        .where(*[getattr(model, name) == value for name, value in key.items()]) \
+        .values({name: getattr(model, name) + delta for name, delta in increments.items()})
+    if db.session.execute(update, execution_options={'synchronize_session': False}).rowcount:
+        return False
+
+    created = insert_ignore(db.session, model, dict(key, **increments))
+    if not created:
+        # Another transaction created the row between our UPDATE and INSERT
+        db.session.execute(update, execution_options={'synchronize_session': False})
+    return created
+
+
+def record_rollups(user_id, amount, created_at):
+    """Count one new donation in every rollup; called by record_donation."""
+    for granularity in GRANULARITIES:
+        bucket = bucket_start(created_at, granularity)
+        first_this_period = add_to_row(
+            DonorRollup,
+            {'granularity': granularity, 'bucket': bucket, 'user_id': user_id},
+            {'amount': amount, 'donations': 1}
+        )
+        add_to_row(
+            DonationRollup,
+            {'granularity': granularity, 'bucket': bucket},
+            {'amount': amount, 'donations': 1, 'donors': int(first_this_period)}
+        )
+
+
+def timeseries(granularity, start=None, end=None, user_id=None):
+    """Return [{'start', 'amount', 'donations', 'donors'}] per bucket, zero-filled.
+
+    start and end are dates, inclusive, and are widened to whole buckets.
+    With user_id the series covers that donor only, and 'donors' is 1 in
+    the periods they gave.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    end = bucket_start(end or datetime.utcnow().date(), granularity)
+    start = bucket_start(start, granularity) if start else shift(end, granularity, 1 - DEFAULT_BUCKETS[granularity])
+    if start > end:
+        raise ValueError("from must not be after to")
+    if bucket_count(start, end, granularity) > MAX_BUCKETS:
+        raise ValueError(f"At most {MAX_BUCKETS} buckets per request")
+
+    if user_id is None:
+        query = db.session.query(
+            DonationRollup.bucket, DonationRollup.amount, DonationRollup.donations, DonationRollup.donors
+        ).filter(DonationRollup.granularity == granularity,
+                 DonationRollup.bucket.between(start, end))
+    else:
+        query = db.session.query(
+            DonorRollup.bucket, DonorRollup.amount, DonorRollup.donations, db.literal(1)
+        ).filter(DonorRollup.granularity == granularity,
+                 DonorRollup.user_id == user_id,
+                 DonorRollup.bucket.between(start, end))
+    rows = {bucket: (amount, donations, donors) for bucket, amount, donations, donors in query}
+
+    series = []
+    bucket = start
+    while bucket <= end:
+        amount, donations, donors = rows.get(bucket, (0, 0, 0))
+        series.append({'start': bucket.isoformat(), 'amount': amount, 'donations': donations, 'donors': donors})
+        bucket = shift(bucket, granularity, 1)
+    return series
+
+
+def rebuild_rollups():
+    """Recompute every rollup row from the donation table.
+
+    Replaces the rollups in the caller's transaction and returns
+    (donations counted, donations skipped for having no created_at).
+    """
+    db.session.execute(db.delete(DonorRollup))
+    db.session.execute(db.delete(DonationRollup))
+
+    totals = {}  # (granularity, bucket) -> [amount, donations, donors]
+    per_donor = {}  # (granularity, bucket, user_id) -> [amount, donations]
+    counted = 0
+    stmt = db.select(Donation.user_id, Donation.amount, Donation.created_at) \
+        .where(Donation.created_at.isnot(None)) \
+        .execution_options(yield_per=REBUILD_BATCH)
+    for user_id, amount, created_at in db.session.execute(stmt):
+        counted += 1
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(created_at, granularity)
+            total = totals.setdefault((granularity, bucket), [0, 0, 0])
+            donor = per_donor.setdefault((granularity, bucket, user_id), [0, 0])
+            if donor[1] == 0:
+                total[2] += 1
+            donor[0] += amount
+            donor[1] += 1
+            total[0] += amount
+            total[1] += 1
+
+    def insert(model, rows):
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, REBUILD_BATCH))
+            if not batch:
+                break
+            db.session.execute(db.insert(model), batch)
+
+    insert(DonationRollup, (
+        {'granularity': granularity, 'bucket': bucket, 'amount': amount, 'donations': donations, 'donors': donors}
+        for (granularity, bucket), (amount, donations, donors) in totals.items()
+    ))
+    insert(DonorRollup, (
+        {'granularity': granularity, 'bucket': bucket, 'user_id': user_id, 'amount': amount, 'donations': donations}
+        for (granularity, bucket, user_id), (amount, donations) in per_donor.items()
+    ))
+
+    skipped = db.session.query(db.func.count(Donation.id)).filter(Donation.created_at.is_(None)).scalar()
+    return counted, skipped
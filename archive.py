@@ -0,0 +1,85 @@
+"""Moves long-completed events, with their volunteers, into archive tables.
+
+Events completed more than ARCHIVE_AFTER_DAYS ago go to archived_event and
+their sign-ups to archived_volunteer, with the same ids and columns, so the
+event and volunteer tables only hold rows that can still change. The admin
+history endpoints read both tables (see pagination.paginate_merged).
+
+The job runs online in batches of a few events, each its own short
+transaction: copy the events, copy their volunteers, delete both. A batch
+opens with the write that copies the events. On Postgres that statement
+locks the event rows (SELECT ... FOR UPDATE), so a sign-up racing the
+archival either commits first, and its row is archived with the event, or
+waits and then finds the event gone. On SQLite it takes the write lock
+straight away rather than upgrading from a read lock. Between batches the
+job pauses so waiting writers get the lock.
+"""
+import time
+from datetime import datetime, timedelta
+
+from models import db, ArchivedEvent, ArchivedVolunteer, Event, Volunteer
+
+EVENT_COLUMNS = ('id', 'name', 'date', 'location', 'description', 'picture_url', 'capacity', 'seats_taken',
+                 'completed_at')
+VOLUNTEER_COLUMNS = ('id', 'user_id', 'event_id', 'status')
+BATCH_PAUSE = 0.05
+
+
+def due_events(cutoff, limit):
+    """Ids of up to limit events completed before cutoff, oldest first."""
+    # completed_at is only set on completion; archive_batch checks both, and
+    # filtering on it alone here keeps this a range scan of its index
+    rows = db.session.query(Event.id).filter(Event.completed_at < cutoff) \
+        .order_by(Event.completed_at, Event.id).limit(limit).all()
+    return [row.id for row in rows]
+
+
+def archive_batch(event_ids, cutoff):
+    """Move those of event_ids still due, and their volunteers, in the caller's transaction.
+
+    Returns the number of events moved.
+    """
+    due = db.select(*[getattr(Event, column) for column in EVENT_COLUMNS], db.literal(datetime.utcnow())) \
+        .where(Event.id.in_(event_ids), Event.completed_at < cutoff, Event.completed.is_(True)) \
+        .with_for_update()
+    moved = db.session.execute(db.insert(ArchivedEvent).from_select(EVENT_COLUMNS + ('archived_at',), due)).rowcount
+    if not moved:
+        return 0
+
+    # Archived ids never return to the event table, so these are the ones
+    # just copied (or copied by a concurrent run, which leaves nothing to delete)
+    archived = db.select(ArchivedEvent.id).where(ArchivedEvent.id.in_(event_ids)).scalar_subquery()
+    volunteers = db.select(*[getattr(Volunteer, column) for column in VOLUNTEER_COLUMNS]) \
+        .where(Volunteer.event_id.in_(archived))
+    db.session.execute(db.insert(ArchivedVolunteer).from_select(VOLUNTEER_COLUMNS, volunteers))
+    db.session.execute(db.delete(Volunteer).where(Volunteer.event_id.in_(archived)),
+                       execution_options={'synchronize_session': False})
+    db.session.execute(db.delete(Event).where(Event.id.in_(archived)),
+                       execution_options={'synchronize_session': False})
+    return moved
+
+
+def archive_events(older_than_days, batch_size, pause=BATCH_PAUSE):
+    """Archive every event completed more than older_than_days ago.
+
+    Commits after each batch and returns the number of events archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        event_ids = due_events(cutoff, batch_size)
+        # End the read so the batch below starts a fresh transaction
+        db.session.commit()
+        if not event_ids:
+            return total
+        try:
+            moved = archive_batch(event_ids, cutoff)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if not moved:
+            # Nothing left that is still due (e.g. a concurrent run took it)
+            return total
+        total += moved
+        time.sleep(pause)
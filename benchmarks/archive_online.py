@@ -0,0 +1,118 @@
+"""Event archival running alongside live writes.
+
+Seeds a scratch SQLite database, or --database-uri, with --events completed
+events (each with a few volunteers) plus some open ones, then runs
+archive.archive_events() while a writer thread keeps signing volunteers up
+for the open events and cancelling them again. Reports how fast the job
+archives and how long the writer's transactions took meanwhile: with small
+batches the writer's worst case stays near one batch, not the whole job.
+Exits 1 if anything was left behind or lost on the way to the archive.
+
+Usage:
+    python benchmarks/archive_online.py [--events 20000] [--batch-size 100]
+        [--database-uri postgresql://...]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOLUNTEERS_PER_EVENT = 3
+OPEN_EVENTS = 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--database-uri', help='defaults to a scratch SQLite database')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodbridge-archive-')
+    os.environ.update(DATABASE_URI=args.database_uri or f"sqlite:///{os.path.join(workdir, 'archive.db')}",
+                      OUTBOX_WORKER='false', STRIPE_EVENT_WORKER='false')
+    sys.path.insert(0, ROOT)
+    from datetime import date, datetime, timedelta
+    from wsgi import app
+    from models import db, ArchivedEvent, ArchivedVolunteer, Event, User, Volunteer
+    from archive import archive_events
+    from volunteers import cancel, sign_up
+
+    completed_at = datetime.utcnow() - timedelta(days=365)
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f'archive{i}', email=f'archive{i}@example.com', password='x')
+                 for i in range(VOLUNTEERS_PER_EVENT)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+
+        started = time.perf_counter()
+        for offset in range(0, args.events, 5000):
+            count = min(5000, args.events - offset)
+            db.session.execute(db.insert(Event), [
+                {'name': f'event {offset + i}', 'date': date(2024, 1, 1), 'location': 'Nairobi',
+                 'completed': True, 'completed_at': completed_at, 'seats_taken': VOLUNTEERS_PER_EVENT}
+                for i in range(count)
+            ])
+            db.session.commit()
+        db.session.execute(db.insert(Volunteer), [
+            {'event_id': event_id, 'user_id': user_id, 'status': 'confirmed'}
+            for event_id in range(1, args.events + 1) for user_id in user_ids
+        ])
+        open_events = [Event(name=f'open {i}', date=date.today(), location='Nairobi') for i in range(OPEN_EVENTS)]
+        db.session.add_all(open_events)
+        db.session.commit()
+        open_ids = [event.id for event in open_events]
+        print(f"Seeded {args.events} completed events in {time.perf_counter() - started:.1f}s")
+
+    latencies = []
+    done = threading.Event()
+
+    def writer():
+        with app.app_context():
+            i = 0
+            while not done.is_set():
+                event_id = open_ids[i % len(open_ids)]
+                user_id = user_ids[(i // len(open_ids)) % len(user_ids)]
+                started = time.perf_counter()
+                sign_up(event_id, user_id)
+                db.session.commit()
+                cancel(event_id, user_id)
+                db.session.commit()
+                latencies.append(time.perf_counter() - started)
+                i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    with app.app_context():
+        started = time.perf_counter()
+        archived = archive_events(30, args.batch_size)
+        elapsed = time.perf_counter() - started
+    done.set()
+    thread.join()
+
+    with app.app_context():
+        left = Event.query.filter(Event.completed.is_(True)).count()
+        counts = (ArchivedEvent.query.count(), ArchivedVolunteer.query.count(),
+                  Volunteer.query.count(), Event.query.count())
+
+    latencies.sort()
+    print(f"Archived {archived} events in {elapsed:.1f}s ({archived / elapsed:.0f}/s), "
+          f"batches of {args.batch_size}")
+    print(f"writer: {len(latencies)} sign-up/cancel pairs, p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+
+    expected = (args.events, args.events * VOLUNTEERS_PER_EVENT, 0, OPEN_EVENTS)
+    if archived != args.events or left or counts != expected:
+        print(f"FAILED: archived {archived}, {left} completed events left, "
+              f"(archived events, archived volunteers, volunteers, events) {counts} != {expected}")
+        sys.exit(1)
+    print("OK: every completed event and volunteer moved, open events untouched")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""/api/admin/dashboard against the five calls the admin SPA used to make.
+
+Starts gunicorn on a scratch SQLite database, or on --database-uri, seeded
+with users, events, feedback with replies and members, and times loading
+the dashboard both ways, each list limited to --limit rows:
+
+- sequential: /api/admin/stats, /api/admin/users, /api/admin/events,
+  /api/admin/feedback and /api/members, one after another, as the SPA did
+- dashboard: one /api/admin/dashboard request, its sections run in parallel
+
+first from a single client, then from --clients clients at once.
+
+Usage:
+    python benchmarks/dashboard.py [--requests 200] [--clients 8] [--limit 5]
+        [--workers 2] [--database-uri postgresql://...]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEQUENTIAL = ['/api/admin/stats', '/api/admin/users?limit={limit}', '/api/admin/events?limit={limit}',
+              '/api/admin/feedback?limit={limit}', '/api/members?limit={limit}']
+DASHBOARD = ['/api/admin/dashboard?limit={limit}']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(env, workers):
+    import requests
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--preload', '-w', str(workers), '--threads', '8',
+         '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+        env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def seed(db, models, rows):
+    User, Event, Feedback, Reply, Member = models
+    from datetime import date, timedelta
+
+    db.session.execute(db.insert(User), [
+        {'username': f'dash{i}', 'email': f'dash{i}@example.com', 'password': 'x'} for i in range(rows)])
+    db.session.execute(db.insert(Event), [
+        {'name': f'event {i}', 'date': date(2024, 1, 1) + timedelta(days=i % 900), 'location': 'Nairobi',
+         'completed': i % 3 == 0} for i in range(rows // 10)])
+    db.session.execute(db.insert(Feedback), [
+        {'user_id': 1 + i % rows, 'message': f'feedback {i}'} for i in range(rows * 2)])
+    db.session.execute(db.insert(Reply), [
+        {'user_id': 1 + i % rows, 'feedback_id': 1 + (i * 7) % (rows * 2), 'message': f'reply {i}'}
+        for i in range(rows // 2)])
+    db.session.execute(db.insert(Member), [{'name': f'member {i}', 'position': 'volunteer'} for i in range(50)])
+    db.session.commit()
+
+
+def load(session, base_url, paths, headers):
+    started = time.perf_counter()
+    for path in paths:
+        response = session.get(base_url + path, headers=headers)
+        response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def measure(base_url, paths, headers, total, clients):
+    import requests
+
+    latencies = []
+    lock = threading.Lock()
+    remaining = [total]
+
+    def client():
+        session = requests.Session()
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            elapsed = load(session, base_url, paths, headers)
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p95': latencies[int(len(latencies) * 0.95)] * 1000,
+        'rate': total / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='dashboard loads per measurement')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=20000, help='users to seed; other tables scale with it')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--database-uri', help='defaults to a scratch SQLite database')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodbridge-dashboard-')
+    env = dict(os.environ,
+               DATABASE_URI=args.database_uri or f"sqlite:///{os.path.join(workdir, 'dashboard.db')}",
+               OUTBOX_WORKER='false', STRIPE_EVENT_WORKER='false', SCHEDULER_WORKER='false')
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    from wsgi import app
+    from models import db, Admin, User, Event, Feedback, Reply, Member
+    from accounts import create_token
+    from stats import reconcile_stats
+
+    with app.app_context():
+        db.create_all()
+        seed(db, (User, Event, Feedback, Reply, Member), args.rows)
+        reconcile_stats()
+        admin = Admin(email='dashboard-bench@example.com', password='x')
+        db.session.add(admin)
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_token('admin', admin)}"}
+
+    process, base_url = start_gunicorn(env, args.workers)
+    try:
+        sequential = [path.format(limit=args.limit) for path in SEQUENTIAL]
+        dashboard = [path.format(limit=args.limit) for path in DASHBOARD]
+        import requests
+        for paths in (sequential, dashboard):
+            load(requests.Session(), base_url, paths, headers)  # warm up caches and pools
+
+        print(f"{'':<24}{'p50 ms':>10}{'p95 ms':>10}{'loads/s':>10}")
+        for clients in (1, args.clients):
+            for label, paths in (('5 sequential calls', sequential), ('/api/admin/dashboard', dashboard)):
+                result = measure(base_url, paths, headers, args.requests, clients)
+                print(f"{label + f' x{clients}':<24}{result['p50']:>10.1f}{result['p95']:>10.1f}{result['rate']:>10.0f}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Mixed read/write throughput on SQLite, with and without the connect pragmas.
+
+Reader threads page through /api/events-style queries while writer threads
+insert feedback and bump a stat counter, each against a scratch database.
+The two configurations (database.configure_engine's WAL/NORMAL/busy-timeout
+pragmas on, and SQLite's rollback-journal defaults) run in separate
+processes, since the engine is set up when app.py is imported. Both wait
+up to 5s on a locked database: the pragma's busy timeout, or the sqlite3
+module's own connect timeout.
+
+Usage:
+    python benchmarks/db_concurrency.py [--seconds 10] [--readers 8] [--writers 4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def run_once(seconds, readers, writers, events):
+    """Benchmark body, run inside a child process configured via env vars."""
+    sys.path.insert(0, ROOT)
+    from datetime import date, timedelta
+    from sqlalchemy.exc import OperationalError
+    from wsgi import app
+    from models import db, Event, Feedback, User
+    from stats import increment_stat
+    from database import pool_status
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password='x')
+        db.session.add(user)
+        start = date(2024, 1, 1)
+        db.session.add_all(
+            Event(name=f'Event {i}', date=start + timedelta(days=i % 365), location='Nairobi')
+            for i in range(events)
+        )
+        db.session.commit()
+        user_id = user.id
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies = {'read': [], 'write': []}
+    locked = {'read': 0, 'write': 0}
+
+    def read_once():
+        Event.query.filter(Event.completed.is_(False)).order_by(Event.date, Event.id).limit(50).all()
+
+    def write_once():
+        db.session.add(Feedback(user_id=user_id, message='benchmark'))
+        increment_stat('feedback')
+        db.session.commit()
+
+    def loop(kind, operation):
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    operation()
+                except OperationalError:
+                    db.session.rollback()
+                    with lock:
+                        locked[kind] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies[kind].append(elapsed)
+                db.session.remove()
+
+    threads = [threading.Thread(target=loop, args=('read', read_once)) for _ in range(readers)]
+    threads += [threading.Thread(target=loop, args=('write', write_once)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        wait = pool_status(db.engine)['wait']
+    return {
+        'journal_mode': journal_mode,
+        'reads_per_sec': round(len(latencies['read']) / seconds, 1),
+        'writes_per_sec': round(len(latencies['write']) / seconds, 1),
+        'read_p99_ms': round(percentile(latencies['read'], 99) * 1000, 1),
+        'write_p99_ms': round(percentile(latencies['write'], 99) * 1000, 1),
+        'lock_errors': locked['read'] + locked['write'],
+        'pool_max_wait_ms': wait['maxWaitMs'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_once(args.seconds, args.readers, args.writers, args.events)))
+        return
+
+    for pragmas in ('false', 'true'):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       DB_SQLITE_PRAGMAS=pragmas,
+                       DB_POOL_SIZE=str(args.readers + args.writers),
+                       OUTBOX_WORKER='false',
+                       STRIPE_EVENT_WORKER='false')
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', '--seconds', str(args.seconds),
+                 '--readers', str(args.readers), '--writers', str(args.writers),
+                 '--events', str(args.events)],
+                env=env, cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"DB_SQLITE_PRAGMAS={pragmas}: {json.dumps(result)}")
+
+
+if __name__ == '__main__':
+    main()
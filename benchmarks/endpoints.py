@@ -0,0 +1,482 @@
+"""Latency, throughput and SQL counts for every route, with baseline compare.
+
+Seeds a scratch SQLite database with a configurable dataset, then drives
+each route in turn with concurrent requests, either in-process through the
+WSGI app (--target wsgi) or over HTTP against a local gunicorn started on
+the same database (--target gunicorn). Per endpoint it records p50/p95/p99
+latency, requests per second, unexpected statuses and the number of SQL
+statements one warm request issues (always measured in-process).
+
+Results are printed as a table and, with --output, written as JSON. With
+--baseline, each endpoint is compared against a stored results file and
+the run exits with status 1 if any endpoint regressed: more SQL
+statements, new errors, or a p95 more than --tolerance slower (ignoring
+differences under --min-delta-ms). --save-baseline writes this run as the
+new baseline instead. Latencies only compare meaningfully on the machine
+that recorded the baseline; SQL counts compare anywhere.
+
+POST /api/create-payment-intent talks to a local stub of Stripe's API
+(STRIPE_API_BASE), so it measures the handler without network latency and
+never reaches api.stripe.com.
+
+Usage:
+    python benchmarks/endpoints.py [--target wsgi|gunicorn] [--requests 200]
+        [--concurrency 8] [--users 1000] [--donations 5000] [--events 500]
+        [--feedback 2000] [--replies 2000] [--members 50] [--only users,stats]
+        [--output results.json] [--baseline benchmarks/baseline.json [--save-baseline]]
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEBHOOK_SECRET = 'whsec_benchmark'
+INVENTORY_ITEMS = 100
+SEED_BATCH = 1000
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+class StripeStub(BaseHTTPRequestHandler):
+    """Answers POST /v1/payment_intents the way Stripe's API would."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'id': 'pi_stub', 'object': 'payment_intent',
+                           'client_secret': 'pi_stub_secret_stub'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stripe_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StripeStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed(db, counts):
+    """Bulk insert the benchmark dataset; returns ids the endpoints need."""
+    from models import User, Admin, Donation, Event, Feedback, Reply, Member, Inventory
+    from passwords import hash_password
+    from stats import reconcile_stats
+    from analytics import rebuild_rollups
+
+    # One real hash shared by every user keeps seeding fast, and keeps
+    # logins from rehashing (and writing) on every request
+    password = hash_password('benchmark')
+
+    def insert(model, rows):
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, SEED_BATCH))
+            if not batch:
+                break
+            db.session.execute(db.insert(model), batch)
+
+    users = counts['users'] + 2  # plus the revoke-tokens target and a spare
+    insert(User, ({'username': f'bench{i}', 'email': f'bench{i}@example.com',
+                   'password': password, 'isActive': True} for i in range(users)))
+    insert(Admin, ({'email': f'bench-admin{i}@example.com', 'password': password} for i in range(2)))
+    now = datetime.utcnow()
+    insert(Donation, ({'user_id': i % users + 1, 'amount': i % 500 + 1, 'message': 'benchmark',
+                       'payment_intent_id': f'pi_bench_{i}', 'created_at': now - timedelta(hours=i % 2000)}
+                      for i in range(counts['donations'])))
+    start = date.today() - timedelta(days=counts['events'] // 2)
+    insert(Event, ({'name': f'Event {i}', 'date': start + timedelta(days=i), 'location': 'Nairobi',
+                    'description': 'benchmark', 'completed': i % 3 == 0} for i in range(counts['events'])))
+    insert(Feedback, ({'user_id': i % users + 1, 'message': 'benchmark'} for i in range(counts['feedback'])))
+    insert(Reply, ({'user_id': i % users + 1, 'feedback_id': i % max(counts['feedback'], 1) + 1,
+                    'message': 'benchmark'} for i in range(counts['replies'] if counts['feedback'] else 0)))
+    insert(Inventory, ({'item_name': f'Item {i}', 'quantity': 1000000} for i in range(INVENTORY_ITEMS)))
+    # Extra members give every DELETE request its own row
+    deletable = counts['requests'] + counts['warmup'] + 2
+    insert(Member, ({'name': f'Member {i}', 'position': 'volunteer'}
+                    for i in range(counts['members'] + deletable)))
+    rebuild_rollups()
+    db.session.commit()
+    reconcile_stats()
+
+    member_ids = [member_id for (member_id,) in
+                  db.session.query(Member.id).order_by(Member.id.desc()).limit(deletable)]
+    return {
+        'user': db.session.get(User, 1),
+        'victim_user_id': users,
+        'admin': db.session.get(Admin, 1),
+        'victim_admin_id': 2,
+        'users': users,
+        'events': max(counts['events'], 1),
+        'feedback_id': 1 if counts['feedback'] else None,
+        'member_ids': member_ids,
+    }
+
+
+class Counter:
+    """Thread-safe source of unique suffixes and ids for write requests."""
+
+    def __init__(self, values=None):
+        self._lock = threading.Lock()
+        self._values = iter(values) if values is not None else itertools.count()
+
+    def next(self):
+        with self._lock:
+            return next(self._values)
+
+
+def endpoints(ids):
+    """Return [(name, method, path, auth, request kwargs factory, ok statuses)].
+
+    auth is None, 'user' or 'admin'. The factory is called once per request
+    with a unique integer, so write routes never collide with themselves.
+    """
+    from fake_stripe import payment_intent_succeeded, signed_request
+
+    unique = Counter()
+    members = Counter(ids['member_ids'])
+    feedback_id = ids['feedback_id']
+
+    def webhook(n):
+        body, headers = signed_request(payment_intent_succeeded('bench1@example.com', 5), WEBHOOK_SECRET)
+        return {'data': body, 'headers': headers}
+
+    def member_import(n):
+        rows = [{'name': f'Imported {n}-{i}', 'position': 'volunteer'} for i in range(2)]
+        return {'data': ''.join(json.dumps(row) + '\n' for row in rows),
+                'headers': {'Content-Type': 'application/x-ndjson'}}
+
+    def register(n):
+        name = f'new{unique.next()}'
+        return {'json': {'username': name, 'email': f'{name}@example.com', 'password': 'benchmark'}}
+
+    def reply(n):
+        return {'json': {'userId': 1, 'userEmail': 'bench0@example.com', 'feedbackId': feedback_id,
+                         'reply': 'benchmark'}}
+
+    none = lambda n: {}
+    return [
+        ('index', 'GET', '/', None, none, (200,)),
+        ('register', 'POST', '/api/auth/register', None, register, (201,)),
+        ('login', 'POST', '/api/auth/login', None,
+         lambda n: {'json': {'email': f'bench{n % ids["users"]}@example.com', 'password': 'benchmark'}}, (200,)),
+        ('admin_login', 'POST', '/api/admin/login', None,
+         lambda n: {'json': {'email': 'bench-admin0@example.com', 'password': 'benchmark'}}, (200,)),
+        ('check_email', 'POST', '/api/check-email', None,
+         lambda n: {'json': {'email': f'bench{n % ids["users"]}@example.com'}}, (200,)),
+        ('create_payment_intent', 'POST', '/api/create-payment-intent', None,
+         lambda n: {'json': {'amount': 5, 'email': 'bench0@example.com'}}, (200,)),
+        ('save_donation', 'POST', '/api/save-donation', None,
+         lambda n: {'json': {'amount': 5, 'paymentIntentId': f'pi_save_{unique.next()}',
+                             'email': 'bench0@example.com'}}, (200,)),
+        ('stripe_webhook', 'POST', '/api/stripe/webhook', None, webhook, (200,)),
+        ('my_donations', 'GET', '/api/donations', 'user', none, (200,)),
+        ('events', 'GET', '/api/events', None, none, (200,)),
+        ('events_upcoming', 'GET', '/api/events?upcoming=true', None, none, (200,)),
+        ('event_seats', 'GET', lambda n: f'/api/events/{n % ids["events"] + 1}/seats', None, none, (200,)),
+        ('events_incomplete', 'GET', '/api/events/incomplete', None, none, (200, 304)),
+        ('members', 'GET', '/api/members', None, none, (200, 304)),
+        ('submit_feedback', 'POST', '/api/feedback', None,
+         lambda n: {'json': {'email': 'bench0@example.com', 'message': 'benchmark'}}, (200,)),
+        ('admin_stats', 'GET', '/api/admin/stats', 'admin', none, (200,)),
+        ('admin_dashboard', 'GET', '/api/admin/dashboard', 'admin', none, (200,)),
+        ('admin_donation_timeseries', 'GET', '/api/admin/donations/timeseries?granularity=day', 'admin', none, (200,)),
+        ('admin_cache', 'GET', '/api/admin/cache', 'admin', none, (200,)),
+        ('admin_db_pool', 'GET', '/api/admin/db/pool', 'admin', none, (200,)),
+        ('admin_outbox', 'GET', '/api/admin/outbox', 'admin', none, (200,)),
+        ('admin_import_members', 'POST', '/api/admin/import/members', 'admin', member_import, (200,)),
+        ('admin_export_donations', 'GET', '/api/admin/export/donations?format=csv', 'admin', none, (200,)),
+        ('admin_users', 'GET', '/api/admin/users', 'admin', none, (200,)),
+        ('admin_user_status', 'PUT', lambda n: f'/api/admin/users/{n % ids["users"] + 1}/status', 'admin',
+         lambda n: {'json': {'isActive': True}}, (200,)),
+        ('admin_revoke_user', 'POST', f'/api/admin/users/{ids["victim_user_id"]}/revoke-tokens', 'admin',
+         none, (200,)),
+        ('admin_revoke_admin', 'POST', f'/api/admin/admins/{ids["victim_admin_id"]}/revoke-tokens', 'admin',
+         none, (200,)),
+        ('admin_events', 'GET', '/api/admin/events', 'admin', none, (200,)),
+        ('admin_add_event', 'POST', '/api/admin/events', 'admin',
+         lambda n: {'json': {'name': 'benchmark', 'date': '2030-01-01', 'location': 'Nairobi'}}, (201,)),
+        ('admin_complete_event', 'PATCH', lambda n: f'/api/admin/events/{n % ids["events"] + 1}/complete',
+         'admin', none, (200,)),
+        ('admin_add_member', 'POST', '/api/admin/members', 'admin',
+         lambda n: {'json': {'name': 'benchmark', 'position': 'volunteer'}}, (201,)),
+        ('admin_delete_member', 'DELETE', lambda n: f'/api/admin/members/{members.next()}', 'admin',
+         none, (200,)),
+        ('admin_feedback', 'GET', '/api/admin/feedback', 'admin', none, (200,)),
+        ('admin_reply', 'POST', '/api/admin/feedback/reply', 'admin', reply, (200,)),
+        ('admin_search', 'GET', '/api/admin/search?q=benchmark', 'admin', none, (200,)),
+        ('admin_inventory', 'GET', '/api/admin/inventory', 'admin', none, (200,)),
+        ('admin_adjust_inventory', 'POST', '/api/admin/inventory/adjustments', 'admin',
+         lambda n: {'json': {'adjustments': [{'id': (n + i) % INVENTORY_ITEMS + 1, 'delta': (-1) ** i}
+                                             for i in range(5)]}}, (200,)),
+    ]
+
+
+class WsgiTransport:
+    """Requests through the Flask test client, one client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, headers=None, **kwargs):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.app.test_client()
+        response = self.local.client.open(path, method=method, headers=headers or {}, **kwargs)
+        response.get_data()  # drain streamed responses
+        return response.status_code
+
+
+class HttpTransport:
+    """Requests over HTTP, one keep-alive session per thread."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.local = threading.local()
+
+    def request(self, method, path, headers=None, **kwargs):
+        import requests
+
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        response = self.local.session.request(method, self.base_url + path, headers=headers, **kwargs)
+        return response.status_code
+
+
+def count_sql(app, db, endpoint, tokens):
+    """Statements issued by one warm request (the second of two)."""
+    from sqlalchemy import event
+
+    transport = WsgiTransport(app)
+    counted = [0]
+
+    def before_cursor_execute(*args):
+        counted[0] += 1
+
+    for n in range(2):
+        counted[0] = 0
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            call(transport, endpoint, tokens, n)
+        finally:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return counted[0]
+
+
+def call(transport, endpoint, tokens, n):
+    name, method, path, auth, make_kwargs, _ = endpoint
+    kwargs = make_kwargs(n)
+    headers = dict(kwargs.pop('headers', {}))
+    if auth:
+        headers['Authorization'] = f'Bearer {tokens[auth]}'
+    return transport.request(method, path(n) if callable(path) else path, headers=headers, **kwargs)
+
+
+def drive(transport, endpoint, tokens, requests, concurrency):
+    ok_statuses = endpoint[-1]
+
+    # Untimed warm-up, one request per thread: first requests pay for lazy
+    # imports and new connections in each (gunicorn) worker
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda n: call(transport, endpoint, tokens, n), range(concurrency)))
+
+    def timed(n):
+        started = time.perf_counter()
+        try:
+            status = call(transport, endpoint, tokens, n)
+        except Exception:
+            status = None
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency in results]
+    return {
+        'requests': requests,
+        'errors': sum(1 for status, _ in results if status not in ok_statuses),
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(env, workers):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--preload', '-w', str(workers), '--threads', '4',
+         '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+        env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    import requests
+
+    for _ in range(100):
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Return [(endpoint, reason)] for every regression against baseline."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        if current['sql'] > previous['sql']:
+            regressions.append((name, f"SQL statements {previous['sql']} -> {current['sql']}"))
+        if current['errors'] and not previous['errors']:
+            regressions.append((name, f"{current['errors']} unexpected statuses"))
+        slower = current['p95_ms'] - previous['p95_ms']
+        if slower > min_delta_ms and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append((name, f"p95 {previous['p95_ms']} -> {current['p95_ms']} ms"))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=('wsgi', 'gunicorn'), default='wsgi')
+    parser.add_argument('--gunicorn-workers', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--donations', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=500)
+    parser.add_argument('--feedback', type=int, default=2000)
+    parser.add_argument('--replies', type=int, default=2000)
+    parser.add_argument('--members', type=int, default=50)
+    parser.add_argument('--only', help='comma-separated endpoint names to run')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write this run to --baseline instead')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed p95 slowdown, as a fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    stripe_stub = start_stripe_stub()
+    env = dict(os.environ,
+               DATABASE_URI=f"sqlite:///{os.path.join(tmp.name, 'bench.db')}",
+               STRIPE_SECRET_KEY='sk_test_benchmark',
+               STRIPE_API_BASE=f'http://127.0.0.1:{stripe_stub.server_port}',
+               STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+               OUTBOX_WORKER='false',
+               STRIPE_EVENT_WORKER='false',
+               SCHEDULER_WORKER='false')
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    from wsgi import app
+    from models import db
+    from accounts import create_token
+
+    counts = {name: getattr(args, name) for name in ('users', 'donations', 'events', 'feedback', 'replies', 'members')}
+    counts['requests'] = args.requests
+    counts['warmup'] = args.concurrency
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        ids = seed(db, counts)
+        print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+        tokens = {'user': create_token('user', ids['user']), 'admin': create_token('admin', ids['admin'])}
+
+    selected = endpoints(ids)
+    if args.only:
+        wanted = set(args.only.split(','))
+        selected = [endpoint for endpoint in selected if endpoint[0] in wanted]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sql_counts = {endpoint[0]: count_sql(app, db, endpoint, tokens) for endpoint in selected}
+
+    process = None
+    if args.target == 'gunicorn':
+        process, base_url = start_gunicorn(env, args.gunicorn_workers)
+        transport = HttpTransport(base_url)
+    else:
+        transport = WsgiTransport(app)
+
+    results = {
+        'meta': {
+            'target': args.target,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'dataset': {name: counts[name] for name in counts if name not in ('requests', 'warmup')},
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'recorded': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'endpoints': {},
+    }
+    try:
+        print(f"{'endpoint':<26}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'sql':>5}{'errors':>8}")
+        for endpoint in selected:
+            # Keeps debugging print()s in handlers out of the table
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = drive(transport, endpoint, tokens, args.requests, args.concurrency)
+            result['sql'] = sql_counts[endpoint[0]]
+            results['endpoints'][endpoint[0]] = result
+            print(f"{endpoint[0]:<26}{result['rps']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}"
+                  f"{result['p99_ms']:>9}{result['sql']:>5}{result['errors']:>8}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        stripe_stub.shutdown()
+        tmp.cleanup()
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for name, reason in regressions:
+            print(f"REGRESSION {name}: {reason}")
+        print(f"Compared {len(results['endpoints'])} endpoints against {args.baseline}: "
+              f"{len(regressions)} regressions.")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
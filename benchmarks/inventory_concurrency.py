@@ -0,0 +1,142 @@
+"""Concurrency stress test for the batched inventory adjustments.
+
+Starts gunicorn (several worker processes, each with threads) on a scratch
+SQLite database, or on --database-uri, and has many clients post random
+batches of +/- deltas to /api/admin/inventory/adjustments for a few
+seconds. Intake and distribution hit the same few items, so batches
+overlap constantly. Afterwards every item's quantity must equal its
+starting stock plus the deltas of the accepted batches, and none may be
+negative; any lost update, partially applied batch or deadlock shows up
+as a mismatch or an unexpected status. Exits 1 if one is found.
+
+Usage:
+    python benchmarks/inventory_concurrency.py [--seconds 10] [--clients 16] [--items 10]
+        [--workers 4] [--database-uri postgresql://...]
+"""
+import argparse
+import collections
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INITIAL_STOCK = 50
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(env, workers):
+    import requests
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--preload', '-w', str(workers), '--threads', '4',
+         '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+        env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--database-uri', help='defaults to a scratch SQLite database')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodbridge-inventory-')
+    env = dict(os.environ,
+               DATABASE_URI=args.database_uri or f"sqlite:///{os.path.join(workdir, 'inventory.db')}",
+               OUTBOX_WORKER='false', STRIPE_EVENT_WORKER='false')
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    import requests
+    from wsgi import app
+    from models import db, Admin, Inventory
+    from accounts import create_token
+
+    with app.app_context():
+        db.create_all()
+        admin = Admin(email='inventory-bench@example.com', password='x')
+        db.session.add(admin)
+        items = [Inventory(item_name=f'item {i}', quantity=INITIAL_STOCK) for i in range(args.items)]
+        db.session.add_all(items)
+        db.session.commit()
+        item_ids = [item.id for item in items]
+        start_stock = {item.id: item.quantity for item in items}
+        headers = {'Authorization': f"Bearer {create_token('admin', admin)}"}
+
+    process, base_url = start_gunicorn(env, args.workers)
+    applied = collections.Counter()
+    statuses = collections.Counter()
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            batch = [{'id': item_id, 'delta': rng.randint(-10, 10)}
+                     for item_id in rng.sample(item_ids, rng.randint(1, min(5, len(item_ids))))]
+            started = time.perf_counter()
+            response = session.post(base_url + '/api/admin/inventory/adjustments',
+                                    json={'adjustments': batch}, headers=headers)
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses[response.status_code] += 1
+                latencies.append(elapsed)
+                if response.status_code == 200:
+                    for adjustment in batch:
+                        applied[adjustment['id']] += adjustment['delta']
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    process.terminate()
+    process.wait()
+
+    with app.app_context():
+        final = dict(db.session.query(Inventory.id, Inventory.quantity).all())
+
+    mismatches = {item_id: (start_stock[item_id] + applied[item_id], final[item_id])
+                  for item_id in item_ids if final[item_id] != start_stock[item_id] + applied[item_id]}
+    negative = [item_id for item_id in item_ids if final[item_id] < 0]
+    unexpected = {status: count for status, count in statuses.items() if status not in (200, 409)}
+    latencies.sort()
+    total = sum(statuses.values())
+
+    print(f"{total} batches in {args.seconds:.0f}s ({total / args.seconds:.0f}/s), "
+          f"{statuses[200]} applied, {statuses[409]} rejected for lack of stock")
+    print(f"latency p50 {latencies[total // 2] * 1000:.1f} ms, p99 {latencies[int(total * 0.99)] * 1000:.1f} ms")
+    print(f"final stock {sorted(final.values())}")
+    if mismatches or negative or unexpected:
+        print(f"FAILED: mismatches (expected, actual) {mismatches}, negative {negative}, "
+              f"unexpected statuses {unexpected}")
+        sys.exit(1)
+    print("OK: every accepted delta applied exactly once, no negative stock")
+
+
+if __name__ == '__main__':
+    main()
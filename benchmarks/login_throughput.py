@@ -0,0 +1,118 @@
+"""Login throughput under concurrency, with and without the hashing pool.
+
+Starts the app on a threaded local server backed by a scratch SQLite
+database, then fires concurrent logins while a second client polls the
+cheap /api/members endpoint. Each hashing configuration runs in its own
+process because config.py reads the settings from the environment at import.
+
+Usage:
+    python benchmarks/login_throughput.py [--logins 200] [--concurrency 16]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def run_once(logins, concurrency, users):
+    """Benchmark body, run inside a child process configured via env vars."""
+    sys.path.insert(0, ROOT)
+    import requests
+    from werkzeug.serving import make_server
+    from wsgi import app
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    for i in range(users):
+        requests.post(f'{base}/api/auth/register',
+                      json={'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': 'password'})
+
+    stop = threading.Event()
+    read_latencies = []
+
+    def poll_reads():
+        session = requests.Session()
+        while not stop.is_set():
+            started = time.perf_counter()
+            session.get(f'{base}/api/members')
+            read_latencies.append(time.perf_counter() - started)
+
+    def login(i):
+        started = time.perf_counter()
+        response = requests.post(f'{base}/api/auth/login',
+                                 json={'email': f'bench{i % users}@example.com', 'password': 'password'})
+        return response.status_code, time.perf_counter() - started
+
+    reader = threading.Thread(target=poll_reads, daemon=True)
+    reader.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    reader.join()
+    server.shutdown()
+
+    latencies = [latency for _, latency in results]
+    return {
+        'logins_per_sec': round(logins / elapsed, 2),
+        'login_p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'login_p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'read_p50_ms': round(percentile(read_latencies, 50) * 1000, 1),
+        'read_p99_ms': round(percentile(read_latencies, 99) * 1000, 1),
+        'errors': sum(1 for status, _ in results if status not in (200, 503)),
+        'shed': sum(1 for status, _ in results if status == 503),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--method', default=os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'))
+    parser.add_argument('--pool-sizes', default=f'0,{os.cpu_count() or 1}',
+                        help='comma-separated PASSWORD_HASH_WORKERS values to compare (0 = inline)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_once(args.logins, args.concurrency, args.users)))
+        return
+
+    for pool_size in args.pool_sizes.split(','):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       DATABASE_URI=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       PASSWORD_HASH_WORKERS=pool_size,
+                       PASSWORD_HASH_METHOD=args.method,
+                       OUTBOX_WORKER='false',
+                       STRIPE_EVENT_WORKER='false')
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', '--logins', str(args.logins),
+                 '--concurrency', str(args.concurrency), '--users', str(args.users)],
+                env=env, cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"PASSWORD_HASH_WORKERS={pool_size}: {json.dumps(result)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Check read-replica routing locally with two SQLite files.
+
+Seeds a primary database, copies it to a second file that stands in for
+the replica, and points REPLICA_DATABASE_URI at the copy. Nothing
+replicates between the two, so the replica lags forever and every read
+shows which database answered it. Counts the statements each engine runs
+and checks that:
+
+- GET requests read from the replica
+- writes, and POST requests' reads, go to the primary
+- a client that just wrote reads from the primary until its pin expires,
+  then from the replica again
+- other clients keep reading from the replica meanwhile
+- token checks read account status from the primary, so a deactivated
+  account is refused even where the replica still shows it active
+- work outside a request (CLI commands, background senders) uses the primary
+
+Exits 1 if any check fails.
+
+Usage:
+    python benchmarks/replica_routing.py [--pin-seconds 1]
+"""
+import argparse
+import collections
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pin-seconds', type=int, default=1)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodbridge-replica-')
+    primary_path = os.path.join(workdir, 'primary.db')
+    replica_path = os.path.join(workdir, 'replica.db')
+    os.environ.update(DATABASE_URI=f'sqlite:///{primary_path}', REPLICA_DATABASE_URI=f'sqlite:///{replica_path}',
+                      REPLICA_PIN_SECONDS=str(args.pin_seconds),
+                      OUTBOX_WORKER='false', STRIPE_EVENT_WORKER='false', SCHEDULER_WORKER='false')
+    sys.path.insert(0, ROOT)
+    from datetime import date, timedelta
+    from sqlalchemy import event as sa_event
+    from wsgi import app
+    from models import db, Event, User
+    from accounts import account_changed, create_token
+    from database import REPLICA_BIND
+
+    with app.app_context():
+        db.create_all()
+        event = Event(name='Food drive', date=date.today() + timedelta(days=7), location='Nairobi', capacity=10)
+        users = [User(username=f'replica{i}', email=f'replica{i}@example.com', password='x') for i in range(2)]
+        db.session.add(event)
+        db.session.add_all(users)
+        db.session.commit()
+        event_id = event.id
+        reader_id = users[1].id
+        writer, reader = [{'Authorization': f"Bearer {create_token('user', user)}"} for user in users]
+        primary, replica = db.engine, db.engines[REPLICA_BIND]
+        primary.dispose()
+
+    # The backup API copies a consistent snapshot, WAL included
+    with sqlite3.connect(primary_path) as source, sqlite3.connect(replica_path) as target:
+        source.backup(target)
+
+    statements = collections.Counter()
+    for name, engine in (('primary', primary), ('replica', replica)):
+        sa_event.listen(engine, 'before_cursor_execute',
+                        lambda *_, name=name: statements.update([name]))
+
+    failures = []
+
+    def check(label, client, method, url, expected_engine, headers=None, expected_status=200):
+        statements.clear()
+        response = client.open(url, method=method, headers=headers)
+        seats = response.get_json().get('seatsTaken') if method == 'GET' else None
+        used = sorted(statements)
+        ok = response.status_code == expected_status and used == [expected_engine]
+        print(f"{'ok ' if ok else 'BAD'} {label:<44} {method} {response.status_code} "
+              f"statements {dict(statements)}" + ('' if seats is None else f" seatsTaken {seats}"))
+        if not ok:
+            failures.append(label)
+        return seats
+
+    writer_client, reader_client = app.test_client(), app.test_client()
+    seats_url = f'/api/events/{event_id}/seats'
+    check('GET before any write reads the replica', writer_client, 'GET', seats_url, 'replica')
+    check('POST sign-up writes to the primary', writer_client, 'POST',
+          f'/api/events/{event_id}/volunteers', 'primary', writer, expected_status=201)
+    pinned = check('writer is pinned to the primary', writer_client, 'GET', seats_url, 'primary')
+    stale = check('other clients still read the replica', reader_client, 'GET', seats_url, 'replica', reader)
+    if (pinned, stale) != (1, 0):
+        failures.append(f'expected the primary to show 1 seat taken and the replica 0, got {pinned} and {stale}')
+
+    time.sleep(args.pin_seconds + 0.1)
+    check('pin expired: writer reads the replica again', writer_client, 'GET', seats_url, 'replica')
+
+    # The replica still has the reader active; only the primary knows better
+    with app.app_context():
+        db.session.execute(db.update(User).where(User.id == reader_id).values(isActive=False))
+        account_changed()
+        db.session.commit()
+    check('deactivated account is refused on a GET', reader_client, 'GET', '/api/donations', 'primary', reader,
+          expected_status=403)
+
+    statements.clear()
+    with app.app_context():
+        db.session.get(Event, event_id)
+        db.session.remove()
+    print(f"{'ok ' if list(statements) == ['primary'] else 'BAD'} {'reads outside a request use the primary':<44} "
+          f"statements {dict(statements)}")
+    if list(statements) != ['primary']:
+        failures.append('reads outside a request')
+
+    if failures:
+        print('FAILED: ' + '; '.join(failures))
+        sys.exit(1)
+    print('OK: reads routed to the replica, writes and recent writers to the primary')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Check that the scheduler's lease lets one worker run a due job, however many race.
+
+Starts --workers processes on a scratch SQLite database, or on
+--database-uri, each with its own scheduler for the same job. For
+--rounds rounds the job is made due and every process tries to run it at
+the same moment. The job counts its runs in a stat row and sleeps a
+little so the runs would overlap if two workers got in. Every round must
+count exactly one run, and the job's row must show it finished. Exits 1
+otherwise.
+
+Usage:
+    python benchmarks/scheduler_lease.py [--workers 8] [--rounds 20] [--database-uri postgresql://...]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOB = 'lease-check'
+COUNTER = 'job:lease-check'
+
+
+def count_run(checkpoint):
+    from stats import increment_stat
+
+    if checkpoint:
+        return 0, None
+    increment_stat(COUNTER)
+    time.sleep(0.05)
+    return 1, True
+
+
+def worker(rounds, barrier, results):
+    sys.path.insert(0, ROOT)
+    from wsgi import app
+    from scheduler import Job, Scheduler
+
+    scheduler = Scheduler(app, [Job(JOB, '0 0 1 1 *', count_run)])
+    with app.app_context():
+        for _ in range(rounds):
+            barrier.wait()  # the coordinator has made the job due
+            ran = scheduler.run(JOB) is not None
+            results.put(ran)
+            barrier.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--database-uri', help='defaults to a scratch SQLite database')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodbridge-scheduler-')
+    os.environ.update(DATABASE_URI=args.database_uri or f"sqlite:///{os.path.join(workdir, 'scheduler.db')}",
+                      OUTBOX_WORKER='false', STRIPE_EVENT_WORKER='false', SCHEDULER_WORKER='false')
+    sys.path.insert(0, ROOT)
+    from datetime import datetime
+    from wsgi import app
+    from models import db, ScheduledJob, Stat
+    from scheduler import Job, register
+
+    with app.app_context():
+        db.create_all()
+        register(Job(JOB, '0 0 1 1 *', count_run), datetime.utcnow())
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(args.workers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(args.rounds, barrier, results)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+
+    failures = []
+    with app.app_context():
+        for round_number in range(args.rounds):
+            db.session.execute(db.update(ScheduledJob).where(ScheduledJob.name == JOB)
+                               .values(next_run_at=datetime.utcnow()))
+            db.session.commit()
+            barrier.wait()
+            barrier.wait()
+            ran = sum(results.get() for _ in range(args.workers))
+            db.session.expire_all()
+            runs = db.session.get(Stat, COUNTER).value if db.session.get(Stat, COUNTER) else 0
+            if ran != 1 or runs != round_number + 1:
+                failures.append(f"round {round_number}: {ran} workers ran the job, {runs} runs counted")
+        job = db.session.get(ScheduledJob, JOB)
+        status, lease_owner = job.last_status, job.lease_owner
+    for process in processes:
+        process.join()
+
+    print(f"{args.rounds} rounds, {args.workers} workers racing for each: {args.rounds - len(failures)} ran exactly once")
+    if failures or status != 'ok' or lease_owner is not None:
+        print("FAILED: " + '; '.join(failures + [f"last status {status}, lease owner {lease_owner}"]))
+        sys.exit(1)
+    print("OK: one run per due job, lease released after each run")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Full-text search latency against a LIKE scan, on a large SQLite database.
+
+Seeds a scratch database with --rows feedback messages (the FTS5 triggers
+index them as they are inserted), then times search.search() and the
+equivalent `message LIKE '%word%'` scan for words of increasing frequency.
+The common word appears in a fifth of all messages, which is where ranking
+only the newest search.CANDIDATES matches matters.
+
+Usage:
+    python benchmarks/search.py [--rows 1000000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (word, share of messages containing it)
+WORDS = [('rotten', 0.001), ('bread', 0.01), ('delivery', 0.05), ('food', 0.2)]
+QUERIES = ['rotten', 'bread', 'delivery', 'food', 'rotten bread', 'food delivery']
+VOCABULARY = [f'word{i}' for i in range(5000)]
+SEED_BATCH = 10000
+
+
+def message(rng):
+    words = rng.choices(VOCABULARY, k=12)
+    words += [word for word, share in WORDS if rng.random() < share]
+    rng.shuffle(words)
+    return ' '.join(words)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return sorted(samples)[len(samples) // 2], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodbridge-search-')
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'search.db')}"
+    os.environ.setdefault('OUTBOX_WORKER', 'false')
+    os.environ.setdefault('STRIPE_EVENT_WORKER', 'false')
+    sys.path.insert(0, ROOT)
+    from wsgi import app
+    from models import db, Feedback, User
+    from search import search
+
+    rng = random.Random(0)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench', email='bench@example.com', password='x'))
+        db.session.commit()
+
+        started = time.perf_counter()
+        for offset in range(0, args.rows, SEED_BATCH):
+            db.session.execute(db.insert(Feedback), [
+                {'user_id': 1, 'message': message(rng)} for _ in range(min(SEED_BATCH, args.rows - offset))
+            ])
+            db.session.commit()
+        seeded = time.perf_counter() - started
+        print(f"Seeded {args.rows} messages in {seeded:.1f}s ({args.rows / seeded:.0f} rows/s, index included)")
+
+        print(f"{'query':<16}{'matches':>10}{'search ms':>12}{'LIKE ms':>12}")
+        for query in QUERIES:
+            like = Feedback.message.like
+            scan = db.session.query(db.func.count(Feedback.id)) \
+                .filter(*[like(f'%{word}%') for word in query.split()])
+            like_ms, matches = timed(scan.scalar, args.repeat)
+            search_ms, hits = timed(lambda: search(query, 'feedback', 20), args.repeat)
+            assert hits or not matches
+            print(f"{query:<16}{matches:>10}{search_ms:>12.1f}{like_ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Worker startup cost: import time of wsgi.py, which builds the app.
+
+Runs 'python -X importtime -c "import wsgi"' several times in fresh
+interpreters and reports the median total, the median wall time, and the
+modules with the largest cumulative import time from the median run. Use
+it to check that a new dependency is not imported eagerly.
+
+Usage:
+    python benchmarks/startup_time.py [--runs 5] [--top 15] [--module wsgi]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """Return {module: cumulative microseconds} from -X importtime output."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumul, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under their parent; keep the name only
+        cumulative[name.strip()] = int(cumul)
+    return cumulative
+
+
+def run_once(module):
+    env = dict(os.environ, OUTBOX_WORKER='false', STRIPE_EVENT_WORKER='false')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        env=env, cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - started
+    return wall, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--module', default='wsgi')
+    args = parser.parse_args()
+
+    runs = sorted((run_once(args.module) for _ in range(args.runs)),
+                  key=lambda run: run[1].get(args.module, 0))
+    median = runs[len(runs) // 2][1]
+
+    total = statistics.median(run[1].get(args.module, 0) for run in runs)
+    print(f"import {args.module}: {total / 1000:.1f} ms imports (median of {args.runs}), "
+          f"{statistics.median(run[0] for run in runs) * 1000:.1f} ms wall")
+    print(f"stripe imported: {'stripe' in median}, flask_mail imported: {'flask_mail' in median}")
+    print("\nSlowest top-level imports (cumulative ms):")
+    top_level = {name: us for name, us in median.items() if '.' not in name and name != args.module}
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:8.1f}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Concurrency stress test for volunteer sign-up during a rush.
+
+Starts gunicorn (several worker processes, each with threads) on a scratch
+SQLite database, or on --database-uri, opens one event with --capacity
+seats, and has --users volunteers sign up at once from --clients threads.
+A share of them cancel straight away, and some try to sign up twice.
+Afterwards the event must hold:
+
+- no more confirmed volunteers than its capacity (no overbooking)
+- seats_taken equal to the confirmed volunteers (no drift in the counter)
+- no free seat while someone is still waitlisted (promotion never missed)
+- at most one sign-up per user
+
+Exits 1 if any of these fails or a request returned an unexpected status.
+
+Usage:
+    python benchmarks/volunteer_rush.py [--users 500] [--capacity 50] [--clients 32]
+        [--cancel-share 0.3] [--workers 4] [--database-uri postgresql://...]
+"""
+import argparse
+import collections
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(env, workers):
+    import requests
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--preload', '-w', str(workers), '--threads', '4',
+         '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+        env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--capacity', type=int, default=50)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--cancel-share', type=float, default=0.3)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--database-uri', help='defaults to a scratch SQLite database')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodbridge-rush-')
+    env = dict(os.environ,
+               DATABASE_URI=args.database_uri or f"sqlite:///{os.path.join(workdir, 'rush.db')}",
+               OUTBOX_WORKER='false', STRIPE_EVENT_WORKER='false')
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    from datetime import date, timedelta
+    import requests
+    from wsgi import app
+    from models import db, Event, User, Volunteer
+    from accounts import create_token
+
+    with app.app_context():
+        db.create_all()
+        event = Event(name='Food drive', date=date.today() + timedelta(days=7), location='Nairobi',
+                      capacity=args.capacity)
+        users = [User(username=f'rush{i}', email=f'rush{i}@example.com', password='x')
+                 for i in range(args.users)]
+        db.session.add(event)
+        db.session.add_all(users)
+        db.session.commit()
+        event_id = event.id
+        tokens = [create_token('user', user) for user in users]
+
+    process, base_url = start_gunicorn(env, args.workers)
+    url = f'{base_url}/api/events/{event_id}/volunteers'
+    statuses = collections.Counter()
+    lock = threading.Lock()
+    local = threading.local()
+
+    def volunteer(i):
+        rng = random.Random(i)
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        headers = {'Authorization': f'Bearer {tokens[i]}'}
+        calls = [('POST', (201,))]
+        if rng.random() < 0.1:
+            calls.append(('POST', (409,)))
+        if rng.random() < args.cancel_share:
+            calls.append(('DELETE', (200,)))
+        for method, expected in calls:
+            response = local.session.request(method, url, headers=headers)
+            with lock:
+                statuses[(method, response.status_code, response.status_code in expected)] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        list(executor.map(volunteer, range(args.users)))
+    elapsed = time.perf_counter() - started
+    process.terminate()
+    process.wait()
+
+    with app.app_context():
+        event = db.session.get(Event, event_id)
+        counts = dict(db.session.query(Volunteer.status, db.func.count(Volunteer.id))
+                      .filter(Volunteer.event_id == event_id).group_by(Volunteer.status).all())
+        duplicates = db.session.query(Volunteer.user_id).filter(Volunteer.event_id == event_id) \
+            .group_by(Volunteer.user_id).having(db.func.count(Volunteer.id) > 1).count()
+        seats_taken, capacity = event.seats_taken, event.capacity
+    confirmed, waitlisted = counts.get('confirmed', 0), counts.get('waitlisted', 0)
+
+    requests_made = sum(statuses.values())
+    print(f"{requests_made} requests from {args.users} volunteers in {elapsed:.1f}s "
+          f"({requests_made / elapsed:.0f}/s)")
+    for (method, status, expected), count in sorted(statuses.items()):
+        print(f"  {method} {status}: {count}{'' if expected else '  (unexpected)'}")
+    print(f"capacity {capacity}, seats_taken {seats_taken}, confirmed {confirmed}, waitlisted {waitlisted}")
+
+    failures = []
+    if confirmed > capacity:
+        failures.append(f"overbooked: {confirmed} confirmed for {capacity} seats")
+    if seats_taken != confirmed:
+        failures.append(f"seats_taken {seats_taken} != {confirmed} confirmed")
+    if waitlisted and confirmed < capacity:
+        failures.append(f"{capacity - confirmed} free seats with {waitlisted} waitlisted")
+    if duplicates:
+        failures.append(f"{duplicates} users signed up twice")
+    if any(not expected for _, _, expected in statuses):
+        failures.append("unexpected statuses")
+    if failures:
+        print("FAILED: " + '; '.join(failures))
+        sys.exit(1)
+    print("OK: no overbooking, counter exact, waitlist promoted into every free seat")
+
+
+if __name__ == '__main__':
+    main()
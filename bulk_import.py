@@ -0,0 +1,201 @@
+import csv
+import json
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Event, Member
+from stats import increment_stat
+from cache import bump_version
+from passwords import hash_passwords
+
+BATCH_SIZE = 500
+
+
+def read_rows(lines, fmt):
+    """Yield (line number, row dict or None, error or None) from a text stream.
+
+    `lines` is any iterable of text lines (an open file or the request
+    stream), consumed lazily so memory stays flat however large it is.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Each line must be a JSON object"
+            continue
+        yield line_no, row, None
+
+
+def required(row, *fields):
+    missing = [field for field in fields if not row.get(field)]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+
+def parse_bool(value, default=True):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ('true', '1'):
+        return True
+    if str(value).lower() in ('false', '0'):
+        return False
+    raise ValueError(f"Invalid boolean {value!r}")
+
+
+def user_values(row):
+    required(row, 'username', 'email', 'password')
+    if '@' not in row['email']:
+        raise ValueError("Invalid email")
+    if len(row['username']) > 80 or len(row['email']) > 120:
+        raise ValueError("username or email too long")
+    return {
+        'username': row['username'],
+        'email': row['email'],
+        'password': row['password'],  # hashed per batch in insert_batch
+        'isActive': parse_bool(row.get('isActive')),
+    }
+
+
+def event_values(row):
+    required(row, 'name', 'date', 'location')
+    completed = parse_bool(row.get('completed'), default=False)
+    return {
+        'name': row['name'],
+        'date': datetime.strptime(row['date'], '%Y-%m-%d').date(),
+        'location': row['location'],
+        'description': row.get('description') or None,
+        'picture_url': row.get('pictureUrl') or row.get('picture_url') or None,
+        'completed': completed,
+        # Imported as completed counts as completed now, so it gets archived
+        'completed_at': datetime.utcnow() if completed else None,
+    }
+
+
+def member_values(row):
+    required(row, 'name', 'position')
+    return {
+        'name': row['name'],
+        'position': row['position'],
+        'image_url': row.get('image_url') or None,
+    }
+
+
+# resource name -> (model, row validator, stat counter, cache resource)
+RESOURCES = {
+    'users': (User, user_values, 'users', None),
+    'events': (Event, event_values, 'campaigns', 'events'),
+    'members': (Member, member_values, 'members', 'members'),
+}
+
+
+def user_conflicts(batch):
+    """Return {line: error} for users clashing with each other or the table."""
+    emails = {values['email'] for _, values in batch}
+    usernames = {values['username'] for _, values in batch}
+    taken = set()
+    for email, username in db.session.query(User.email, User.username) \
+            .filter(db.or_(User.email.in_(emails), User.username.in_(usernames))):
+        taken.update((('email', email), ('username', username)))
+
+    conflicts = {}
+    for line_no, values in batch:
+        keys = {('email', values['email']), ('username', values['username'])}
+        if keys & taken:
+            conflicts[line_no] = "User already exists"
+        taken |= keys
+    return conflicts
+
+
+def insert_batch(resource, batch):
+    """Insert one batch in a single multi-row INSERT and commit.
+
+    Returns (inserted count, [(line, error)]). If the batch hits a
+    constraint another writer raced us to, it is retried row by row so only
+    the offending rows are rejected.
+    """
+    model, _, counter, cache_resource = RESOURCES[resource]
+    errors = []
+    if resource == 'users':
+        conflicts = user_conflicts(batch)
+        errors = sorted(conflicts.items())
+        batch = [(line_no, values) for line_no, values in batch if line_no not in conflicts]
+        hashes = hash_passwords([values['password'] for _, values in batch])
+        for (_, values), hashed in zip(batch, hashes):
+            values['password'] = hashed
+    if not batch:
+        return 0, errors
+
+    def finish(count):
+        increment_stat(counter, count)
+        if cache_resource:
+            bump_version(cache_resource)
+        db.session.commit()
+
+    try:
+        db.session.execute(db.insert(model), [values for _, values in batch])
+        finish(len(batch))
+        return len(batch), errors
+    except IntegrityError:
+        db.session.rollback()
+
+    inserted = 0
+    for line_no, values in batch:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(model), [values])
+            inserted += 1
+        except IntegrityError:
+            errors.append((line_no, "Conflicts with an existing row"))
+    finish(inserted)
+    return inserted, sorted(errors)
+
+
+def import_stream(resource, lines, fmt, batch_size=BATCH_SIZE):
+    """Import rows from lines, yielding one result dict per rejected row.
+
+    The final item yielded is a summary: {'imported': n, 'failed': n}.
+    """
+    validate = RESOURCES[resource][1]
+    imported = failed = 0
+    batch = []
+
+    for line_no, row, error in read_rows(lines, fmt):
+        if error is None:
+            try:
+                batch.append((line_no, validate(row)))
+            except (ValueError, TypeError, AttributeError) as e:
+                error = str(e)
+        if error is not None:
+            failed += 1
+            yield {'line': line_no, 'error': error}
+
+        if len(batch) >= batch_size:
+            count, errors = insert_batch(resource, batch)
+            imported += count
+            failed += len(errors)
+            for err_line, err in errors:
+                yield {'line': err_line, 'error': err}
+            batch = []
+
+    if batch:
+        count, errors = insert_batch(resource, batch)
+        imported += count
+        failed += len(errors)
+        for err_line, err in errors:
+            yield {'line': err_line, 'error': err}
+
+    yield {'imported': imported, 'failed': failed}
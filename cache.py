@@ -0,0 +1,155 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request
+
+from models import db, Stat
+from stats import increment_stat
+
+
+class ResponseCache:
+    """Size-bounded LRU of rendered response bodies, shared by one process."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+response_cache = ResponseCache()
+
+
+class TTLCache:
+    """Size-bounded LRU whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_entries=10000, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def resource_version(resource):
+    """Current version of a cached resource.
+
+    Versions live in the stat table rather than in memory so that a write
+    handled by one gunicorn worker invalidates the caches of all of them.
+    """
+    row = db.session.get(Stat, f'version:{resource}')
+    return row.value if row else 0
+
+
+def bump_version(resource):
+    """Invalidate cached responses for resource when the caller commits."""
+    increment_stat(f'version:{resource}')
+
+
+def cached_response(resource):
+    """Cache a public GET view per resource version and query string.
+
+    Adds a strong ETag and Cache-Control so browsers and the CDN can
+    revalidate with If-None-Match and get a 304 back.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (resource, resource_version(resource), request.full_path)
+            entry = response_cache.get(key)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = {
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'headers': [(k, v) for k, v in response.headers if k.startswith('X-')],
+                    'etag': hashlib.sha256(body).hexdigest()[:32],
+                }
+                response_cache.set(key, entry)
+
+            response = Response(entry['body'], mimetype=entry['mimetype'], headers=entry['headers'])
+            response.set_etag(entry['etag'])
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config['PUBLIC_CACHE_MAX_AGE']
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -1,30 +1,112 @@
 import os
 
-class Config:
-    # Secret keys and tokens
-    SECRET_KEY = os.getenv('SECRET_KEY')
-    if not SECRET_KEY:
-        raise ValueError("No SECRET_KEY set for Flask application")
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_bool(name, default):
+    return os.getenv(name, default).lower() == 'true'
 
-    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
-    if not JWT_SECRET_KEY:
-        raise ValueError("No JWT_SECRET_KEY set for Flask application")
 
-    # Database configuration
+class Config:
+    # Secret keys and tokens; set real values in production
+    SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key')
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key')
+
+    # Database configuration; engine options are derived from the URI in
+    # create_app unless SQLALCHEMY_ENGINE_OPTIONS is set here
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI', 'sqlite:///app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Email configuration
-    MAIL_SERVER = 'smtp.gmail.com'
-    MAIL_PORT = 587
-    MAIL_USE_TLS = True
+    # Engine pool per worker process (see database.engine_options);
+    # DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING guard against
+    # connections a server or proxy closed while idle
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', 'true')
+    # SQLite connections get WAL, synchronous=NORMAL, a busy timeout (ms)
+    # and memory-mapped reads (bytes) unless DB_SQLITE_PRAGMAS is false
+    DB_SQLITE_PRAGMAS = env_bool('DB_SQLITE_PRAGMAS', 'true')
+    DB_SQLITE_BUSY_TIMEOUT = int(os.getenv('DB_SQLITE_BUSY_TIMEOUT', 5000))
+    DB_SQLITE_MMAP_SIZE = int(os.getenv('DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # Optional read replica. GET requests read from it unless their client
+    # wrote within the last REPLICA_PIN_SECONDS; everything else uses the
+    # primary above
+    REPLICA_DATABASE_URI = os.getenv('REPLICA_DATABASE_URI')
+    REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+    # Email configuration. Missing credentials only matter once the outbox
+    # sender connects, so they are not checked at startup.
+    MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+    MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
+    MAIL_USE_TLS = env_bool('MAIL_USE_TLS', 'true')
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', MAIL_USERNAME)
+
+    # Stripe
+    STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
+    STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
+    STRIPE_API_BASE = os.getenv('STRIPE_API_BASE')  # defaults to api.stripe.com
+
+    # Caching
+    PUBLIC_CACHE_MAX_AGE = int(os.getenv('PUBLIC_CACHE_MAX_AGE', 60))
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 256))
+    ACCOUNT_STATUS_CACHE_SIZE = int(os.getenv('ACCOUNT_STATUS_CACHE_SIZE', 10000))
+    ACCOUNT_STATUS_CACHE_TTL = int(os.getenv('ACCOUNT_STATUS_CACHE_TTL', 30))
+    # How often each worker re-reads the accounts version, so how long a
+    # deactivation or revocation made through another worker can lag
+    ACCOUNT_STATUS_RECHECK_MS = int(os.getenv('ACCOUNT_STATUS_RECHECK_MS', 1000))
+
+    # Password hashing: method and cost for new hashes in werkzeug's
+    # notation (e.g. 'pbkdf2:sha256:600000'), hashing processes per worker
+    # (0 hashes inline) and hashes in flight before logins get a 503
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))
+
+    # Background senders; disable them to drain the queues from cron with
+    # 'flask send-outbox' and 'flask process-stripe-events' instead
+    OUTBOX_WORKER = env_bool('OUTBOX_WORKER', 'true')
+    OUTBOX_POLL_INTERVAL = int(os.getenv('OUTBOX_POLL_INTERVAL', 10))
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+    OUTBOX_RETRY_BASE_SECONDS = int(os.getenv('OUTBOX_RETRY_BASE_SECONDS', 30))
+    STRIPE_EVENT_WORKER = env_bool('STRIPE_EVENT_WORKER', 'true')
+    STRIPE_EVENT_POLL_INTERVAL = int(os.getenv('STRIPE_EVENT_POLL_INTERVAL', 10))
+    STRIPE_EVENT_BATCH_SIZE = int(os.getenv('STRIPE_EVENT_BATCH_SIZE', 100))
+    STRIPE_EVENT_MAX_ATTEMPTS = int(os.getenv('STRIPE_EVENT_MAX_ATTEMPTS', 8))
+
+    # Threads per worker process loading /api/admin/dashboard's sections,
+    # and so connections it may hold at once
+    DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', 5))
+
+    # Archival: 'flask archive-events' and the archive-events job move
+    # events completed more than ARCHIVE_AFTER_DAYS ago, ARCHIVE_BATCH_SIZE
+    # per transaction
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 90))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 100))
+
+    # Scheduled maintenance jobs (jobs.py); schedules are cron expressions
+    # in UTC. Disable the worker to run them from cron with 'flask run-job'.
+    SCHEDULER_WORKER = env_bool('SCHEDULER_WORKER', 'true')
+    SCHEDULER_POLL_INTERVAL = int(os.getenv('SCHEDULER_POLL_INTERVAL', 30))
+    JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', 500))
+    COMPLETE_EVENTS_SCHEDULE = os.getenv('COMPLETE_EVENTS_SCHEDULE', '*/15 * * * *')
+    PRUNE_SCHEDULE = os.getenv('PRUNE_SCHEDULE', '30 3 * * *')
+    PRUNE_AFTER_DAYS = int(os.getenv('PRUNE_AFTER_DAYS', 30))
+    ARCHIVE_SCHEDULE = os.getenv('ARCHIVE_SCHEDULE', '0 4 * * *')
 
-    # Check if mail credentials are set
-    if not MAIL_USERNAME or not MAIL_PASSWORD:
-        raise ValueError("Mail credentials are not set")
+    # Instrumentation: requests at least this slow are logged with their
+    # slowest SQL. If METRICS_TOKEN is set, /metrics requires it as a
+    # bearer token.
+    SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
 
     # Other optional configurations
-    DEBUG = os.getenv('FLASK_DEBUG', False)
-    TESTING = os.getenv('FLASK_TESTING', False)
+    DEBUG = env_bool('FLASK_DEBUG', 'false')
+    TESTING = env_bool('FLASK_TESTING', 'false')
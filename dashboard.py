@@ -0,0 +1,123 @@
+"""The admin dashboard in one request: a preview of each admin list, loaded in parallel.
+
+Each section (stats, users, events, feedback, members) runs in a thread of
+a per-process pool, inside its own app context and so with its own session
+and pooled connection; the request waits for the slowest section rather
+than the sum of them. Previews show the newest rows first, and `next` is a
+cursor for the section's own list endpoint with ?sort=-id to read on.
+
+DASHBOARD_WORKERS bounds the threads, and with them the connections the
+dashboard holds at once, per gunicorn worker process.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import g
+
+from metrics import add_sql_timing, sql_timing, start_timer
+from models import db, User, Event, Feedback, Member, Reply
+from pagination import encode_cursor
+from stats import read_stats
+
+DEFAULT_PREVIEW = 5
+MAX_PREVIEW = 50
+TIMEOUT = 10
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """This process's section pool, created on first use and again after a fork."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard')
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def preview(query, model, limit, serialize):
+    rows = query.order_by(model.id.desc()).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'items': [serialize(row) for row in rows],
+        'next': encode_cursor('-id', rows[-1].id, rows[-1].id) if more else None,
+    }
+
+
+def users_section(limit):
+    return preview(User.query, User, limit, lambda user: {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'isActive': user.isActive
+    })
+
+
+def events_section(limit):
+    return preview(Event.query, Event, limit, lambda event: event.serialize())
+
+
+def feedback_section(limit):
+    section = preview(Feedback.query.options(db.joinedload(Feedback.user)), Feedback, limit, lambda feedback: {
+        'id': feedback.id,
+        'userId': feedback.user_id,
+        'username': feedback.user.username if feedback.user else 'Unknown',
+        'email': feedback.user.email if feedback.user else 'Unknown',
+        'message': feedback.message
+    })
+    # Reply counts instead of the threads keep the preview's size bounded
+    ids = [item['id'] for item in section['items']]
+    counts = dict(db.session.query(Reply.feedback_id, db.func.count(Reply.id))
+                  .filter(Reply.feedback_id.in_(ids)).group_by(Reply.feedback_id).all()) if ids else {}
+    for item in section['items']:
+        item['replyCount'] = counts.get(item['id'], 0)
+    return section
+
+
+def members_section(limit):
+    return preview(Member.query, Member, limit, lambda member: {
+        'id': member.id,
+        'name': member.name,
+        'position': member.position,
+        'image_url': member.image_url
+    })
+
+
+SECTIONS = {
+    'stats': lambda limit: read_stats(),
+    'users': users_section,
+    'events': events_section,
+    'feedback': feedback_section,
+    'members': members_section,
+}
+
+
+def run_section(app, use_replica, section, limit):
+    # A fresh app context gives the thread its own session, which is
+    # removed (and its connection returned) when the context ends
+    with app.app_context():
+        g.use_replica = use_replica
+        start_timer()
+        return section(limit), sql_timing()
+
+
+def load_dashboard(app, limit):
+    """{section: preview} for every section; a failed section holds {'error': ...}."""
+    pool = get_pool(app.config['DASHBOARD_WORKERS'])
+    futures = {name: pool.submit(run_section, app, g.get('use_replica', False), section, limit)
+               for name, section in SECTIONS.items()}
+    dashboard = {}
+    for name, future in futures.items():
+        try:
+            dashboard[name], timing = future.result(timeout=TIMEOUT)
+            add_sql_timing(*timing)
+        except Exception as e:
+            app.logger.exception(f"Dashboard section {name} failed")
+            dashboard[name] = {'error': str(e)}
+    return dashboard
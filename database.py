@@ -0,0 +1,228 @@
+import threading
+import time
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, TimeoutError as PoolTimeout
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.elements import TextClause
+
+# SQLALCHEMY_BINDS key of the optional read replica
+REPLICA_BIND = 'replica'
+# Holds the time (epoch seconds) until which a client reads from the primary
+PIN_COOKIE = 'fb_primary_until'
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PoolWaitStats:
+    """Running totals of how long requests waited to check out a connection from one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        # Callables given each wait in seconds, e.g. a metrics histogram
+        self.observers = []
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+        for observe in self.observers:
+            observe(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'totalWaitMs': round(self.total_wait * 1000, 3),
+                'avgWaitMs': round(self.total_wait * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'maxWaitMs': round(self.max_wait * 1000, 3),
+                'timeouts': self.timeouts,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection.
+
+    Each pool, so each bind, keeps its own wait_stats; they carry over
+    when engine.dispose() replaces the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(uri, config):
+    """SQLALCHEMY_ENGINE_OPTIONS for uri, from the DB_* settings in config.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_TIMEOUT size the pool per
+    worker process; DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING guard
+    against connections the server or a proxy closed while idle.
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and not is_sqlite_file(uri):
+        # In-memory databases keep Flask-SQLAlchemy's StaticPool
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if url.get_backend_name() == 'sqlite':
+        # A local file cannot go stale, and the busy timeout below covers
+        # what sqlite3's own connect timeout would
+        options['pool_pre_ping'] = False
+        options['pool_recycle'] = -1
+    return options
+
+
+def configure_engine(engine, config):
+    """Install per-connection setup on engine; call once after db.init_app."""
+    if engine.dialect.name != 'sqlite' or not config['DB_SQLITE_PRAGMAS']:
+        return
+
+    busy_timeout = config['DB_SQLITE_BUSY_TIMEOUT']
+    mmap_size = config['DB_SQLITE_MMAP_SIZE']
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a writer commits; NORMAL sync is
+        # durable across application crashes in WAL mode and avoids an fsync
+        # per commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.execute(f'PRAGMA mmap_size={mmap_size}')
+        cursor.close()
+
+
+def pool_status(engine):
+    """Current occupancy of engine's pool plus its own checkout wait totals."""
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checkedIn': pool.checkedin(),
+            'checkedOut': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    if isinstance(pool, TimedQueuePool):
+        status['wait'] = pool.wait_stats.snapshot()
+    return status
+
+
+def insert_ignore(session, model, values, index_elements=None):
+    """INSERT a row into model's table unless it conflicts with an existing one.
+
+    Runs in the session's transaction and returns True if the row was
+    inserted. Postgres and SQLite use ON CONFLICT DO NOTHING on the unique
+    index_elements (any constraint if None); other databases get a
+    savepoint and a caught IntegrityError.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        dialect_insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = dialect_insert(model).values(**values).on_conflict_do_nothing(index_elements=index_elements)
+        return session.execute(stmt).rowcount == 1
+    try:
+        with session.begin_nested():
+            session.execute(insert(model).values(**values))
+        return True
+    except IntegrityError:
+        return False
+
+
+def is_read(clause):
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() == 'SELECT'
+    return getattr(clause, 'is_select', False)
+
+
+class RoutingSession(Session):
+    """Session that sends the SELECTs of read-only requests to the replica.
+
+    A request reads from the replica when it is a GET, HEAD or OPTIONS and
+    its client has not written recently (see init_replica_routing); threads
+    working for it carry the choice over in g.use_replica. Everything else
+    goes to the primary: flushes, UPDATE/INSERT/DELETE statements, SELECTs
+    of other requests, and all work outside a request such as the
+    background senders and CLI commands. Once a request writes,
+    its later reads go to the primary too, so it sees its own changes.
+    A statement given an explicit bind keeps it; account_status passes the
+    primary so token checks never see a stale account.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or not is_read(clause):
+                if self._flushing or getattr(clause, 'is_dml', False):
+                    g.wrote_primary = True
+                    g.use_replica = False
+            elif g.get('use_replica'):
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_replica_routing(app):
+    """Route reads to the replica bind, pinning recent writers to the primary.
+
+    A response to a request that wrote sets PIN_COOKIE for
+    REPLICA_PIN_SECONDS; until it expires that client reads from the
+    primary, so it never sees the replica lag behind its own writes.
+    """
+    pin_seconds = app.config['REPLICA_PIN_SECONDS']
+
+    @app.before_request
+    def choose_database():
+        try:
+            pinned_until = float(request.cookies.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        g.use_replica = request.method in READ_ONLY_METHODS and pinned_until <= time.time()
+
+    @app.after_request
+    def pin_to_primary(response):
+        if g.get('wrote_primary') and pin_seconds > 0:
+            # The frontend is on another site, so the cookie has to be
+            # SameSite=None, which browsers only accept when Secure
+            response.set_cookie(PIN_COOKIE, f'{time.time() + pin_seconds:.3f}', max_age=pin_seconds,
+                                httponly=True, secure=True, samesite='None')
+        return response
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from models import db, User, Donation, Feedback
+
+YIELD_PER = 1000
+
+
+def donations_query():
+    return db.select(
+        Donation.id, Donation.amount, Donation.message,
+        Donation.payment_intent_id.label('paymentIntentId'),
+        Donation.user_id.label('userId'), User.email, Donation.created_at.label('createdAt')
+    ).join(User, User.id == Donation.user_id)
+
+
+def users_query():
+    return db.select(User.id, User.username, User.email, User.isActive)
+
+
+def feedback_query():
+    return db.select(
+        Feedback.id, Feedback.user_id.label('userId'), User.email, Feedback.message
+    ).outerjoin(User, User.id == Feedback.user_id)
+
+
+# resource name -> (model whose id orders and bounds the export, select
+# builder, timestamp column for date ranges or None if the rows have none)
+EXPORTS = {
+    'donations': (Donation, donations_query, Donation.created_at),
+    'users': (User, users_query, None),
+    'feedback': (Feedback, feedback_query, None),
+}
+
+
+def export_rows(resource, from_id=None, to_id=None, date_from=None, date_to=None):
+    """Yield (column names, row iterator) for an export.
+
+    date_from and date_to are dates, both inclusive; only resources with a
+    timestamp column accept them, and a date range is walked in timestamp
+    order on the (timestamp, id) index instead of sorting the whole range
+    by id. Rows come from a server-side cursor
+    (yield_per enables stream_results), so only one chunk of rows is held
+    in memory at a time.
+    """
+    model, build_query, timestamp = EXPORTS[resource]
+    stmt = build_query()
+    if from_id is not None:
+        stmt = stmt.where(model.id >= from_id)
+    if to_id is not None:
+        stmt = stmt.where(model.id <= to_id)
+    order_by = [model.id]
+    if date_from is not None:
+        stmt = stmt.where(timestamp >= datetime.combine(date_from, datetime.min.time()))
+    if date_to is not None:
+        stmt = stmt.where(timestamp < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if date_from is not None or date_to is not None:
+        order_by.insert(0, timestamp)
+    stmt = stmt.order_by(*order_by).execution_options(yield_per=YIELD_PER)
+
+    result = db.session.execute(stmt)
+    return list(result.keys()), result
+
+
+def render_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % YIELD_PER == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def render_ndjson(columns, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(dict(zip(columns, row)), default=lambda value: value.isoformat()))
+        if len(chunk) == YIELD_PER:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+RENDERERS = {
+    'csv': (render_csv, 'text/csv'),
+    'ndjson': (render_ndjson, 'application/x-ndjson'),
+}
@@ -1,4 +1,26 @@
 # extensions.py
-from flask_mail import Mail
+from flask import current_app
+from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
 
-mail = Mail()
+jwt = JWTManager()
+migrate = Migrate()
+
+_mail = None
+
+
+def get_mail():
+    """Return the Flask-Mail extension bound to the current app.
+
+    flask_mail is imported, and the app's mail settings read, the first
+    time an email is sent; only the outbox sender needs it.
+    """
+    global _mail
+    from flask_mail import Mail
+
+    if _mail is None:
+        _mail = Mail()
+    app = current_app._get_current_object()
+    if 'mail' not in app.extensions:
+        _mail.init_app(app)
+    return _mail
@@ -0,0 +1,90 @@
+"""Generate signed fake Stripe webhook events for local testing and load runs.
+
+Usage:
+    python fake_stripe.py --url http://localhost:5000/api/stripe/webhook \\
+        --email donor@example.com --count 1000 --duplicates 0.2
+
+The signing secret is read from STRIPE_WEBHOOK_SECRET, so the app and this
+script must share it.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import time
+import uuid
+
+
+def payment_intent_succeeded(email, amount, message='', intent_id=None, event_id=None):
+    """Build a payment_intent.succeeded event shaped like Stripe's."""
+    intent_id = intent_id or f"pi_fake_{uuid.uuid4().hex[:24]}"
+    return {
+        'id': event_id or f"evt_fake_{uuid.uuid4().hex[:24]}",
+        'object': 'event',
+        'api_version': '2024-06-20',
+        'created': int(time.time()),
+        'type': 'payment_intent.succeeded',
+        'livemode': False,
+        'data': {
+            'object': {
+                'id': intent_id,
+                'object': 'payment_intent',
+                'amount': amount * 100,
+                'amount_received': amount * 100,
+                'currency': 'usd',
+                'status': 'succeeded',
+                'receipt_email': None,
+                'metadata': {'email': email, 'message': message},
+            }
+        },
+    }
+
+
+def sign(payload, secret, timestamp=None):
+    """Return a Stripe-Signature header value for payload (a str)."""
+    timestamp = timestamp or int(time.time())
+    signed = f"{timestamp}.{payload}".encode()
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def signed_request(event, secret):
+    """Return (body, headers) ready to POST to the webhook endpoint."""
+    body = json.dumps(event)
+    return body, {'Content-Type': 'application/json', 'Stripe-Signature': sign(body, secret)}
+
+
+def main():
+    import requests
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000/api/stripe/webhook')
+    parser.add_argument('--email', required=True, help='email of an existing user')
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--duplicates', type=float, default=0.0,
+                        help='fraction of events to deliver a second time, as Stripe retries do')
+    args = parser.parse_args()
+
+    secret = os.environ['STRIPE_WEBHOOK_SECRET']
+    session = requests.Session()
+    latencies = []
+    for _ in range(args.count):
+        event = payment_intent_succeeded(args.email, random.randint(1, 500))
+        deliveries = 2 if random.random() < args.duplicates else 1
+        for _ in range(deliveries):
+            body, headers = signed_request(event, secret)
+            started = time.perf_counter()
+            response = session.post(args.url, data=body, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    latencies.sort()
+    print(f"Sent {len(latencies)} deliveries for {args.count} events; "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
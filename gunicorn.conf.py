@@ -0,0 +1,22 @@
+# gunicorn.conf.py -- read by gunicorn from the working directory
+import os
+import shutil
+import tempfile
+
+# Each worker writes its metrics here and /metrics merges them (see
+# metrics.py). Set before the app, and so prometheus_client, is imported;
+# the directory is emptied here rather than in on_starting because
+# --preload imports the app first.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'foodbridge-metrics')
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's gauges; its counters and histograms stay in
+    # the totals
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
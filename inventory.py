@@ -0,0 +1,77 @@
+"""Atomic stock adjustments for the pantry inventory.
+
+Quantities only ever change through a conditional UPDATE
+
+    UPDATE inventory SET quantity = quantity + :delta
+    WHERE id = :id AND quantity + :delta >= 0
+
+so the database applies each delta to the current value: concurrent intake
+and distribution never overwrite each other, and stock can't go negative.
+A batch runs in one transaction and is applied in id order, so two batches
+touching the same items lock them in the same order and can't deadlock on
+Postgres. On SQLite the first UPDATE takes the write lock straight away,
+rather than upgrading from a read lock that another writer may also hold.
+"""
+from models import db, Inventory
+
+MAX_ADJUSTMENTS = 1000
+
+
+class AdjustmentError(ValueError):
+    """Raised when a batch can't be applied; nothing in it is."""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+def parse_adjustments(data):
+    """Validate [{'id': int, 'delta': int}, ...] and merge repeated ids.
+
+    Returns {item id: net delta}.
+    """
+    adjustments = (data or {}).get('adjustments')
+    if not isinstance(adjustments, list) or not adjustments:
+        raise AdjustmentError("'adjustments' must be a non-empty list")
+    if len(adjustments) > MAX_ADJUSTMENTS:
+        raise AdjustmentError(f"At most {MAX_ADJUSTMENTS} adjustments per request")
+
+    deltas = {}
+    for position, adjustment in enumerate(adjustments):
+        item_id = adjustment.get('id') if isinstance(adjustment, dict) else None
+        delta = adjustment.get('delta') if isinstance(adjustment, dict) else None
+        # bool is an int subclass; reject true/false explicitly
+        if not isinstance(item_id, int) or isinstance(item_id, bool) or \
+                not isinstance(delta, int) or isinstance(delta, bool):
+            raise AdjustmentError(f"Adjustment {position} needs an integer 'id' and 'delta'")
+        deltas[item_id] = deltas.get(item_id, 0) + delta
+    return deltas
+
+
+def apply_adjustments(deltas):
+    """Apply {item id: delta} in the caller's transaction.
+
+    Returns {item id: new quantity}. Raises AdjustmentError (404 for an
+    unknown item, 409 for one without enough stock) after some of the
+    UPDATEs may have run, so the caller must roll back.
+    """
+    for item_id in sorted(deltas):
+        delta = deltas[item_id]
+        result = db.session.execute(
+            db.update(Inventory)
+            .where(Inventory.id == item_id, Inventory.quantity + delta >= 0)
+            .values(quantity=Inventory.quantity + delta),
+            execution_options={'synchronize_session': False}
+        )
+        if result.rowcount == 1:
+            continue
+        available = db.session.query(Inventory.quantity).filter(Inventory.id == item_id).scalar()
+        if available is None:
+            raise AdjustmentError(f"Inventory item {item_id} not found", status=404, id=item_id)
+        raise AdjustmentError(f"Not enough stock for inventory item {item_id}", status=409,
+                              id=item_id, quantity=available, delta=delta)
+
+    # Read back under the locks this transaction already holds
+    rows = db.session.query(Inventory.id, Inventory.quantity).filter(Inventory.id.in_(list(deltas)))
+    return dict(rows.all())
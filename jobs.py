@@ -0,0 +1,89 @@
+"""The maintenance jobs run by scheduler.py.
+
+Each step function handles one batch in the caller's transaction and
+returns (rows processed, checkpoint); the scheduler commits the batch with
+the checkpoint and stops after a batch of 0 rows.
+"""
+from datetime import datetime, timedelta
+
+from archive import archive_batch, due_events
+from cache import bump_version
+from models import db, Event, OutboxEmail, StripeEvent
+from scheduler import Job
+
+
+def complete_past_events(batch_size, checkpoint):
+    """Mark events dated before today (UTC) as completed, in id order.
+
+    The checkpoint is the last id looked at, so a run resumes where it
+    stopped and each batch is a range read of ix_event_completed_id.
+    """
+    after = checkpoint or 0
+    today = datetime.utcnow().date()
+    ids = [row.id for row in db.session.query(Event.id)
+           .filter(Event.completed == False, Event.id > after, Event.date < today)  # noqa: E712
+           .order_by(Event.id).limit(batch_size)]
+    if not ids:
+        return 0, after
+    db.session.execute(
+        db.update(Event)
+        .where(Event.id.in_(ids), Event.completed == False)  # noqa: E712
+        .values(completed=True, completed_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    )
+    bump_version('events')
+    return len(ids), ids[-1]
+
+
+# (model, status) of rows that are only kept for a while: delivered
+# emails and applied webhook events. Stripe redelivers an event for up to
+# three days, and a pruned event id would be processed again, so the
+# retention must stay well above that.
+PRUNABLE = (
+    (OutboxEmail, 'sent'),
+    (StripeEvent, 'processed'),
+)
+
+
+def prune_stale_rows(batch_size, retention_days, checkpoint):
+    """Delete delivered emails and processed webhook events older than retention_days.
+
+    The checkpoint is the index into PRUNABLE of the table being pruned.
+    """
+    # next_attempt_at is set when a row is claimed, before it was sent or
+    # processed, so rows older than the cutoff by it are older by that too;
+    # it is what the (status, next_attempt_at) indexes serve
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    position = checkpoint or 0
+    while position < len(PRUNABLE):
+        model, status = PRUNABLE[position]
+        ids = [row.id for row in db.session.query(model.id)
+               .filter(model.status == status, model.next_attempt_at < cutoff)
+               .order_by(model.next_attempt_at).limit(batch_size)]
+        if ids:
+            db.session.execute(db.delete(model).where(model.id.in_(ids)),
+                               execution_options={'synchronize_session': False})
+            return len(ids), position
+        position += 1
+    return 0, position
+
+
+def archive_completed_events(batch_size, older_than_days, checkpoint):
+    """One archive.py batch. Archived events leave the event table, so no checkpoint is needed."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    event_ids = due_events(cutoff, batch_size)
+    return (archive_batch(event_ids, cutoff) if event_ids else 0), None
+
+
+def maintenance_jobs(config):
+    """The jobs to schedule, with schedules and sizes from the app config."""
+    batch_size = config['JOB_BATCH_SIZE']
+    return [
+        Job('complete-past-events', config['COMPLETE_EVENTS_SCHEDULE'],
+            lambda checkpoint: complete_past_events(batch_size, checkpoint)),
+        Job('prune-stale-rows', config['PRUNE_SCHEDULE'],
+            lambda checkpoint: prune_stale_rows(batch_size, config['PRUNE_AFTER_DAYS'], checkpoint)),
+        Job('archive-events', config['ARCHIVE_SCHEDULE'],
+            lambda checkpoint: archive_completed_events(config['ARCHIVE_BATCH_SIZE'], config['ARCHIVE_AFTER_DAYS'],
+                                                        checkpoint)),
+    ]
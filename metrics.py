@@ -0,0 +1,201 @@
+"""Per-request SQL and timing instrumentation, exported for Prometheus.
+
+Every statement the engine runs during a request is counted and timed. The
+totals go out in a Server-Timing header, requests slower than
+SLOW_REQUEST_MS are logged with their slowest statement, and per-route
+latency histograms, SQL counters, pool gauges and scheduled job metrics
+are served on /metrics.
+
+Under gunicorn each worker keeps its own numbers. With
+PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py sets it) every worker
+writes them to files in that directory, and /metrics, whichever worker
+answers it, merges the files of all workers. The variable has to be set
+before prometheus_client is first imported.
+"""
+import os
+import time
+
+from flask import g, has_app_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from database import TimedQueuePool
+
+REQUEST_SECONDS = Histogram(
+    'foodbridge_request_duration_seconds', 'Time spent handling a request',
+    ['method', 'route']
+)
+REQUESTS = Counter(
+    'foodbridge_requests_total', 'Requests handled',
+    ['method', 'route', 'status']
+)
+SQL_STATEMENTS = Counter(
+    'foodbridge_sql_statements_total', 'SQL statements run while handling requests',
+    ['method', 'route']
+)
+SQL_SECONDS = Counter(
+    'foodbridge_sql_duration_seconds_total', 'Time spent in SQL while handling requests',
+    ['method', 'route']
+)
+POOL_WAIT_SECONDS = Histogram(
+    'foodbridge_db_pool_wait_seconds', 'Time spent waiting to check out a connection',
+    ['bind'], buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+# Gauges are summed over live workers; a dead worker's pool no longer exists
+POOL_SIZE = Gauge('foodbridge_db_pool_size', 'Connections the pools keep open', multiprocess_mode='livesum')
+POOL_CHECKED_OUT = Gauge('foodbridge_db_pool_checked_out', 'Connections in use', multiprocess_mode='livesum')
+POOL_CHECKED_IN = Gauge('foodbridge_db_pool_checked_in', 'Idle pooled connections', multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge('foodbridge_db_pool_overflow', 'Connections opened beyond pool_size',
+                      multiprocess_mode='livesum')
+JOB_SECONDS = Histogram(
+    'foodbridge_job_duration_seconds', 'Run time of scheduled jobs', ['job'],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+)
+JOB_ROWS = Counter('foodbridge_job_rows_total', 'Rows processed by scheduled jobs', ['job'])
+JOB_RUNS = Counter('foodbridge_job_runs_total', 'Scheduled job runs by outcome', ['job', 'status'])
+
+SLOWEST_SQL_CHARS = 500
+# Pool gauges are refreshed at most this often per process
+POOL_GAUGE_INTERVAL = 1.0
+
+# labels() takes a lock and builds a key on every call; the label sets are
+# few (routes x methods x statuses), so the children are kept here
+_route_children = {}
+_status_children = {}
+_pool_updated = 0.0
+
+
+def route_children(method, route):
+    key = (method, route)
+    children = _route_children.get(key)
+    if children is None:
+        children = _route_children[key] = (
+            REQUEST_SECONDS.labels(method, route),
+            SQL_STATEMENTS.labels(method, route),
+            SQL_SECONDS.labels(method, route),
+        )
+    return children
+
+
+def status_child(method, route, status):
+    key = (method, route, status)
+    child = _status_children.get(key)
+    if child is None:
+        child = _status_children[key] = REQUESTS.labels(method, route, status)
+    return child
+
+
+def update_pool_gauges(engine):
+    global _pool_updated
+    now = time.monotonic()
+    if now - _pool_updated < POOL_GAUGE_INTERVAL:
+        return
+    _pool_updated = now
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        POOL_SIZE.set(pool.size())
+        POOL_CHECKED_OUT.set(pool.checkedout())
+        POOL_CHECKED_IN.set(pool.checkedin())
+        POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Background workers run SQL outside any request; only requests, and
+    # threads timing their work for one (see dashboard.py), are timed
+    if not has_app_context() or 'metrics_started' not in g:
+        return
+    elapsed = time.perf_counter() - context._metrics_started
+    g.sql_count += 1
+    g.sql_seconds += elapsed
+    if elapsed > g.sql_slowest[0]:
+        g.sql_slowest = (elapsed, statement)
+
+
+def start_timer():
+    g.metrics_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+    g.sql_slowest = (0.0, None)
+
+
+def sql_timing():
+    """(statements, seconds, slowest) so far in this context's timer."""
+    return g.sql_count, g.sql_seconds, g.sql_slowest
+
+
+def add_sql_timing(count, seconds, slowest):
+    """Fold SQL that ran in another thread on the request's behalf into its totals."""
+    if 'metrics_started' not in g:
+        return
+    g.sql_count += count
+    g.sql_seconds += seconds
+    if slowest[0] > g.sql_slowest[0]:
+        g.sql_slowest = slowest
+
+
+def record_request(response, app, engine):
+    if 'metrics_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.metrics_started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+    request_seconds, sql_statements, sql_seconds = route_children(request.method, route)
+    request_seconds.observe(elapsed)
+    sql_statements.inc(g.sql_count)
+    sql_seconds.inc(g.sql_seconds)
+    status_child(request.method, route, response.status_code).inc()
+    update_pool_gauges(engine)
+
+    # Streamed responses keep running SQL after this point; the header and
+    # counters only cover what ran before the first byte
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={g.sql_seconds * 1000:.1f};desc="{g.sql_count} queries", app;dur={elapsed * 1000:.1f}'
+    )
+
+    if elapsed * 1000 >= app.config['SLOW_REQUEST_MS']:
+        slowest_seconds, slowest = g.sql_slowest
+        message = (f"Slow request {request.method} {request.path} {response.status_code}: "
+                   f"{elapsed * 1000:.1f} ms, {g.sql_count} queries in {g.sql_seconds * 1000:.1f} ms")
+        if slowest:
+            message += f"; slowest {slowest_seconds * 1000:.1f} ms: {' '.join(slowest.split())[:SLOWEST_SQL_CHARS]}"
+        app.logger.warning(message)
+    return response
+
+
+def instrument_engine(engine, bind):
+    """Count and time the statements engine runs during requests.
+
+    Checkout waits on its pool are observed under the given bind label.
+    """
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    if isinstance(engine.pool, TimedQueuePool):
+        observe = POOL_WAIT_SECONDS.labels(bind).observe
+        if observe not in engine.pool.wait_stats.observers:
+            engine.pool.wait_stats.observers.append(observe)
+
+
+def init_metrics(app, engine):
+    """Time every request on app and every statement on engine, the primary."""
+    instrument_engine(engine, 'primary')
+
+    app.before_request(start_timer)
+    app.after_request(lambda response: record_request(response, app, engine))
+
+
+def render_metrics():
+    """Return (body, content type) in the Prometheus text format."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
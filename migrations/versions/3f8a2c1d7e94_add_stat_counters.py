@@ -0,0 +1,34 @@
+"""Add stat counters
+
+Revision ID: 3f8a2c1d7e94
+Revises: 29244a3a01af
+Create Date: 2026-10-18 10:12:05.114392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a2c1d7e94'
+down_revision = '29244a3a01af'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stat',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Seed the counters from the current table contents
+    op.execute("INSERT INTO stat (name, value) SELECT 'users', COUNT(*) FROM \"user\"")
+    op.execute("INSERT INTO stat (name, value) SELECT 'donations', COALESCE(SUM(amount), 0) FROM donation")
+    op.execute("INSERT INTO stat (name, value) SELECT 'campaigns', COUNT(*) FROM event")
+    op.execute("INSERT INTO stat (name, value) SELECT 'members', COUNT(*) FROM member")
+
+
+def downgrade():
+    op.drop_table('stat')
@@ -0,0 +1,63 @@
+"""Event date as date
+
+Revision ID: 5b9e3f6a8c27
+Revises: eedacfeb2d38
+Create Date: 2026-10-18 15:02:44.318256
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e3f6a8c27'
+down_revision = 'eedacfeb2d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_date', sa.Date(), nullable=True))
+
+    # Backfill from the YYYY-MM-DD prefix of the old string column. Rows whose
+    # value is not a full date (earlier type changes left some as a bare
+    # year) are left NULL and listed below so they can be fixed by hand.
+    # SQLite is given the ISO string directly: CAST(... AS DATE) there is a
+    # numeric cast and would truncate the value to the year.
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        new_value = "substr(date, 1, 10)"
+    else:
+        new_value = "CAST(substr(date, 1, 10) AS DATE)"
+    op.execute(f"UPDATE event SET event_date = {new_value} WHERE date LIKE '____-__-__%'")
+
+    unparsed = bind.execute(sa.text("SELECT id, date FROM event WHERE event_date IS NULL")).fetchall()
+    for event_id, value in unparsed:
+        print(f"event {event_id}: could not convert date {value!r}, left NULL")
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_column('date')
+        batch_op.alter_column('event_date', new_column_name='date', existing_type=sa.Date(), existing_nullable=True)
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.create_index('ix_event_date_id', ['date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_date_id')
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_date', sa.String(length=10), nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        old_value = "date"
+    else:
+        old_value = "to_char(date, 'YYYY-MM-DD')"
+    op.execute(f"UPDATE event SET event_date = COALESCE({old_value}, '')")
+
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_column('date')
+        batch_op.alter_column('event_date', new_column_name='date', existing_type=sa.String(length=10), nullable=False)
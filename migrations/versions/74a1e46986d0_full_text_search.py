@@ -0,0 +1,64 @@
+"""Full text search
+
+Revision ID: 74a1e46986d0
+Revises: 47a61092271b
+Create Date: 2026-10-18 20:33:42.271812
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '74a1e46986d0'
+down_revision = '47a61092271b'
+branch_labels = None
+depends_on = None
+
+# Same indexes as search.py creates, frozen as of this revision
+SOURCES = {
+    'feedback': ('message',),
+    'reply': ('message',),
+    'event': ('name', 'description'),
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, columns in SOURCES.items():
+        names = ', '.join(columns)
+        if dialect == 'sqlite':
+            # FTS5 external-content index: the text stays in the source
+            # table, triggers keep the index in step with it
+            fts = f'{table}_fts'
+            new = ', '.join(f'new.{column}' for column in columns)
+            old = ', '.join(f'old.{column}' for column in columns)
+            op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', "
+                       f"content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')")
+            op.execute(f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN "
+                       f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END")
+            op.execute(f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN "
+                       f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END")
+            op.execute(f"CREATE TRIGGER {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN "
+                       f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+                       f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END")
+            op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif dialect == 'postgresql':
+            if len(columns) == 1:
+                vector = f"to_tsvector('english', {columns[0]})"
+            else:
+                vector = ' || '.join(f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')"
+                                     for column, weight in zip(columns, 'ABCD'))
+            op.execute(f"CREATE INDEX ix_{table}_search ON {table} USING gin (({vector}))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in SOURCES:
+        if dialect == 'sqlite':
+            fts = f'{table}_fts'
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{trigger}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
+        elif dialect == 'postgresql':
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search")
@@ -0,0 +1,26 @@
+"""Seed cache versions
+
+Revision ID: 8d41b7e2c6a0
+Revises: 3f8a2c1d7e94
+Create Date: 2026-10-18 11:03:47.520931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41b7e2c6a0'
+down_revision = '3f8a2c1d7e94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Response cache versions share the stat table with the dashboard counters
+    op.execute("INSERT INTO stat (name, value) VALUES ('version:members', 0)")
+    op.execute("INSERT INTO stat (name, value) VALUES ('version:events', 0)")
+
+
+def downgrade():
+    op.execute("DELETE FROM stat WHERE name IN ('version:members', 'version:events')")
@@ -0,0 +1,26 @@
+"""Seed accounts version
+
+Revision ID: c7e2a9d41f86
+Revises: 921038f5d2c4
+Create Date: 2026-10-19 09:12:38.204517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a9d41f86'
+down_revision = '921038f5d2c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bumped whenever an account is deactivated or its tokens revoked, so
+    # every worker drops its cached account status (see accounts.py)
+    op.execute("INSERT INTO stat (name, value) VALUES ('version:accounts', 0)")
+
+
+def downgrade():
+    op.execute("DELETE FROM stat WHERE name = 'version:accounts'")
@@ -0,0 +1,53 @@
+"""Stripe webhook events
+
+Revision ID: e7b04d9a2f15
+Revises: c52e9a0f13b8
+Create Date: 2026-10-18 13:41:12.660187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b04d9a2f15'
+down_revision = 'c52e9a0f13b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stripe_event',
+    sa.Column('id', sa.String(length=255), nullable=False),
+    sa.Column('type', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('received_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stripe_event', schema=None) as batch_op:
+        batch_op.create_index('ix_stripe_event_status_next_attempt_at', ['status', 'next_attempt_at'], unique=False)
+
+    # Drop duplicate donations left by client retries, keeping the first one,
+    # and recompute the donations total they were counted in
+    op.execute(
+        "DELETE FROM donation WHERE id NOT IN "
+        "(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM donation GROUP BY payment_intent_id) AS keep)"
+    )
+    op.execute("UPDATE stat SET value = (SELECT COALESCE(SUM(amount), 0) FROM donation) WHERE name = 'donations'")
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_donation_payment_intent_id', ['payment_intent_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_donation_payment_intent_id', type_='unique')
+
+    with op.batch_alter_table('stripe_event', schema=None) as batch_op:
+        batch_op.drop_index('ix_stripe_event_status_next_attempt_at')
+
+    op.drop_table('stripe_event')
@@ -0,0 +1,28 @@
+"""Donation created_at index
+
+Revision ID: f1d6b3a8e2c4
+Revises: c7e2a9d41f86
+Create Date: 2026-10-19 10:02:47.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d6b3a8e2c4'
+down_revision = 'c7e2a9d41f86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Date-range donation exports filter on created_at and read the range
+    # in (created_at, id) order
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.create_index('ix_donation_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('donation', schema=None) as batch_op:
+        batch_op.drop_index('ix_donation_created_at_id')
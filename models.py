@@ -1,8 +1,11 @@
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import verify_password
+from database import RoutingSession
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(db.Model):
@@ -11,10 +14,13 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     isActive = db.Column(db.Boolean, default=True)  # Added field for activation status
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped to revoke issued tokens
     donations = db.relationship('Donation', backref='donor', lazy=True)
     feedbacks_given = db.relationship('Feedback', backref='author', lazy=True)
     volunteers = db.relationship('Volunteer', backref='participant', lazy=True)
     replies = db.relationship('Reply', backref='user_replies', lazy=True)
+    # Serves the isActive filter on the paginated admin user list
+    __table_args__ = (db.Index('ix_user_isActive_id', 'isActive', 'id'),)
 
 
 class Donation(db.Model):
@@ -22,7 +28,15 @@ class Donation(db.Model):
     amount = db.Column(db.Integer, nullable=False)
     message = db.Column(db.String(255), nullable=True)
     payment_intent_id = db.Column(db.String(255), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_user_donation'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', name='fk_user_donation'), nullable=False, index=True)
+    # NULL for donations recorded before the column existed
+    created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    __table_args__ = (
+        # One donation per PaymentIntent, however many times it is reported
+        db.UniqueConstraint('payment_intent_id', name='uq_donation_payment_intent_id'),
+        # Date-range exports (?from=/?to=)
+        db.Index('ix_donation_created_at_id', 'created_at', 'id'),
+    )
 
     def _init_(self, amount, message, payment_intent_id, user_id):
         self.amount = amount
@@ -33,31 +47,45 @@ class Donation(db.Model):
 class Event(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    date = db.Column(db.String(10), nullable=False)  # Changed from db.Date to db.String
+    date = db.Column(db.Date, nullable=True)  # NULL only for legacy rows whose string date could not be converted
     location = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     picture_url = db.Column(db.String(200), nullable=True)
     completed = db.Column(db.Boolean, default=False)
+    capacity = db.Column(db.Integer, nullable=True)  # NULL: no limit on volunteers
+    # Confirmed volunteers, kept in step by volunteers.py's conditional UPDATEs
+    seats_taken = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed_at = db.Column(db.DateTime, nullable=True)  # archive.py moves events completed long enough ago
     volunteers = db.relationship('Volunteer', back_populates='event')
+    __table_args__ = (
+        db.Index('ix_event_completed_id', 'completed', 'id'),
+        db.Index('ix_event_name_id', 'name', 'id'),
+        db.Index('ix_event_date_id', 'date', 'id'),
+        db.Index('ix_event_completed_at_id', 'completed_at', 'id'),
+        # Archived events keep their ids, so SQLite must never reuse one
+        {'sqlite_autoincrement': True},
+    )
 
     def serialize(self):
         return {
             'id': self.id,
             'name': self.name,
-            'date': self.date,  # No need to format date here, it's already a string
+            'date': self.date.isoformat() if self.date else None,
             'location': self.location,
             'description': self.description,
             'picture_url': self.picture_url,
-            'completed': self.completed
+            'completed': self.completed,
+            'capacity': self.capacity
         }
 
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return verify_password(self.password, password)
 
 class Feedback(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -65,18 +93,80 @@ class Feedback(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user = db.relationship('User', back_populates='feedbacks_given')
     replies = db.relationship('Reply', back_populates='feedback')
+    __table_args__ = (db.Index('ix_feedback_user_id_id', 'user_id', 'id'),)
 
 class Inventory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     item_name = db.Column(db.String(100), nullable=False)
-    quantity = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)  # changed only through inventory.apply_adjustments
     description = db.Column(db.Text, nullable=True)
+    __table_args__ = (
+        db.CheckConstraint('quantity >= 0', name='ck_inventory_quantity_nonnegative'),
+        db.Index('ix_inventory_item_name_id', 'item_name', 'id'),
+    )
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'itemName': self.item_name,
+            'quantity': self.quantity,
+            'description': self.description
+        }
+
 class Volunteer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='confirmed', server_default='confirmed')  # or 'waitlisted'
     user = db.relationship('User', back_populates='volunteers')
     event = db.relationship('Event', back_populates='volunteers')
+    __table_args__ = (
+        db.Index('ix_volunteer_event_id_user_id', 'event_id', 'user_id', unique=True),
+        # Waitlist order: oldest sign-up first
+        db.Index('ix_volunteer_event_id_status_id', 'event_id', 'status', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+
+class ArchivedEvent(db.Model):
+    # Completed events moved out of the event table by archive.py, with
+    # their ids unchanged; read by the admin history endpoints
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=True)
+    location = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    picture_url = db.Column(db.String(200), nullable=True)
+    capacity = db.Column(db.Integer, nullable=True)
+    seats_taken = db.Column(db.Integer, nullable=False, default=0)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    volunteers = db.relationship('ArchivedVolunteer', back_populates='event')
+    __table_args__ = (
+        db.Index('ix_archived_event_name_id', 'name', 'id'),
+        db.Index('ix_archived_event_date_id', 'date', 'id'),
+    )
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'date': self.date.isoformat() if self.date else None,
+            'location': self.location,
+            'description': self.description,
+            'picture_url': self.picture_url,
+            'completed': True,
+            'capacity': self.capacity,
+            'archivedAt': self.archived_at.isoformat()
+        }
+
+class ArchivedVolunteer(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('archived_event.id'), nullable=False)
+    status = db.Column(db.String(10), nullable=False)
+    user = db.relationship('User')
+    event = db.relationship('ArchivedEvent', back_populates='volunteers')
+    __table_args__ = (db.Index('ix_archived_volunteer_event_id_status_id', 'event_id', 'status', 'id'),)
 
 class Member(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -84,11 +174,106 @@ class Member(db.Model):
     position = db.Column(db.String(100), nullable=False)
     image_url = db.Column(db.String(255), nullable=True)
 
+class Stat(db.Model):
+    # Running totals for the admin dashboard, adjusted in the same
+    # transaction as the write they count (see stats.py)
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class DonationRollup(db.Model):
+    # Donation totals per day, week and month, updated with each donation
+    # by payments.record_donation (see analytics.py)
+    granularity = db.Column(db.String(5), primary_key=True)  # day, week or month
+    bucket = db.Column(db.Date, primary_key=True)  # first day of the period
+    amount = db.Column(db.BigInteger, nullable=False, default=0)
+    donations = db.Column(db.Integer, nullable=False, default=0)
+    donors = db.Column(db.Integer, nullable=False, default=0)  # distinct donors
+
+class DonorRollup(db.Model):
+    # The same totals per donor; a new row here is what counts a donor once
+    # per period in DonationRollup.donors
+    granularity = db.Column(db.String(5), primary_key=True)
+    bucket = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    amount = db.Column(db.BigInteger, nullable=False, default=0)
+    donations = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.Index('ix_donor_rollup_granularity_user_id_bucket', 'granularity', 'user_id', 'bucket'),)
+
+class OutboxEmail(db.Model):
+    # Emails are queued here by request handlers and delivered by the
+    # background sender in outbox.py
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, sent or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (db.Index('ix_outbox_email_status_next_attempt_at', 'status', 'next_attempt_at'),)
+
+class StripeEvent(db.Model):
+    # Webhook deliveries, stored on receipt and processed in the background
+    # by payments.py; the Stripe event id as primary key makes redelivery a no-op
+    id = db.Column(db.String(255), primary_key=True)
+    type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, processed or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (db.Index('ix_stripe_event_status_next_attempt_at', 'status', 'next_attempt_at'),)
+
+class ScheduledJob(db.Model):
+    # One row per maintenance job in jobs.py; the lease columns let only
+    # one worker run a job at a time (see scheduler.py)
+    name = db.Column(db.String(50), primary_key=True)
+    schedule = db.Column(db.String(100), nullable=False)  # cron expression, UTC
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    lease_owner = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    checkpoint = db.Column(db.Text, nullable=True)  # JSON; where an interrupted run resumes
+    last_started_at = db.Column(db.DateTime, nullable=True)
+    last_finished_at = db.Column(db.DateTime, nullable=True)
+    last_status = db.Column(db.String(10), nullable=True)  # ok or failed
+    last_rows = db.Column(db.Integer, nullable=True)
+    last_duration_ms = db.Column(db.Integer, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    def serialize(self):
+        def iso(value):
+            return value.isoformat() if value else None
+        return {
+            'name': self.name,
+            'schedule': self.schedule,
+            'nextRunAt': iso(self.next_run_at),
+            'running': self.lease_expires_at is not None and self.lease_expires_at > datetime.utcnow(),
+            'lastStartedAt': iso(self.last_started_at),
+            'lastFinishedAt': iso(self.last_finished_at),
+            'lastStatus': self.last_status,
+            'lastRows': self.last_rows,
+            'lastDurationMs': self.last_duration_ms,
+            'lastError': self.last_error
+        }
+
 class Reply(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    feedback_id = db.Column(db.Integer, db.ForeignKey('feedback.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    feedback_id = db.Column(db.Integer, db.ForeignKey('feedback.id'), nullable=False, index=True)
     message = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.now())
     user = db.relationship('User', back_populates='replies')
     feedback = db.relationship('Feedback', back_populates='replies')
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'userId': self.user_id,
+            'feedbackId': self.feedback_id,
+            'message': self.message,
+            'createdAt': self.created_at.isoformat() if self.created_at else None
+        }
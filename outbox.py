@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from extensions import get_mail
+from models import db, OutboxEmail
+from workers import BackgroundWorker
+
+RETRY_MAX_SECONDS = 3600
+# How long a claimed message stays invisible to other senders; if the
+# sender dies mid-batch the message becomes due again after this
+CLAIM_SECONDS = 300
+
+
+def enqueue_email(to, subject, body):
+    """Queue an email; it is written when the caller commits."""
+    email = OutboxEmail(recipient=to, subject=subject, body=body)
+    db.session.add(email)
+    return email
+
+
+def queue_depth():
+    """Count queued emails by status (pending and failed)."""
+    rows = db.session.query(OutboxEmail.status, db.func.count(OutboxEmail.id)) \
+        .filter(OutboxEmail.status.in_(('pending', 'failed'))) \
+        .group_by(OutboxEmail.status).all()
+    depth = {'pending': 0, 'failed': 0}
+    depth.update(dict(rows))
+    return depth
+
+
+def retry_delay(attempts):
+    base = current_app.config['OUTBOX_RETRY_BASE_SECONDS']
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_batch(limit=None):
+    """Claim up to limit (default OUTBOX_BATCH_SIZE) due emails for this sender.
+
+    Each row is claimed with a conditional UPDATE that pushes its
+    next_attempt_at into the future, so several workers can poll the
+    outbox without sending the same email twice.
+    """
+    now = datetime.utcnow()
+    candidates = db.session.query(OutboxEmail.id) \
+        .filter(OutboxEmail.status == 'pending', OutboxEmail.next_attempt_at <= now) \
+        .order_by(OutboxEmail.next_attempt_at, OutboxEmail.id) \
+        .limit(limit or current_app.config['OUTBOX_BATCH_SIZE']).all()
+
+    claimed = []
+    for (email_id,) in candidates:
+        result = db.session.execute(
+            db.update(OutboxEmail)
+            .where(OutboxEmail.id == email_id,
+                   OutboxEmail.status == 'pending',
+                   OutboxEmail.next_attempt_at <= now)
+            .values(next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS),
+                    attempts=OutboxEmail.attempts + 1),
+            execution_options={'synchronize_session': False}
+        )
+        if result.rowcount == 1:
+            claimed.append(email_id)
+    db.session.commit()
+    return OutboxEmail.query.filter(OutboxEmail.id.in_(claimed)).order_by(OutboxEmail.id).all() if claimed else []
+
+
+def record_failure(email, error):
+    email.last_error = str(error)
+    if email.attempts >= current_app.config['OUTBOX_MAX_ATTEMPTS']:
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = datetime.utcnow() + retry_delay(email.attempts)
+
+
+def send_pending(limit=None):
+    """Deliver one batch of due emails over a single SMTP connection.
+
+    Returns the number of emails sent.
+    """
+    batch = claim_batch(limit)
+    if not batch:
+        return 0
+
+    from flask_mail import Message
+
+    mail = get_mail()
+    sent = 0
+    handled = set()
+    try:
+        with mail.connect() as connection:
+            for email in batch:
+                try:
+                    connection.send(Message(email.subject, recipients=[email.recipient], body=email.body))
+                except Exception as e:
+                    record_failure(email, e)
+                else:
+                    email.status = 'sent'
+                    email.sent_at = datetime.utcnow()
+                    email.last_error = None
+                    sent += 1
+                handled.add(email.id)
+    except Exception as e:
+        # Could not connect: schedule a retry for everything not yet handled
+        for email in batch:
+            if email.id not in handled:
+                record_failure(email, e)
+    db.session.commit()
+    return sent
+
+
+worker = None
+
+
+def init_outbox(app, poll_interval=10):
+    global worker
+    worker = BackgroundWorker(app, send_pending, 'outbox-sender', poll_interval)
+    return worker
+
+
+def wake_sender():
+    """Nudge the background sender after committing new emails."""
+    if worker is not None:
+        worker.wake()
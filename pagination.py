@@ -0,0 +1,164 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from flask import request, jsonify
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    """Raised when the pagination query string is malformed."""
+
+
+def encode_cursor(sort, value, last_id):
+    """Encode the position of the last row of a page as an opaque string."""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    payload = json.dumps({'s': sort, 'v': value, 'id': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Decode a cursor produced by encode_cursor for the given sort order."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = payload['v'], int(payload['id'])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise PaginationError("Invalid cursor")
+    if payload.get('s') != sort:
+        raise PaginationError("Cursor does not match the requested sort order")
+    return value, last_id
+
+
+def parse_bool_arg(name):
+    """Read an optional true/false query string argument."""
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    lowered = raw.lower()
+    if lowered in ('true', '1'):
+        return True
+    if lowered in ('false', '0'):
+        return False
+    raise PaginationError(f"'{name}' must be true or false")
+
+
+def parse_limit():
+    raw = request.args.get('limit')
+    if raw is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise PaginationError("'limit' must be an integer")
+    if limit < 1:
+        raise PaginationError("'limit' must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_sort(sortable, default_sort):
+    """Read ?sort=; returns (field, descending)."""
+    sort = request.args.get('sort', default_sort)
+    field = sort.lstrip('-')
+    if field not in sortable:
+        raise PaginationError(f"Cannot sort by '{field}'")
+    return field, sort.startswith('-')
+
+
+def keyset_page(query, model, field, descending, limit):
+    """Up to limit rows of query that follow the ?after= cursor, in sort order.
+
+    Rows whose sort value is NULL come after all the others in either
+    direction, ordered by id; a cursor among them carries a null value.
+    Each part is read through the (column, id) index on its own.
+    """
+    sort = f"{'-' if descending else ''}{field}"
+    column = getattr(model, field)
+    pk = model.id
+    nulls = query.filter(column.is_(None)) if column.nullable and field != 'id' else None
+
+    value = last_id = None
+    after = request.args.get('after')
+    if after:
+        value, last_id = decode_cursor(after, sort)
+        if value is None and nulls is None:
+            raise PaginationError("Invalid cursor")
+        if value is not None and column.type.python_type in (date, datetime):
+            try:
+                value = column.type.python_type.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise PaginationError("Invalid cursor")
+
+    rows = []
+    if not after or value is not None:
+        if nulls is not None:
+            query = query.filter(column.isnot(None))
+        if after and field == 'id':
+            query = query.filter(pk < last_id if descending else pk > last_id)
+        elif after and descending:
+            query = query.filter(or_(column < value, and_(column == value, pk < last_id)))
+        elif after:
+            query = query.filter(or_(column > value, and_(column == value, pk > last_id)))
+        order = [column, pk] if field != 'id' else [pk]
+        query = query.order_by(*[c.desc() if descending else c.asc() for c in order])
+        rows = query.limit(limit).all()
+        # The NULL rows start from their beginning
+        last_id = None
+
+    if nulls is not None and len(rows) < limit:
+        if last_id is not None:
+            nulls = nulls.filter(pk < last_id if descending else pk > last_id)
+        nulls = nulls.order_by(pk.desc() if descending else pk.asc())
+        rows.extend(nulls.limit(limit - len(rows)).all())
+    return rows
+
+
+def paginate(query, model, sortable=('id',), default_sort='id'):
+    """Apply ?sort=, ?after= and ?limit= to query using keyset pagination.
+
+    `sortable` lists the columns clients may sort by; prefix the value with
+    '-' for descending order. The primary key breaks ties, so the ordering is
+    total and the cursor stays stable while rows are inserted. Rows with a
+    NULL sort value come last, in id order.
+    Returns the page of rows and the cursor for the next page (or None).
+    """
+    return paginate_merged([(query, model)], sortable, default_sort)
+
+
+def paginate_merged(sources, sortable=('id',), default_sort='id'):
+    """paginate() over several (query, model) pairs as if they were one table.
+
+    The models must share the sortable columns, and no id may appear in
+    more than one of them (e.g. a table and its archive). Each query reads
+    one page through its own indexes and the pages are merged.
+    """
+    field, descending = parse_sort(sortable, default_sort)
+    limit = parse_limit()
+    rows = []
+    for query, model in sources:
+        rows.extend(keyset_page(query, model, field, descending, limit + 1))
+    if len(sources) > 1:
+        # NULLs last in both directions, as keyset_page returns them
+        rows.sort(key=lambda row: ((getattr(row, field) is None) != descending, getattr(row, field), row.id),
+                  reverse=descending)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        sort = f"{'-' if descending else ''}{field}"
+        next_cursor = encode_cursor(sort, getattr(last, field), last.id)
+    return rows, next_cursor
+
+
+def page_response(payload, next_cursor):
+    """jsonify a page, advertising the next cursor in the X-Next-Cursor header."""
+    response = jsonify(payload)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -0,0 +1,121 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from config import Config
+
+# The PASSWORD_HASH_* settings (see config.py), replaced by the app's own
+# in init_passwords. Stored hashes made with another method or cost are
+# upgraded the next time their owner logs in.
+HASH_METHOD = Config.PASSWORD_HASH_METHOD
+POOL_SIZE = Config.PASSWORD_HASH_WORKERS
+MAX_PENDING = Config.PASSWORD_HASH_MAX_PENDING
+TIMEOUT = 30
+# By the time the pool starts, the outbox, Stripe and scheduler threads are
+# running; forking a threaded process can copy a lock one of them held, so
+# the hashing processes come from a fork server, or are spawned
+MP_CONTEXT = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class HashingOverloaded(RuntimeError):
+    """Raised when every hashing slot is taken."""
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(MAX_PENDING)
+_method_prefix = None
+
+
+def init_passwords(app):
+    """Use the app's PASSWORD_HASH_* settings; create_app calls it."""
+    global HASH_METHOD, POOL_SIZE, MAX_PENDING, _pool, _pending, _method_prefix
+    with _pool_lock:
+        HASH_METHOD = app.config['PASSWORD_HASH_METHOD']
+        _method_prefix = None
+        if app.config['PASSWORD_HASH_MAX_PENDING'] != MAX_PENDING:
+            MAX_PENDING = app.config['PASSWORD_HASH_MAX_PENDING']
+            _pending = threading.BoundedSemaphore(MAX_PENDING)
+        if app.config['PASSWORD_HASH_WORKERS'] != POOL_SIZE:
+            POOL_SIZE = app.config['PASSWORD_HASH_WORKERS']
+            if _pool is not None and _pool_pid == os.getpid():
+                _pool.shutdown(wait=False)
+            _pool = None
+
+
+def get_pool():
+    """Return this process's hashing pool, creating it on first use.
+
+    Created lazily, and again after a fork, so a gunicorn master loaded
+    with --preload never hands a broken pool to its workers.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(max_workers=POOL_SIZE, mp_context=multiprocessing.get_context(MP_CONTEXT))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def run(fn, *args):
+    if POOL_SIZE == 0:
+        return fn(*args)
+    # Shed the request rather than queue it; the caller answers 503
+    if not _pending.acquire(blocking=False):
+        raise HashingOverloaded("Too many password hashes in progress")
+    try:
+        return get_pool().submit(fn, *args).result(timeout=TIMEOUT)
+    finally:
+        _pending.release()
+
+
+def hash_password(password):
+    return run(generate_password_hash, password, HASH_METHOD)
+
+
+def hash_passwords(passwords):
+    """Hash several passwords at once, spread across the pool.
+
+    Works in rounds of at most POOL_SIZE hashes, each holding a slot of the
+    same bound as logins, so a bulk import neither overruns it nor takes
+    every slot.
+    """
+    if POOL_SIZE == 0:
+        return [generate_password_hash(password, HASH_METHOD) for password in passwords]
+    hashes = []
+    remaining = list(passwords)
+    while remaining:
+        slots = 0
+        while slots < min(len(remaining), POOL_SIZE) and _pending.acquire(blocking=False):
+            slots += 1
+        if not slots:
+            raise HashingOverloaded("Too many password hashes in progress")
+        try:
+            futures = [get_pool().submit(generate_password_hash, password, HASH_METHOD)
+                       for password in remaining[:slots]]
+            hashes.extend(future.result(timeout=TIMEOUT) for future in futures)
+        finally:
+            for _ in range(slots):
+                _pending.release()
+        remaining = remaining[slots:]
+    return hashes
+
+
+def verify_password(stored_hash, password):
+    return run(check_password_hash, stored_hash, password)
+
+
+def needs_rehash(stored_hash):
+    """True if stored_hash was made with a different method or cost."""
+    global _method_prefix
+    if _method_prefix is None:
+        # werkzeug spells out default parameters in the stored prefix
+        # ('pbkdf2:sha256' becomes 'pbkdf2:sha256:600000'), so derive the
+        # expected prefix from a real hash
+        _method_prefix = generate_password_hash('', HASH_METHOD).split('$', 1)[0]
+    return stored_hash.split('$', 1)[0] != _method_prefix
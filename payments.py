@@ -0,0 +1,156 @@
+import json
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from database import insert_ignore
+from models import db, Donation, StripeEvent, User
+from stats import increment_stat
+from analytics import record_rollups
+from workers import BackgroundWorker
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+CLAIM_SECONDS = 300
+
+# Event types we act on; anything else is acknowledged and dropped
+HANDLED_EVENTS = ('payment_intent.succeeded',)
+
+
+def get_stripe():
+    """Return the stripe module configured with the app's secret key.
+
+    Imported on first use: stripe's resource tree is the slowest import in
+    the app, and only the payment routes need it.
+    """
+    import stripe
+    stripe.api_key = current_app.config['STRIPE_SECRET_KEY']
+    if current_app.config.get('STRIPE_API_BASE'):
+        # e.g. a local stripe-mock, or the stub in benchmarks/endpoints.py
+        stripe.api_base = current_app.config['STRIPE_API_BASE']
+    return stripe
+
+
+def record_donation(user_id, amount, payment_intent_id, message='', created_at=None):
+    """Insert a donation unless one already exists for the PaymentIntent.
+
+    Runs in the caller's transaction and bumps the donations counter and
+    the time-series rollups only when a row was actually inserted. Returns
+    True if it was.
+    """
+    created_at = created_at or datetime.utcnow()
+    values = {'user_id': user_id, 'amount': amount, 'payment_intent_id': payment_intent_id, 'message': message,
+              'created_at': created_at}
+    inserted = insert_ignore(db.session, Donation, values, ['payment_intent_id'])
+    if inserted:
+        increment_stat('donations', amount)
+        record_rollups(user_id, amount, created_at)
+    return inserted
+
+
+def ingest_event(event):
+    """Store a verified webhook event for background processing.
+
+    Returns False if the event was already received (Stripe retries
+    deliveries until it gets a 2xx) or is of a type we ignore.
+    """
+    if event['type'] not in HANDLED_EVENTS:
+        return False
+    if db.session.get(StripeEvent, event['id']) is not None:
+        return False
+    db.session.add(StripeEvent(id=event['id'], type=event['type'], payload=json.dumps(event)))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # The same event raced in on another worker
+        db.session.rollback()
+        return False
+    return True
+
+
+def handle_payment_intent_succeeded(intent):
+    metadata = intent.get('metadata') or {}
+    email = metadata.get('email') or intent.get('receipt_email')
+    if not email:
+        raise ValueError(f"PaymentIntent {intent['id']} has no donor email")
+
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise ValueError(f"User with email {email} not found")
+
+    amount = (intent.get('amount_received') or intent['amount']) // 100  # Stripe reports cents
+    # Date the donation by the PaymentIntent, not by when a retry got through
+    created_at = datetime.utcfromtimestamp(intent['created']) if intent.get('created') else None
+    record_donation(user.id, amount, intent['id'], metadata.get('message', ''), created_at)
+
+
+def claim_events(limit=None):
+    """Claim due events with conditional UPDATEs, as outbox.claim_batch does.
+
+    limit defaults to STRIPE_EVENT_BATCH_SIZE.
+    """
+    now = datetime.utcnow()
+    candidates = db.session.query(StripeEvent.id) \
+        .filter(StripeEvent.status == 'pending', StripeEvent.next_attempt_at <= now) \
+        .order_by(StripeEvent.next_attempt_at) \
+        .limit(limit or current_app.config['STRIPE_EVENT_BATCH_SIZE']).all()
+
+    claimed = []
+    for (event_id,) in candidates:
+        result = db.session.execute(
+            db.update(StripeEvent)
+            .where(StripeEvent.id == event_id,
+                   StripeEvent.status == 'pending',
+                   StripeEvent.next_attempt_at <= now)
+            .values(next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS),
+                    attempts=StripeEvent.attempts + 1),
+            execution_options={'synchronize_session': False}
+        )
+        if result.rowcount == 1:
+            claimed.append(event_id)
+    db.session.commit()
+    return claimed
+
+
+def process_events(limit=None):
+    """Apply one batch of stored webhook events, one transaction per event.
+
+    Returns the number of events handled (successfully or not).
+    """
+    claimed = claim_events(limit)
+    for event_id in claimed:
+        stripe_event = db.session.get(StripeEvent, event_id)
+        try:
+            payload = json.loads(stripe_event.payload)
+            if stripe_event.type == 'payment_intent.succeeded':
+                handle_payment_intent_succeeded(payload['data']['object'])
+            stripe_event.status = 'processed'
+            stripe_event.processed_at = datetime.utcnow()
+            stripe_event.last_error = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            stripe_event = db.session.get(StripeEvent, event_id)
+            stripe_event.last_error = str(e)
+            if stripe_event.attempts >= current_app.config['STRIPE_EVENT_MAX_ATTEMPTS']:
+                stripe_event.status = 'failed'
+            else:
+                delay = min(RETRY_BASE_SECONDS * 2 ** (stripe_event.attempts - 1), RETRY_MAX_SECONDS)
+                stripe_event.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            db.session.commit()
+    return len(claimed)
+
+
+worker = None
+
+
+def init_payments(app, poll_interval=10):
+    global worker
+    worker = BackgroundWorker(app, process_events, 'stripe-events', poll_interval)
+    return worker
+
+
+def wake_processor():
+    if worker is not None:
+        worker.wake()
@@ -0,0 +1,308 @@
+"""Query-plan regression audit.
+
+Drives every route through the Flask test client, captures the SQL they
+issue and runs EXPLAIN on each statement (EXPLAIN QUERY PLAN on SQLite,
+EXPLAIN (FORMAT JSON) on Postgres). A statement that has to read a whole
+table is reported as a regression, unless the request that issued it is
+listed in FULL_READS, and so is a route the audit never called. Run it
+with 'flask audit-query-plans'. The routes insert their own fixture rows,
+so the audit runs on a scratch database that scratch_app builds with the
+migrations: a temporary SQLite file, or an empty database given with
+--database-uri.
+"""
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+from flask import has_request_context, request, request_finished
+from flask_migrate import upgrade
+from sqlalchemy import event
+from sqlalchemy.sql import visitors
+
+from config import Config
+from models import db, Admin
+from passwords import hash_password
+from accounts import create_token
+from fake_stripe import payment_intent_succeeded, signed_request
+
+AUDIT_ADMIN = 'query-plan-audit@example.com'
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Tables that stay small enough that a scan is cheaper than an index
+SMALL_TABLES = {'member', 'admin', 'stat', 'alembic_version', 'scheduled_job'}
+
+# Requests (method, path and query string) that read whole tables on
+# purpose; their scans are not regressions. Anything narrower, such as an
+# export bounded by id or date, must still use an index.
+FULL_READS = {
+    'GET /api/admin/export/donations?format=csv',
+    'GET /api/admin/export/users?format=csv',
+    'GET /api/admin/export/feedback?format=ndjson',
+}
+
+
+def filtered_tables(clause):
+    """Names of the tables a statement's WHERE clauses constrain.
+
+    Returns None when the statement was plain SQL text; the caller then has
+    to assume every table is filtered.
+    """
+    if not hasattr(clause, 'get_children'):
+        return None
+    tables = set()
+    for node in visitors.iterate(clause):
+        where = getattr(node, 'whereclause', None)
+        if where is None:
+            continue
+        for element in visitors.iterate(where):
+            table = getattr(element, 'table', None)
+            # An alias names both itself and the table underneath
+            while table is not None:
+                if getattr(table, 'name', None):
+                    tables.add(table.name)
+                table = getattr(table, 'element', None)
+    return tables
+
+
+@contextmanager
+def capture_statements(engine):
+    """Collect (statement, parameters, filtered tables, request) for every SELECT/UPDATE/DELETE run.
+
+    request is the 'METHOD /path?query' that issued the statement, or None
+    outside a request.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE') and not executemany:
+            compiled = getattr(context, 'compiled', None)
+            filtered = filtered_tables(compiled.statement) if compiled is not None else None
+            source = f"{request.method} {request.full_path.rstrip('?')}" if has_request_context() else None
+            statements.append((statement, parameters, filtered, source))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def sqlite_full_scans(connection, statement, parameters, filtered):
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    details = [row[-1] for row in rows]
+    # A scan that already returns rows in ORDER BY order stops at the LIMIT,
+    # but only if nothing filters the table; otherwise it may read every
+    # row looking for matches, and the predicate needs a SEARCH on an index
+    bounded = ' LIMIT ' in statement.upper() and not any('TEMP B-TREE' in d for d in details)
+    scans = []
+    for detail in details:
+        if not detail.startswith('SCAN '):
+            continue
+        table = detail.split()[1]
+        # FTS5 marks a MATCH constraint with M in the index string; such a
+        # "scan" reads the full-text index, not the table
+        if 'VIRTUAL TABLE INDEX' in detail and ':M' in detail:
+            continue
+        if table in SMALL_TABLES or (bounded and filtered is not None and table not in filtered):
+            continue
+        scans.append(detail)
+    return scans
+
+
+def postgres_full_scans(connection, statement, parameters, filtered):
+    # With sequential scans disabled the planner picks any usable index, so
+    # a Seq Scan left in the plan means no index can serve the predicate
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') not in SMALL_TABLES:
+            scans.append(f"Seq Scan on {node['Relation Name']}")
+        nodes.extend(node.get('Plans', []))
+    return scans
+
+
+@contextmanager
+def scratch_app(database_uri=None):
+    """An app, with its context pushed, on a freshly migrated database.
+
+    Without database_uri the database is a temporary SQLite file, removed
+    afterwards. A database_uri must point at an empty database the audit
+    may write to; its rows are left in place.
+    """
+    from app import create_app
+
+    workdir = None
+    if database_uri is None:
+        workdir = tempfile.mkdtemp(prefix='foodbridge-audit-')
+        database_uri = f"sqlite:///{os.path.join(workdir, 'audit.db')}"
+
+    class AuditConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        REPLICA_DATABASE_URI = None
+        OUTBOX_WORKER = False
+        STRIPE_EVENT_WORKER = False
+        SCHEDULER_WORKER = False
+        STRIPE_WEBHOOK_SECRET = 'whsec_' + secrets.token_hex(16)
+        METRICS_TOKEN = None
+
+    app = create_app(AuditConfig)
+    try:
+        with app.app_context():
+            upgrade(directory=MIGRATIONS)
+            try:
+                yield app
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def route_requests(client, headers, password, admin_id):
+    """Exercise each route, including its filter, sort and cursor variants."""
+    tag = uuid.uuid4().hex[:8]
+    email = f'audit-{tag}@example.com'
+
+    client.post('/api/auth/register', json={'username': f'audit-{tag}', 'email': email, 'password': password})
+    login = client.post('/api/auth/login', json={'email': email, 'password': password}).get_json()
+    client.post('/api/admin/login', json={'email': AUDIT_ADMIN, 'password': password})
+    client.post('/api/check-email', json={'email': email})
+    client.post('/api/feedback', json={'email': email, 'message': 'audit'})
+    client.post('/api/save-donation', json={'amount': 1, 'paymentIntentId': f'pi_audit_{tag}', 'email': email})
+    client.get('/api/donations', headers={'Authorization': f"Bearer {login['access_token']}"})
+    # Rejected before it reaches Stripe's API
+    client.post('/api/create-payment-intent', json={})
+    body, stripe_headers = signed_request(payment_intent_succeeded(email, 1),
+                                          client.application.config['STRIPE_WEBHOOK_SECRET'])
+    client.post('/api/stripe/webhook', data=body, headers=stripe_headers)
+    client.get('/')
+    client.get('/metrics')
+
+    member = client.post('/api/admin/members', json={'name': 'audit', 'position': 'audit'}, headers=headers).get_json()
+    client.post('/api/admin/events', json={'name': 'audit', 'date': '2030-01-01', 'location': 'audit'}, headers=headers)
+
+    users = client.get('/api/admin/users?limit=1', headers=headers)
+    user_id = users.get_json()[0]['id']
+    client.get(f"/api/admin/users?limit=1&after={users.headers.get('X-Next-Cursor', '')}", headers=headers)
+    client.get('/api/admin/users?isActive=true&sort=-username', headers=headers)
+    client.put(f'/api/admin/users/{user_id}/status', json={'isActive': True}, headers=headers)
+
+    events = client.get('/api/admin/events?limit=1', headers=headers)
+    event_id = events.get_json()[0]['id']
+    client.get(f"/api/admin/events?limit=1&after={events.headers.get('X-Next-Cursor', '')}", headers=headers)
+    client.get('/api/admin/events?completed=false&sort=name', headers=headers)
+    client.get('/api/events/incomplete')
+    client.get('/api/events?from=2030-01-01&to=2030-12-31')
+    page = client.get('/api/events?upcoming=true&limit=1')
+    client.get(f"/api/events?upcoming=true&limit=1&after={page.headers.get('X-Next-Cursor', '')}")
+    user_headers = {'Authorization': f"Bearer {login['access_token']}"}
+    client.put(f'/api/admin/events/{event_id}/capacity', json={'capacity': 0}, headers=headers)
+    client.post(f'/api/events/{event_id}/volunteers', headers=user_headers)
+    client.put(f'/api/admin/events/{event_id}/capacity', json={'capacity': None}, headers=headers)
+    client.get(f'/api/events/{event_id}/seats')
+    client.get(f'/api/admin/events/{event_id}/volunteers?status=confirmed', headers=headers)
+    client.delete(f'/api/events/{event_id}/volunteers', headers=user_headers)
+    client.patch(f'/api/admin/events/{event_id}/complete', headers=headers)
+
+    feedback = client.get('/api/admin/feedback?limit=1', headers=headers).get_json()['feedback']
+    if feedback:
+        client.post('/api/admin/feedback/reply', json={
+            'userId': feedback[0]['userId'], 'userEmail': feedback[0]['email'],
+            'feedbackId': feedback[0]['id'], 'reply': 'audit'}, headers=headers)
+        client.get(f"/api/admin/feedback?userId={feedback[0]['userId']}", headers=headers)
+    client.get('/api/admin/search?q=audit', headers=headers)
+
+    item = client.post('/api/admin/inventory', json={'itemName': 'audit', 'quantity': 1}, headers=headers).get_json()
+    client.get('/api/admin/inventory?sort=item_name', headers=headers)
+    client.post('/api/admin/inventory/adjustments', json={'adjustments': [{'id': item['id'], 'delta': 1}]},
+                headers=headers)
+    client.get(f"/api/admin/inventory/{item['id']}", headers=headers)
+    client.patch(f"/api/admin/inventory/{item['id']}", json={'description': 'audit'}, headers=headers)
+    client.delete(f"/api/admin/inventory/{item['id']}", headers=headers)
+
+    client.get('/api/members?sort=name')
+    client.get('/api/admin/stats', headers=headers)
+    client.get('/api/admin/dashboard', headers=headers)
+    client.get('/api/admin/donations/timeseries?granularity=week', headers=headers)
+    client.get(f'/api/admin/donations/timeseries?granularity=day&userId={user_id}', headers=headers)
+    client.get('/api/admin/outbox', headers=headers)
+    client.get('/api/admin/jobs', headers=headers)
+    client.get('/api/admin/cache', headers=headers)
+    client.get('/api/admin/db/pool', headers=headers)
+
+    client.post('/api/admin/import/users', headers=headers, data=json.dumps(
+        {'username': f'import-{tag}', 'email': f'import-{tag}@example.com', 'password': password}))
+    client.post('/api/admin/import/events', headers=headers, content_type='text/csv',
+                data='name,date,location\naudit,2030-01-02,audit\n').get_data()
+    client.post('/api/admin/import/members', headers=headers,
+                data=json.dumps({'name': 'audit', 'position': 'audit'})).get_data()
+    for path in sorted(FULL_READS):
+        client.get(path.split(' ', 1)[1], headers=headers).get_data()
+    client.get('/api/admin/export/donations?format=ndjson&from=2024-01-01&to=2024-01-31', headers=headers).get_data()
+    client.get(f'/api/admin/export/users?fromId={user_id}&toId={user_id}', headers=headers).get_data()
+    client.get('/api/admin/export/feedback?fromId=1&toId=100', headers=headers).get_data()
+    client.delete(f"/api/admin/members/{member['member']['id']}", headers=headers)
+
+    # Last: these invalidate the tokens used above
+    client.post(f'/api/admin/users/{user_id}/revoke-tokens', headers=headers)
+    client.post(f'/api/admin/admins/{admin_id}/revoke-tokens', headers=headers)
+
+
+def undriven_routes(app, driven):
+    """'METHOD /rule' for every route not among driven (rule, method) pairs."""
+    return sorted(
+        f'{method} {rule.rule}'
+        for rule in app.url_map.iter_rules() if rule.endpoint != 'static'
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+        if (rule.rule, method) not in driven
+    )
+
+
+def audit(app):
+    """Return ({statement: [full scans]}, statements checked, routes never called).
+
+    Call it inside scratch_app: the routes it drives write to the database.
+    """
+    explain = postgres_full_scans if db.engine.dialect.name == 'postgresql' else sqlite_full_scans
+    # A password nobody knows, so the audit never leaves a usable login behind
+    password = secrets.token_urlsafe(16)
+    admin = Admin.query.filter_by(email=AUDIT_ADMIN).first()
+    if not admin:
+        admin = Admin(email=AUDIT_ADMIN)
+        db.session.add(admin)
+    admin.password = hash_password(password)
+    db.session.commit()
+    headers = {'Authorization': f"Bearer {create_token('admin', admin)}"}
+
+    driven = set()
+
+    def record_route(sender, response, **extra):
+        if request.url_rule is not None:
+            driven.add((request.url_rule.rule, request.method))
+
+    with capture_statements(db.engine) as statements, request_finished.connected_to(record_route, app):
+        route_requests(app.test_client(), headers, password, admin.id)
+
+    regressions = {}
+    seen = set()
+    with db.engine.connect() as connection:
+        for statement, parameters, filtered, source in statements:
+            if source in FULL_READS or statement in seen:
+                continue
+            seen.add(statement)
+            with connection.begin():
+                scans = explain(connection, statement, parameters, filtered)
+            if scans:
+                regressions[statement] = scans
+    return regressions, len(seen), undriven_routes(app, driven)
@@ -1,28 +1,76 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from .models import User, Donation
-from . import db
+"""HTTP routes and CLI commands, grouped into blueprints.
+
+create_app() in app.py registers every blueprint here. Paths are spelled
+out in full on each route rather than through url_prefix.
+"""
+import io
+import json
+from datetime import datetime
+
+import click
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity
+
+from models import (db, User, Donation, Admin, Event, Feedback, Member, Reply, Inventory, Volunteer, ArchivedEvent,
+                    ArchivedVolunteer, ScheduledJob)
+from pagination import PaginationError, paginate, paginate_merged, page_response, parse_bool_arg
+from stats import increment_stat, read_stats, reconcile_stats
+from cache import response_cache, cached_response, bump_version
+from outbox import queue_depth, send_pending, wake_sender
+from payments import get_stripe, ingest_event, process_events, record_donation, wake_processor
+from bulk_import import RESOURCES as IMPORT_RESOURCES, import_stream
+from export import EXPORTS, RENDERERS, export_rows
+from passwords import HashingOverloaded, hash_password, verify_password, needs_rehash
+from database import REPLICA_BIND, pool_status
+from analytics import timeseries, rebuild_rollups
+from search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, SearchError, rebuild_index, search
+from inventory import AdjustmentError, apply_adjustments, parse_adjustments
+from archive import archive_events
+from dashboard import DEFAULT_PREVIEW, MAX_PREVIEW, load_dashboard
+from scheduler import job_names, run_now as run_job_now
+from volunteers import (
+    WAITLISTED, SignupError, cancel as cancel_sign_up, seats as volunteer_seats, set_capacity, sign_up,
+    waitlist_position
+)
+from accounts import accounts_version, status_cache, create_token, revoke_tokens, account_changed, admin_required, user_required
+from metrics import render_metrics
 
 auth_bp = Blueprint('auth', __name__)
 donation_bp = Blueprint('donation', __name__)
+main_bp = Blueprint('main', __name__)
+admin_bp = Blueprint('admin', __name__)
+# Commands are registered at the top level: 'flask send-outbox', not
+# 'flask commands send-outbox'
+commands_bp = Blueprint('commands', __name__, cli_group=None)
+
 
 @auth_bp.route('/api/auth/register', methods=['POST'])
 def register():
-    data = request.get_json()
-    username = data.get('username')
-    email = data.get('email')
-    password = data.get('password')
+    try:
+        data = request.get_json()
+        username = data.get('username')
+        email = data.get('email')
+        password = data.get('password')
 
-    if User.query.filter_by(email=email).first() or User.query.filter_by(username=username).first():
-        return jsonify({"msg": "User already exists"}), 409
+        if not username or not email or not password:
+            return jsonify({"msg": "Missing fields"}), 400
 
-    hashed_password = generate_password_hash(password)
-    new_user = User(username=username, email=email, password=hashed_password)
-    db.session.add(new_user)
-    db.session.commit()
+        if User.query.filter_by(email=email).first() or User.query.filter_by(username=username).first():
+            return jsonify({"msg": "User already exists"}), 409
+
+        hashed_password = hash_password(password)
+        new_user = User(username=username, email=email, password=hashed_password)
+        db.session.add(new_user)
+        increment_stat('users')
+        db.session.commit()
 
-    return jsonify({"msg": "User registered successfully"}), 201
+        return jsonify({"msg": "User registered successfully"}), 201
+
+    except HashingOverloaded:
+        raise
+    except Exception:
+        current_app.logger.exception("Registration failed")
+        return jsonify({"msg": "Internal Server Error"}), 500
 
 @auth_bp.route('/api/auth/login', methods=['POST'])
 def login():
@@ -30,30 +78,928 @@ def login():
     email = data.get('email')
     password = data.get('password')
 
+    # Retrieve the user by email
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password, password):
-        return jsonify({"msg": "Bad username or password"}), 401
 
-    access_token = create_access_token(identity={'user_id': user.id})
-    return jsonify(access_token=access_token), 200
+    # Check if the user exists and the password is correct
+    if not user or not verify_password(user.password, password):
+        return jsonify({"msg": "Invalid credentials"}), 401
+
+    # Check if the user account is active
+    if not user.isActive:
+        return jsonify({"msg": "Account is deactivated"}), 403
+
+    # Upgrade hashes made with an older method or cost
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+        db.session.commit()
+
+    # Generate access token
+    access_token = create_token('user', user)
+    return jsonify({"msg": "Login successful", "access_token": access_token}), 200
 
-@donation_bp.route('/api/donations', methods=['POST'])
-@jwt_required()
-def create_donation():
+@auth_bp.route('/api/admin/login', methods=['POST'])
+def admin_login():
     data = request.get_json()
-    user_id = get_jwt_identity()['user_id']
+    email = data.get('email')
+    password = data.get('password')
+
+    # Authenticate the admin
+    admin = Admin.query.filter_by(email=email).first()
+
+    if not admin or not admin.check_password(password):
+        return jsonify({"msg": "Invalid credentials"}), 401
+
+    if needs_rehash(admin.password):
+        admin.password = hash_password(password)
+        db.session.commit()
+
+    access_token = create_token('admin', admin)
+    return jsonify({"access_token": access_token}), 200
+
+@auth_bp.route('/api/check-email', methods=['POST'])
+def check_email():
+    data = request.json
+    email = data.get('email')
+    
+    if not email:
+        return jsonify({"error": "Email is required"}), 400
+    
+    user = User.query.filter_by(email=email).first()
+    
+    if user:
+        return jsonify({"exists": True}), 200
+    else:
+        return jsonify({"exists": False}), 200
+
+
+@donation_bp.route('/api/create-payment-intent', methods=['POST'])
+def create_payment_intent():
+    data = request.json
     amount = data.get('amount')
 
-    new_donation = Donation(user_id=user_id, amount=amount)
-    db.session.add(new_donation)
+    if not amount:
+        return jsonify(error="Amount is required"), 400
+
+    stripe = get_stripe()
+    try:
+        # Create a PaymentIntent with the order amount and currency
+        intent = stripe.PaymentIntent.create(
+            amount=int(amount) * 100,  # amount in cents
+            currency='usd',
+            # Lets the webhook record the donation if the browser never calls save-donation
+            metadata={'email': data.get('email') or '', 'message': data.get('message') or ''}
+        )
+        return jsonify(clientSecret=intent['client_secret'])
+    except stripe.error.StripeError as e:
+        # Handle specific Stripe API errors
+        return jsonify(error=str(e)), 402
+    except Exception as e:
+        # Handle any other exceptions
+        return jsonify(error="An error occurred. Please try again."), 500
+
+@donation_bp.route('/api/save-donation', methods=['POST'])
+def save_donation():
+    data = request.json
+
+    # Validate required fields
+    if 'amount' not in data or not isinstance(data['amount'], (int, float)):
+        return jsonify({"error": "Invalid amount. It should be a number."}), 422
+
+    if 'paymentIntentId' not in data or not isinstance(data['paymentIntentId'], str):
+        return jsonify({"error": "Invalid payment intent ID. It should be a string."}), 422
+
+    if 'email' not in data or not isinstance(data['email'], str):
+        return jsonify({"error": "Invalid email. It should be a string."}), 422
+
+    # Extract email and find the user
+    email = data['email']
+    user = User.query.filter_by(email=email).first()
+
+    if not user:
+        return jsonify({"error": "User with the provided email not found."}), 404
+
+    # Assuming message is optional
+    amount = int(float(data['amount']))  # Convert the amount to an integer (cents)
+    message = data.get('message', '')
+    payment_intent_id = data['paymentIntentId']
+    user_id = user.id
+
+    # Save the donation to the database; a no-op if the webhook got there first
+    record_donation(user_id, amount, payment_intent_id, message)
     db.session.commit()
 
-    return jsonify({"msg": "Donation made successfully"}), 201
+    return jsonify({"msg": "Donation saved successfully."}), 200
+
+@donation_bp.route('/api/stripe/webhook', methods=['POST'])
+def stripe_webhook():
+    payload = request.get_data()
+    signature = request.headers.get('Stripe-Signature')
+
+    stripe = get_stripe()
+    try:
+        event = stripe.Webhook.construct_event(payload, signature, current_app.config['STRIPE_WEBHOOK_SECRET'])
+    except ValueError:
+        return jsonify(error="Invalid payload"), 400
+    except stripe.error.SignatureVerificationError:
+        return jsonify(error="Invalid signature"), 400
+
+    # Store the event and return right away; the donation is written by the
+    # background processor in payments.py
+    if ingest_event(event):
+        wake_processor()
+    return jsonify(received=True), 200
 
 @donation_bp.route('/api/donations', methods=['GET'])
-@jwt_required()
-def get_donations():
-    user_id = get_jwt_identity()['user_id']
-    donations = Donation.query.filter_by(user_id=user_id).all()
-    donation_list = [{"id": d.id, "amount": d.amount} for d in donations]
-    return jsonify(donations=donation_list), 200
+@user_required
+def get_my_donations():
+    """The signed-in user's own donations, oldest first."""
+    try:
+        query = Donation.query.filter(Donation.user_id == get_jwt_identity()['id'])
+        donations, next_cursor = paginate(query, Donation)
+        donation_list = [
+            {
+                'id': donation.id,
+                'amount': donation.amount,
+                'message': donation.message
+            } for donation in donations
+        ]
+        return page_response({'donations': donation_list}, next_cursor), 200
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@main_bp.route('/')
+def index():
+    return "Welcome to the FoodBridge API!"
+
+@main_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint, merged across gunicorn workers."""
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({"msg": "Invalid metrics token"}), 401
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+@main_bp.route('/api/events', methods=['GET'])
+def get_events_in_range():
+    try:
+        query = Event.query
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+        if date_from:
+            query = query.filter(Event.date >= datetime.strptime(date_from, '%Y-%m-%d').date())
+        if date_to:
+            query = query.filter(Event.date <= datetime.strptime(date_to, '%Y-%m-%d').date())
+        if parse_bool_arg('upcoming'):
+            # Today in UTC, the day jobs.complete_past_events completes by
+            query = query.filter(Event.date >= datetime.utcnow().date(), Event.completed == False)
+
+        # Served from ix_event_date_id in date order
+        events, next_cursor = paginate(query, Event, sortable=('date', 'id'), default_sort='date')
+        return page_response([event.serialize() for event in events], next_cursor), 200
+    except ValueError as e:
+        # PaginationError is a ValueError, as is a malformed from/to date
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@main_bp.route('/api/events/incomplete', methods=['GET'])
+@cached_response('events')
+def get_incomplete_events():
+    events = Event.query.filter_by(completed=False).all()
+    return jsonify([event.serialize() for event in events])
+
+@main_bp.route('/api/events/<int:event_id>/seats', methods=['GET'])
+def get_event_seats(event_id):
+    # Not cached with the event lists: it changes with every sign-up, and
+    # is one primary-key read plus an index count
+    try:
+        return jsonify(volunteer_seats(event_id)), 200
+    except SignupError as e:
+        return jsonify({"error": str(e)}), e.status
+
+@main_bp.route('/api/events/<int:event_id>/volunteers', methods=['POST'])
+@user_required
+def volunteer_sign_up(event_id):
+    user_id = get_jwt_identity()['id']
+    try:
+        status = sign_up(event_id, user_id)
+        position = waitlist_position(event_id, user_id) if status == WAITLISTED else None
+        db.session.commit()
+        return jsonify({'eventId': event_id, 'status': status, 'waitlistPosition': position}), 201
+    except SignupError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Volunteer sign-up failed")
+        return jsonify({"error": str(e)}), 500
+
+@main_bp.route('/api/events/<int:event_id>/volunteers', methods=['DELETE'])
+@user_required
+def volunteer_cancel(event_id):
+    try:
+        promoted = cancel_sign_up(event_id, get_jwt_identity()['id'])
+        db.session.commit()
+        if promoted:
+            wake_sender()
+        return jsonify({"message": "Sign-up cancelled"}), 200
+    except SignupError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Volunteer cancellation failed")
+        return jsonify({"error": str(e)}), 500
+
+@main_bp.route('/api/feedback', methods=['POST'])
+def submit_feedback():
+    data = request.get_json()
+    try:
+        # Fetch user based on email
+        user = User.query.filter_by(email=data.get('email')).first()
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+
+        # Create feedback
+        feedback = Feedback(user_id=user.id, message=data.get('message'))
+        db.session.add(feedback)
+        db.session.commit()
+
+        return jsonify({'message': 'Feedback submitted successfully'}), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+# Endpoint to fetch all members
+@main_bp.route('/api/members', methods=['GET'])
+@cached_response('members')
+def get_members():
+    try:
+        members, next_cursor = paginate(Member.query, Member, sortable=('id', 'name', 'position'))
+        members_list = [
+            {
+                'id': member.id,
+                'name': member.name,
+                'position': member.position,
+                'image_url': member.image_url
+            } for member in members
+        ]
+        return page_response(members_list, next_cursor), 200
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route('/api/admin/stats', methods=['GET'])
+@admin_required
+def get_admin_stats():
+    try:
+        # Counters are maintained by the write handlers, see stats.py
+        stats = read_stats()
+
+        data = {
+            'stats': {
+                'users': stats['users'],
+                'donations': stats['donations'],
+                'campaigns': stats['campaigns'],
+                'members': stats['members'],  # Include the members count
+            }
+        }
+
+        return jsonify(data), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/cache', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    account_status = dict(status_cache.stats(), versionReads=accounts_version.reads)
+    return jsonify({'cache': response_cache.stats(), 'accountStatus': account_status}), 200
+
+@admin_bp.route('/api/admin/db/pool', methods=['GET'])
+@admin_required
+def get_pool_status():
+    status = {'pool': pool_status(db.engine)}
+    if REPLICA_BIND in db.engines:
+        status['replicaPool'] = pool_status(db.engines[REPLICA_BIND])
+    return jsonify(status), 200
+
+@admin_bp.route('/api/admin/jobs', methods=['GET'])
+@admin_required
+def get_scheduled_jobs():
+    try:
+        jobs = ScheduledJob.query.order_by(ScheduledJob.name).all()
+        return jsonify([job.serialize() for job in jobs]), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/outbox', methods=['GET'])
+@admin_required
+def get_outbox_depth():
+    return jsonify({'outbox': queue_depth()}), 200
+
+@admin_bp.route('/api/admin/import/<resource>', methods=['POST'])
+@admin_required
+def bulk_import(resource):
+    """Import users, events or members from an NDJSON or CSV request body.
+
+    The body is read and inserted in batches as it streams in, and the
+    response streams back one NDJSON line per rejected row followed by a
+    summary line.
+    """
+    if resource not in IMPORT_RESOURCES:
+        return jsonify({"error": f"Cannot import '{resource}'"}), 404
+
+    fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+
+    def generate():
+        try:
+            for result in import_stream(resource, lines, fmt):
+                yield json.dumps(result) + '\n'
+        except Exception as e:
+            db.session.rollback()
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@admin_bp.route('/api/admin/export/<resource>', methods=['GET'])
+@admin_required
+def export_resource(resource):
+    """Stream donations, users or feedback as CSV or NDJSON (?format=).
+
+    Rows are read through a server-side cursor and written out in chunks,
+    so memory use does not depend on the number of rows. ?fromId= and
+    ?toId= bound the export by id, inclusive; for donations ?from= and ?to=
+    (YYYY-MM-DD, inclusive) bound it by creation date. Donations recorded
+    before created_at existed have none and fall outside any date range.
+    """
+    if resource not in EXPORTS:
+        return jsonify({"error": f"Cannot export '{resource}'"}), 404
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in RENDERERS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    render, mimetype = RENDERERS[fmt]
+
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    if (date_from or date_to) and EXPORTS[resource][2] is None:
+        return jsonify({"error": f"'{resource}' has no timestamp; filter by fromId and toId instead"}), 400
+    try:
+        date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None
+        date_to = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None
+    except ValueError:
+        return jsonify({"error": "from and to must be dates (YYYY-MM-DD)"}), 400
+
+    try:
+        from_id = request.args.get('fromId', type=int)
+        to_id = request.args.get('toId', type=int)
+        columns, rows = export_rows(resource, from_id, to_id, date_from, date_to)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    response = Response(stream_with_context(render(columns, rows)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={resource}.{fmt}'
+    return response
+
+@admin_bp.route('/api/admin/donations/timeseries', methods=['GET'])
+@admin_required
+def get_donation_timeseries():
+    """Donation totals per day, week or month (?granularity=, default day).
+
+    ?from= and ?to= (YYYY-MM-DD) bound the range, which defaults to the
+    last 30 days, 12 weeks or 12 months; ?userId= restricts it to one
+    donor. Answered from the rollup tables in analytics.py.
+    """
+    try:
+        granularity = request.args.get('granularity', 'day')
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+        series = timeseries(
+            granularity,
+            datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None,
+            datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None,
+            request.args.get('userId', type=int)
+        )
+        return jsonify({'granularity': granularity, 'buckets': series}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/dashboard', methods=['GET'])
+@admin_required
+def get_dashboard():
+    """Stats plus a preview of users, events, feedback and members; ?limit= rows each."""
+    limit = request.args.get('limit', DEFAULT_PREVIEW, type=int)
+    if not 1 <= limit <= MAX_PREVIEW:
+        return jsonify({"error": f"'limit' must be between 1 and {MAX_PREVIEW}"}), 400
+    try:
+        return jsonify(load_dashboard(current_app._get_current_object(), limit)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/users', methods=['GET'])
+@admin_required
+def get_all_users():
+    try:
+        query = User.query
+        is_active = parse_bool_arg('isActive')
+        if is_active is not None:
+            query = query.filter(User.isActive == is_active)
+
+        users, next_cursor = paginate(query, User, sortable=('id', 'username', 'email'))
+        users_list = [
+            {
+                'id': user.id,
+                'username': user.username,
+                'email': user.email,
+                'isActive': user.isActive  # Include activation status
+            } for user in users
+        ]
+
+        return page_response(users_list, next_cursor), 200
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/users/<int:user_id>/status', methods=['PUT'])
+@admin_required
+def toggle_user_status(user_id):
+    user = User.query.get_or_404(user_id)
+    data = request.get_json()
+    user.isActive = data.get('isActive')
+    account_changed()
+    db.session.commit()
+    return jsonify({'message': 'User status updated successfully'})
+
+@admin_bp.route('/api/admin/users/<int:user_id>/revoke-tokens', methods=['POST'])
+@admin_required
+def revoke_user_tokens(user_id):
+    if not revoke_tokens('user', user_id):
+        return jsonify({"error": "User not found"}), 404
+    db.session.commit()
+    return jsonify({'message': 'All tokens for the user have been revoked'}), 200
+
+@admin_bp.route('/api/admin/admins/<int:admin_id>/revoke-tokens', methods=['POST'])
+@admin_required
+def revoke_admin_tokens(admin_id):
+    if not revoke_tokens('admin', admin_id):
+        return jsonify({"error": "Admin not found"}), 404
+    db.session.commit()
+    return jsonify({'message': 'All tokens for the admin have been revoked'}), 200
+
+@admin_bp.route('/api/admin/events', methods=['GET'])
+@admin_required
+def get_events():
+    try:
+        query = Event.query
+        completed = parse_bool_arg('completed')
+        if completed is not None:
+            query = query.filter(Event.completed == completed)
+        sources = [(query, Event)]
+        # Archived events are all completed and read through the same cursor
+        if completed is not False:
+            sources.append((ArchivedEvent.query, ArchivedEvent))
+
+        events, next_cursor = paginate_merged(sources, sortable=('id', 'name', 'date'))
+        return page_response([event.serialize() for event in events], next_cursor), 200
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/events', methods=['POST'])
+@admin_required
+def add_event():
+    data = request.get_json()
+    try:
+        # Convert date string to a date object
+        event_date = datetime.strptime(data.get('date'), '%Y-%m-%d').date()
+
+        new_event = Event(
+            name=data.get('name'),
+            date=event_date,
+            location=data.get('location'),
+            description=data.get('description'),
+            picture_url=data.get('pictureUrl')  # Ensure this key matches the request body
+        )
+        db.session.add(new_event)
+        increment_stat('campaigns')
+        bump_version('events')
+        db.session.commit()
+
+        return jsonify({"message": "Event added successfully"}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/events/<int:id>/complete', methods=['PATCH'])
+@admin_required
+def complete_event(id):
+    token = request.headers.get('Authorization')
+    if not token:
+        return jsonify({"error": "Authorization token missing"}), 401
+
+    event = Event.query.get(id)
+    if not event:
+        archived = db.session.get(ArchivedEvent, id)
+        if archived:
+            return jsonify(archived.serialize()), 200
+        return jsonify({"error": "Event not found"}), 404
+
+    try:
+        # Set completed to True; an event completed without a completed_at
+        # (e.g. imported that way) gets one too, or it is never archived
+        event.completed = True
+        if event.completed_at is None:
+            event.completed_at = datetime.utcnow()
+        bump_version('events')
+        db.session.commit()
+        return jsonify(event.serialize()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/events/<int:event_id>/capacity', methods=['PUT'])
+@admin_required
+def set_event_capacity(event_id):
+    data = request.get_json(silent=True) or {}
+    capacity = data.get('capacity')
+    if 'capacity' not in data or (capacity is not None and (
+            not isinstance(capacity, int) or isinstance(capacity, bool) or capacity < 0)):
+        return jsonify({"error": "'capacity' must be a non-negative integer or null"}), 400
+    try:
+        promoted = set_capacity(event_id, capacity)
+        bump_version('events')
+        db.session.commit()
+        if promoted:
+            wake_sender()
+        return jsonify(dict(volunteer_seats(event_id), promoted=promoted)), 200
+    except SignupError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/events/<int:event_id>/volunteers', methods=['GET'])
+@admin_required
+def get_event_volunteers(event_id):
+    """Sign-ups for an event in sign-up order; ?status=confirmed|waitlisted."""
+    try:
+        # An event's sign-ups are all in one table or the other, depending
+        # on whether it has been archived
+        status = request.args.get('status')
+        sources = []
+        for model in (Volunteer, ArchivedVolunteer):
+            query = model.query.options(db.joinedload(model.user)).filter(model.event_id == event_id)
+            if status:
+                query = query.filter(model.status == status)
+            sources.append((query, model))
+        volunteers, next_cursor = paginate_merged(sources)
+        return page_response([{
+            'id': volunteer.id,
+            'userId': volunteer.user_id,
+            'username': volunteer.user.username,
+            'email': volunteer.user.email,
+            'status': volunteer.status
+        } for volunteer in volunteers], next_cursor), 200
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Endpoint to add a new member
+@admin_bp.route('/api/admin/members', methods=['POST'])
+@admin_required
+def add_member():
+    data = request.get_json()
+    current_app.logger.debug(f"Add member request: {data}")
+    
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    if 'name' not in data or 'position' not in data:
+        return jsonify({"error": "Missing required fields: 'name' and 'position' are required."}), 400
+
+    try:
+        new_member = Member(
+            name=data.get('name'),
+            position=data.get('position'),
+            image_url=data.get('image_url')  # Ensure this field matches the frontend key
+        )
+        db.session.add(new_member)
+        increment_stat('members')
+        bump_version('members')
+        db.session.commit()
+
+        return jsonify({"message": "Member added successfully", "member": {
+            'id': new_member.id,
+            'name': new_member.name,
+            'position': new_member.position,
+            'image_url': new_member.image_url
+        }}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Endpoint to delete a member
+@admin_bp.route('/api/admin/members/<int:member_id>', methods=['DELETE'])
+@admin_required
+def delete_member(member_id):
+    try:
+        member = Member.query.get_or_404(member_id)
+        db.session.delete(member)
+        increment_stat('members', -1)
+        bump_version('members')
+        db.session.commit()
+
+        return jsonify({"message": "Member deleted successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/inventory', methods=['GET'])
+@admin_required
+def get_inventory():
+    try:
+        items, next_cursor = paginate(Inventory.query, Inventory, sortable=('id', 'item_name'))
+        return page_response([item.serialize() for item in items], next_cursor), 200
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/inventory', methods=['POST'])
+@admin_required
+def add_inventory_item():
+    data = request.get_json() or {}
+    item_name = data.get('itemName')
+    quantity = data.get('quantity', 0)
+    if not item_name:
+        return jsonify({"error": "Missing required field: 'itemName'"}), 400
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0:
+        return jsonify({"error": "'quantity' must be a non-negative integer"}), 400
+
+    try:
+        item = Inventory(item_name=item_name, quantity=quantity, description=data.get('description'))
+        db.session.add(item)
+        db.session.commit()
+        return jsonify(item.serialize()), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/inventory/<int:item_id>', methods=['GET'])
+@admin_required
+def get_inventory_item(item_id):
+    item = db.session.get(Inventory, item_id)
+    if not item:
+        return jsonify({"error": "Inventory item not found"}), 404
+    return jsonify(item.serialize()), 200
+
+@admin_bp.route('/api/admin/inventory/<int:item_id>', methods=['PATCH'])
+@admin_required
+def update_inventory_item(item_id):
+    data = request.get_json() or {}
+    if 'quantity' in data:
+        # Setting an absolute count would overwrite concurrent adjustments
+        return jsonify({"error": "Change quantities through /api/admin/inventory/adjustments"}), 400
+
+    item = db.session.get(Inventory, item_id)
+    if not item:
+        return jsonify({"error": "Inventory item not found"}), 404
+    try:
+        if 'itemName' in data:
+            if not data['itemName']:
+                return jsonify({"error": "'itemName' must not be empty"}), 400
+            item.item_name = data['itemName']
+        if 'description' in data:
+            item.description = data['description']
+        db.session.commit()
+        return jsonify(item.serialize()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/inventory/<int:item_id>', methods=['DELETE'])
+@admin_required
+def delete_inventory_item(item_id):
+    try:
+        deleted = db.session.execute(db.delete(Inventory).where(Inventory.id == item_id)).rowcount
+        if not deleted:
+            return jsonify({"error": "Inventory item not found"}), 404
+        db.session.commit()
+        return jsonify({"message": "Inventory item deleted successfully"}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/inventory/adjustments', methods=['POST'])
+@admin_required
+def adjust_inventory():
+    """Apply {"adjustments": [{"id": 1, "delta": -3}, ...]} all or nothing."""
+    try:
+        quantities = apply_adjustments(parse_adjustments(request.get_json(silent=True)))
+        db.session.commit()
+        return jsonify({'items': [{'id': item_id, 'quantity': quantity}
+                                  for item_id, quantity in sorted(quantities.items())]}), 200
+    except AdjustmentError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e), **e.details}), e.status
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Inventory adjustment failed")
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/feedback', methods=['GET'])
+@admin_required
+def get_feedback():
+    try:
+        # Authors are joined in and reply threads loaded with one extra
+        # SELECT ... IN, so the page costs a fixed number of queries.
+        query = Feedback.query.options(
+            db.joinedload(Feedback.user),
+            db.selectinload(Feedback.replies)
+        )
+        user_id = request.args.get('userId', type=int)
+        if user_id is not None:
+            query = query.filter(Feedback.user_id == user_id)
+
+        feedback_records, next_cursor = paginate(query, Feedback)
+        feedback_list = []
+
+        for feedback in feedback_records:
+            user = feedback.user  # Already loaded by the joinedload above
+            replies = sorted(feedback.replies, key=lambda reply: (reply.created_at is None, reply.created_at, reply.id))
+            if user:
+                feedback_list.append({
+                    'id': feedback.id,                # Include the feedback id
+                    'userId': user.id,
+                    'username': user.username,
+                    'email': user.email,
+                    'message': feedback.message,      # Ensure attribute name is correct
+                    'replies': [reply.serialize() for reply in replies]
+                })
+            else:
+                feedback_list.append({
+                    'id': feedback.id,                # Include the feedback id
+                    'userId': feedback.user_id,
+                    'username': 'Unknown',            # Default value if user not found
+                    'email': 'Unknown',
+                    'message': feedback.message,
+                    'replies': [reply.serialize() for reply in replies]
+                })
+
+        return page_response({'feedback': feedback_list}, next_cursor), 200
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.exception("Loading feedback failed")
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/search', methods=['GET'])
+@admin_required
+def search_records():
+    # ?q=words&type=feedback,reply,event&limit=20; every word must match
+    try:
+        results = search(
+            request.args.get('q'),
+            request.args.get('type'),
+            request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+        )
+        return jsonify({'results': results}), 200
+    except SearchError as e:
+        return jsonify({"error": str(e)}), e.status
+    except Exception as e:
+        current_app.logger.exception("Search failed")
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route('/api/admin/feedback/reply', methods=['POST'])
+@admin_required
+def post_reply():
+    try:
+        data = request.get_json()
+        user_id = data.get('userId')
+        user_email = data.get('userEmail')
+        feedback_id = data.get('feedbackId')
+        reply_message = data.get('reply')
+
+        if not user_id or not user_email or not feedback_id or not reply_message:
+            return jsonify({"error": "Missing required fields"}), 400
+
+        new_reply = Reply(
+            user_id=user_id,
+            feedback_id=feedback_id,
+            message=reply_message
+        )
+        db.session.add(new_reply)
+        db.session.commit()
+
+        return jsonify({'reply': {'userId': user_id, 'feedbackId': feedback_id, 'message': reply_message}}), 200
+    except Exception as e:
+        current_app.logger.exception("Posting a reply failed")
+        return jsonify({"error": str(e)}), 500
+
+
+@commands_bp.cli.command('send-outbox')
+def send_outbox_command():
+    """Deliver every due email in the outbox, then exit."""
+    total = 0
+    while True:
+        sent = send_pending()
+        if not sent:
+            break
+        total += sent
+    print(f"Sent {total} emails.")
+
+@commands_bp.cli.command('audit-query-plans')
+@click.option('--database-uri', help='An empty database to audit instead of a temporary SQLite file.')
+def audit_query_plans_command(database_uri):
+    """EXPLAIN every query the routes issue; fail on full table scans."""
+    from queryplan import audit, scratch_app
+
+    with scratch_app(database_uri) as app:
+        regressions, checked, undriven = audit(app)
+    for statement, scans in regressions.items():
+        print(f"{'; '.join(scans)}\n    {' '.join(statement.split())}")
+    for route in undriven:
+        print(f"Not exercised: {route}")
+    print(f"Checked {checked} statements, {len(regressions)} full scans, {len(undriven)} routes not exercised.")
+    if regressions or undriven:
+        raise SystemExit(1)
+
+@commands_bp.cli.command('import-data')
+@click.argument('resource', type=click.Choice(sorted(IMPORT_RESOURCES)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_data_command(resource, path):
+    """Bulk import RESOURCE rows from an NDJSON or .csv file."""
+    fmt = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+    with open(path, encoding='utf-8', newline='') as lines:
+        for result in import_stream(resource, lines, fmt):
+            if 'line' in result:
+                print(f"line {result['line']}: {result['error']}")
+            else:
+                print(f"Imported {result['imported']} {resource}, {result['failed']} rows failed.")
+
+@commands_bp.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    """Recompute the dashboard counters and report any drift."""
+    actual, drift = reconcile_stats()
+    for name, (stored, value) in drift.items():
+        print(f"{name}: stored {stored}, actual {value}")
+    print(f"Reconciled {len(actual)} counters, {len(drift)} drifted.")
+
+@commands_bp.cli.command('rebuild-donation-rollups')
+def rebuild_donation_rollups_command():
+    """Recompute the donation time-series rollups from the donation table."""
+    counted, skipped = rebuild_rollups()
+    db.session.commit()
+    print(f"Rebuilt rollups from {counted} donations, skipped {skipped} without a date.")
+
+@commands_bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Recreate missing search indexes and triggers, then reindex every row."""
+    rebuild_index(db.session.connection())
+    db.session.commit()
+    print("Search index rebuilt.")
+
+@commands_bp.cli.command('archive-events')
+@click.option('--days', type=int, help='Archive events completed more than this many days ago')
+@click.option('--batch-size', type=int, help='Events moved per transaction')
+def archive_events_command(days, batch_size):
+    """Move long-completed events and their volunteers to the archive tables."""
+    days = current_app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    archived = archive_events(days, batch_size or current_app.config['ARCHIVE_BATCH_SIZE'])
+    print(f"Archived {archived} events completed more than {days} days ago.")
+
+@commands_bp.cli.command('run-job')
+@click.argument('name')
+@click.option('--if-due', is_flag=True, help='Only run the job if its schedule says it is due')
+def run_job_command(name, if_due):
+    """Run the scheduled maintenance job NAME now."""
+    try:
+        rows = run_job_now(name, force=not if_due)
+    except KeyError:
+        raise click.BadParameter(f"choose from {', '.join(job_names())}", param_hint='NAME')
+    if rows is None:
+        print(f"{name} not run: not due, or running in another worker.")
+    else:
+        print(f"{name} processed {rows} rows.")
+
+@commands_bp.cli.command('process-stripe-events')
+def process_stripe_events_command():
+    """Apply every due Stripe webhook event, then exit."""
+    total = 0
+    while True:
+        handled = process_events()
+        if not handled:
+            break
+        total += handled
+    print(f"Processed {total} events.")
@@ -0,0 +1,252 @@
+"""In-app scheduler for the maintenance jobs in jobs.py.
+
+Every gunicorn worker, on every node, runs the scheduler thread; a lease in
+the job's scheduled_job row makes sure only one of them runs a given job at
+a time. A worker takes the lease with a conditional UPDATE
+
+    UPDATE scheduled_job SET lease_owner = :me, lease_expires_at = :now + LEASE
+    WHERE name = :job AND next_run_at <= :now
+      AND (lease_expires_at IS NULL OR lease_expires_at < :now)
+
+which the database lets exactly one worker win. The job then runs in
+batches. Each batch commits together with the job's checkpoint and a
+renewal of the lease, and only if this worker still holds it, so a worker
+that stalled past LEASE_SECONDS can't commit over the one that took over.
+A run interrupted by a crash or a failed batch resumes from its last
+checkpoint once the lease expires or RETRY_SECONDS pass.
+
+Schedules are five-field cron expressions (minute hour day month weekday)
+evaluated in UTC. Run time, rows processed and outcome of every run are
+exported to /metrics and kept on the job's row for /api/admin/jobs.
+"""
+import json
+import os
+import socket
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from database import insert_ignore
+from models import db, ScheduledJob
+from metrics import JOB_ROWS, JOB_RUNS, JOB_SECONDS
+from workers import BackgroundWorker
+
+LEASE_SECONDS = 300
+RETRY_SECONDS = 300
+MAX_ERROR_CHARS = 1000
+
+# step(checkpoint) processes one batch in the session's transaction and
+# returns (rows processed, checkpoint to resume from); a batch of 0 rows
+# ends the run. The checkpoint must be JSON-serializable.
+Job = namedtuple('Job', 'name schedule step')
+
+
+class CronSchedule:
+    """A five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Fields take *, numbers, a-b ranges, lists and /step. As in cron, a day
+    matches if either day field matches when both are restricted. Sunday is
+    0 (or 7).
+    """
+
+    FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7))
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != len(self.FIELDS):
+            raise ValueError(f"Cron expression '{expression}' needs {len(self.FIELDS)} fields")
+        self.expression = expression
+        values = [self.parse_field(part, low, high) for part, (_, low, high) in zip(parts, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day, self.any_weekday = parts[2] == '*', parts[4] == '*'
+
+    @staticmethod
+    def parse_field(text, low, high):
+        values = set()
+        for item in text.split(','):
+            spec, _, step = item.partition('/')
+            try:
+                step = int(step) if step else 1
+                if spec == '*':
+                    start, end = low, high
+                elif '-' in spec:
+                    start, end = (int(bound) for bound in spec.split('-', 1))
+                else:
+                    start = int(spec)
+                    end = high if step > 1 else start
+            except ValueError:
+                raise ValueError(f"Invalid cron field '{text}'")
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"Cron field '{text}' is outside {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def day_matches(self, moment):
+        in_month = moment.day in self.days
+        # datetime counts Monday as 0, cron counts Sunday as 0
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment):
+        """The first matching minute after moment."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Skips whole months, days and hours that can't match; a date that
+        # never comes (e.g. February 30) gives up after a few years
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self.day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+def register(job, now):
+    """Create the job's row, or update it if its schedule changed."""
+    next_run_at = CronSchedule(job.schedule).next_after(now)
+    values = {'name': job.name, 'schedule': job.schedule, 'next_run_at': next_run_at}
+    insert_ignore(db.session, ScheduledJob, values, ['name'])
+    db.session.execute(
+        db.update(ScheduledJob)
+        .where(ScheduledJob.name == job.name, ScheduledJob.schedule != job.schedule)
+        .values(schedule=job.schedule, next_run_at=next_run_at),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+
+
+def acquire_lease(name, owner, now, force=False):
+    """Take the job's lease if it is due (or force) and nobody holds it."""
+    conditions = [ScheduledJob.name == name,
+                  db.or_(ScheduledJob.lease_expires_at.is_(None), ScheduledJob.lease_expires_at < now)]
+    if not force:
+        conditions.append(ScheduledJob.next_run_at <= now)
+    result = db.session.execute(
+        db.update(ScheduledJob).where(*conditions)
+        .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=LEASE_SECONDS), last_started_at=now),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def update_leased(name, owner, **values):
+    """UPDATE the job's row if owner still holds its lease; True if it did."""
+    result = db.session.execute(
+        db.update(ScheduledJob).where(ScheduledJob.name == name, ScheduledJob.lease_owner == owner).values(**values),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount == 1
+
+
+def run_job(job, force=False):
+    """Run job to completion if this process gets its lease.
+
+    Returns the rows processed, or None if the job wasn't due or another
+    worker holds the lease.
+    """
+    owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    if not acquire_lease(job.name, owner, datetime.utcnow(), force):
+        return None
+
+    started = time.perf_counter()
+    stored = db.session.query(ScheduledJob.checkpoint).filter(ScheduledJob.name == job.name).scalar()
+    checkpoint = json.loads(stored) if stored else None
+    total = 0
+    try:
+        while True:
+            rows, checkpoint = job.step(checkpoint)
+            lease = datetime.utcnow() + timedelta(seconds=LEASE_SECONDS)
+            if not update_leased(job.name, owner, checkpoint=json.dumps(checkpoint), lease_expires_at=lease):
+                raise RuntimeError("Lost the job lease; batch rolled back")
+            db.session.commit()
+            JOB_ROWS.labels(job.name).inc(rows)
+            total += rows
+            if not rows:
+                break
+    except Exception as e:
+        db.session.rollback()
+        elapsed = time.perf_counter() - started
+        update_leased(job.name, owner, lease_owner=None, lease_expires_at=None, last_status='failed',
+                      last_finished_at=datetime.utcnow(), last_rows=total, last_duration_ms=int(elapsed * 1000),
+                      last_error=str(e)[:MAX_ERROR_CHARS],
+                      next_run_at=datetime.utcnow() + timedelta(seconds=RETRY_SECONDS))
+        db.session.commit()
+        JOB_SECONDS.labels(job.name).observe(elapsed)
+        JOB_RUNS.labels(job.name, 'failed').inc()
+        raise
+
+    elapsed = time.perf_counter() - started
+    now = datetime.utcnow()
+    update_leased(job.name, owner, lease_owner=None, lease_expires_at=None, checkpoint=None, last_status='ok',
+                  last_finished_at=now, last_rows=total, last_duration_ms=int(elapsed * 1000), last_error=None,
+                  next_run_at=CronSchedule(job.schedule).next_after(now))
+    db.session.commit()
+    JOB_SECONDS.labels(job.name).observe(elapsed)
+    JOB_RUNS.labels(job.name, 'ok').inc()
+    return total
+
+
+class Scheduler:
+    def __init__(self, app, jobs):
+        self.app = app
+        self.jobs = {job.name: job for job in jobs}
+        for job in jobs:
+            CronSchedule(job.schedule)  # fail at startup on a bad schedule
+        self._registered_pid = None
+
+    def register_jobs(self):
+        # Once per process; a forked worker starts over
+        if self._registered_pid != os.getpid():
+            now = datetime.utcnow()
+            for job in self.jobs.values():
+                register(job, now)
+            self._registered_pid = os.getpid()
+
+    def run(self, name, force=False):
+        self.register_jobs()
+        return run_job(self.jobs[name], force)
+
+    def run_due(self):
+        """Run every due job this process can lease; returns how many ran."""
+        ran = 0
+        for name in self.jobs:
+            try:
+                if self.run(name) is not None:
+                    ran += 1
+            except Exception as e:
+                self.app.logger.error(f"Scheduled job {name} failed: {e}")
+        return ran
+
+
+scheduler = None
+worker = None
+
+
+def init_scheduler(app, jobs, poll_interval=30):
+    global scheduler, worker
+    scheduler = Scheduler(app, jobs)
+    worker = BackgroundWorker(app, scheduler.run_due, 'scheduler', poll_interval)
+    return worker
+
+
+def job_names():
+    return sorted(scheduler.jobs) if scheduler is not None else []
+
+
+def run_now(name, force=True):
+    """Run a job in this process, due or not, unless another worker holds its lease."""
+    if scheduler is None or name not in scheduler.jobs:
+        raise KeyError(name)
+    return scheduler.run(name, force)
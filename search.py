@@ -0,0 +1,213 @@
+"""Full-text search over feedback, replies and events.
+
+On SQLite each source table has an FTS5 index (feedback_fts, reply_fts,
+event_fts) that stores no copy of the text: it reads it back from the source
+table, and triggers on that table keep it in step with every INSERT, UPDATE
+and DELETE. On Postgres the index is a GIN index over a to_tsvector()
+expression of the same columns, which Postgres maintains by itself.
+
+Ranking has to score every matching row, so a very common word would score a
+large part of the table. Only the newest CANDIDATES matches of each type are
+ranked, which bounds the work per search however many rows there are.
+
+Batch-altering feedback, reply or event on SQLite rebuilds the table and
+drops its triggers; run `flask rebuild-search-index` after such a migration.
+"""
+import html
+import re
+from collections import namedtuple
+
+from sqlalchemy import event, text
+
+from models import db
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 16
+CANDIDATES = 10000
+SNIPPET_TOKENS = 16
+# Control characters mark the matches in snippets, so the text around them
+# can be HTML-escaped before the markers become <mark> tags
+OPEN, CLOSE = '\x02', '\x03'
+
+# columns: indexed text columns; weights: their bm25 weights on SQLite (on
+# Postgres they are weighted A, B, ... in order); fields: extra columns
+# returned with every hit
+Source = namedtuple('Source', 'table columns weights fields')
+SOURCES = {
+    'feedback': Source('feedback', ('message',), (1.0,), {'userId': 'user_id'}),
+    'reply': Source('reply', ('message',), (1.0,), {'userId': 'user_id', 'feedbackId': 'feedback_id'}),
+    'event': Source('event', ('name', 'description'), (2.0, 1.0), {'name': 'name', 'date': 'date'}),
+}
+PG_WEIGHTS = ('A', 'B', 'C', 'D')
+
+
+class SearchError(ValueError):
+    """Raised when the search query string is malformed, or search is unavailable."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sqlite_ddl(source):
+    fts = f'{source.table}_fts'
+    columns = ', '.join(source.columns)
+    new = ', '.join(f'new.{column}' for column in source.columns)
+    old = ', '.join(f'old.{column}' for column in source.columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{source.table}', "
+        f"content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {source.table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {source.table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {source.table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+    ]
+
+
+def pg_vector(source, prefix=''):
+    """The tsvector expression the GIN index is built on; queries must repeat it exactly."""
+    if len(source.columns) == 1:
+        return f"to_tsvector('english', {prefix}{source.columns[0]})"
+    return ' || '.join(f"setweight(to_tsvector('english', coalesce({prefix}{column}, '')), '{weight}')"
+                       for column, weight in zip(source.columns, PG_WEIGHTS))
+
+
+def pg_ddl(source):
+    return [f"CREATE INDEX IF NOT EXISTS ix_{source.table}_search ON {source.table} "
+            f"USING gin (({pg_vector(source)}))"]
+
+
+def install_index(connection):
+    """Create any missing search index (and, on SQLite, its triggers)."""
+    dialect = connection.dialect.name
+    for source in SOURCES.values():
+        if dialect == 'sqlite':
+            statements = sqlite_ddl(source)
+        elif dialect == 'postgresql':
+            statements = pg_ddl(source)
+        else:
+            return
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def rebuild_index(connection):
+    """Install the indexes and, on SQLite, reindex every row from the source tables."""
+    install_index(connection)
+    if connection.dialect.name == 'sqlite':
+        for source in SOURCES.values():
+            fts = f'{source.table}_fts'
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def install_after_create_all(target, connection, **kw):
+    # db.create_all() (scratch and benchmark databases) gets the same
+    # indexes the migration creates
+    install_index(connection)
+
+
+def sqlite_query(source):
+    fts = f'{source.table}_fts'
+    weights = ', '.join(str(weight) for weight in source.weights)
+    fields = ''.join(f', {source.table}.{column} AS "{name}"' for name, column in source.fields.items())
+    return text(f"""
+        SELECT {source.table}.id AS id{fields}, -bm25({fts}, {weights}) AS score,
+               snippet({fts}, -1, :open, :close, '…', :tokens) AS snippet
+        FROM {fts} JOIN {source.table} ON {source.table}.id = {fts}.rowid
+        WHERE {fts} MATCH :query AND {fts}.rowid >= (
+            SELECT coalesce(min(rowid), 0) FROM (
+                SELECT rowid FROM {fts} WHERE {fts} MATCH :query ORDER BY rowid DESC LIMIT :candidates))
+        ORDER BY bm25({fts}, {weights})
+        LIMIT :limit
+    """)
+
+
+def pg_query(source):
+    # plainto_tsquery() of a constant is folded by the planner, so every
+    # WHERE below can use the GIN index
+    vector = pg_vector(source, source.table + '.')
+    document = " || ' ' || ".join(f"coalesce({source.table}.{column}, '')" for column in source.columns)
+    fields = ''.join(f', {source.table}.{column} AS "{name}"' for name, column in source.fields.items())
+    return text(f"""
+        SELECT {source.table}.id AS id{fields}, hits.score AS score,
+               ts_headline('english', {document}, plainto_tsquery('english', :query), :headline) AS snippet
+        FROM (
+            SELECT {source.table}.id AS id,
+                   ts_rank_cd({vector}, plainto_tsquery('english', :query), 32) AS score
+            FROM {source.table}
+            WHERE {vector} @@ plainto_tsquery('english', :query) AND {source.table}.id >= (
+                SELECT coalesce(min(id), 0) FROM (
+                    SELECT {source.table}.id AS id FROM {source.table}
+                    WHERE {vector} @@ plainto_tsquery('english', :query)
+                    ORDER BY {source.table}.id DESC LIMIT :candidates) AS candidates)
+            ORDER BY score DESC
+            LIMIT :limit
+        ) AS hits JOIN {source.table} ON {source.table}.id = hits.id
+        ORDER BY hits.score DESC
+    """)
+
+
+def parse_terms(q):
+    terms = re.findall(r'\w+', q or '')
+    if not terms:
+        raise SearchError("'q' must contain at least one word")
+    if len(terms) > MAX_TERMS:
+        raise SearchError(f"'q' may contain at most {MAX_TERMS} words")
+    return terms
+
+
+def parse_types(types):
+    if not types:
+        return list(SOURCES)
+    names = [name.strip() for name in types.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SOURCES]
+    if unknown:
+        raise SearchError(f"Unknown type '{unknown[0]}'; expected one of {', '.join(SOURCES)}")
+    return names
+
+
+def format_snippet(snippet):
+    return html.escape(snippet or '').replace(OPEN, '<mark>').replace(CLOSE, '</mark>')
+
+
+def search(q, types=None, limit=DEFAULT_LIMIT):
+    """Return the best `limit` hits for q across the requested types.
+
+    Every word in q must match (stemmed, case- and accent-insensitive).
+    Each hit is {'type', 'id', 'score', 'snippet', ...the source's fields};
+    higher scores rank higher, and snippets are HTML with the matches
+    wrapped in <mark>.
+    """
+    terms = parse_terms(q)
+    names = parse_types(types)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise SearchError(f"'limit' must be between 1 and {MAX_LIMIT}")
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        build = sqlite_query
+        params = {'query': ' '.join('"%s"' % term.replace('"', '""') for term in terms),
+                  'open': OPEN, 'close': CLOSE, 'tokens': SNIPPET_TOKENS}
+    elif dialect == 'postgresql':
+        build = pg_query
+        params = {'query': ' '.join(terms),
+                  'headline': f'StartSel={OPEN}, StopSel={CLOSE}, MaxWords={SNIPPET_TOKENS}, MinWords=5'}
+    else:
+        raise SearchError(f"Full-text search is not available on {dialect}", status=501)
+
+    hits = []
+    for name in names:
+        rows = db.session.execute(build(SOURCES[name]), dict(params, candidates=CANDIDATES, limit=limit))
+        for row in rows.mappings():
+            hit = {'type': name, **row}
+            hit['snippet'] = format_snippet(hit['snippet'])
+            if hasattr(hit.get('date'), 'isoformat'):
+                hit['date'] = hit['date'].isoformat()
+            hits.append(hit)
+    hits.sort(key=lambda hit: hit['score'], reverse=True)
+    return hits[:limit]
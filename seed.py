@@ -1,5 +1,5 @@
-from app import app, db
-from models import Event
+from wsgi import app
+from models import db, Event
 from datetime import datetime
 
 # Create a Flask application context
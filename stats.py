@@ -0,0 +1,61 @@
+from models import db, Stat, User, Donation, Event, ArchivedEvent, Member
+
+STAT_NAMES = ('users', 'donations', 'campaigns', 'members')
+
+
+def compute_stats():
+    """Recompute every counter from the source tables (full scans)."""
+    return {
+        'users': User.query.count(),
+        'donations': db.session.query(db.func.sum(Donation.amount)).scalar() or 0,
+        'campaigns': Event.query.count() + ArchivedEvent.query.count(),
+        'members': Member.query.count(),
+    }
+
+
+def increment_stat(name, delta=1):
+    """Adjust a counter inside the caller's transaction.
+
+    The UPDATE is atomic (value = value + delta), so concurrent writers never
+    lose increments, and it commits or rolls back together with the row it
+    counts. Call it after the new row has been added to the session.
+    """
+    result = db.session.execute(
+        db.update(Stat).where(Stat.name == name).values(value=Stat.value + delta),
+        execution_options={'synchronize_session': False}
+    )
+    if result.rowcount == 0:
+        # Counter not initialized yet: seed it from the table, which already
+        # includes the pending row thanks to autoflush.
+        value = compute_stats()[name] if name in STAT_NAMES else delta
+        db.session.add(Stat(name=name, value=value))
+
+
+def read_stats():
+    """Return all counters with a single primary-key lookup."""
+    rows = Stat.query.filter(Stat.name.in_(STAT_NAMES)).all()
+    stats = {row.name: row.value for row in rows}
+    if len(stats) < len(STAT_NAMES):
+        stats = reconcile_stats()[0]
+    return stats
+
+
+def reconcile_stats():
+    """Rewrite the counters from a full recount and commit.
+
+    Returns the recomputed values and a {name: (stored, actual)} dict of
+    every counter that had drifted.
+    """
+    actual = compute_stats()
+    stored = {row.name: row for row in Stat.query.filter(Stat.name.in_(STAT_NAMES)).all()}
+    drift = {}
+    for name, value in actual.items():
+        row = stored.get(name)
+        if row is None:
+            drift[name] = (None, value)
+            db.session.add(Stat(name=name, value=value))
+        elif row.value != value:
+            drift[name] = (row.value, value)
+            row.value = value
+    db.session.commit()
+    return actual, drift
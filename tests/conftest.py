@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queryplan import scratch_app  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    """The app on a freshly migrated temporary SQLite database."""
+    with scratch_app() as app:
+        yield app
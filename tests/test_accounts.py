@@ -0,0 +1,55 @@
+import time
+
+from accounts import ACCOUNTS_VERSION, accounts_version, create_token, status_cache
+from models import db, Admin, User
+from stats import increment_stat
+
+
+def make_user():
+    user = User(username='member', email='member@example.com', password='x')
+    db.session.add(user)
+    db.session.commit()
+    return user, {'Authorization': f"Bearer {create_token('user', user)}"}
+
+
+def test_warm_account_check_runs_no_query(app):
+    user, headers = make_user()
+    client = app.test_client()
+    assert client.get('/api/donations', headers=headers).status_code == 200
+    reads, hits = accounts_version.reads, status_cache.hits
+
+    for _ in range(5):
+        assert client.get('/api/donations', headers=headers).status_code == 200
+    assert accounts_version.reads == reads
+    assert status_cache.hits == hits + 5
+
+
+def test_deactivation_in_another_worker_takes_effect_within_the_recheck(app):
+    accounts_version.interval = 0.2
+    user, headers = make_user()
+    client = app.test_client()
+    assert client.get('/api/donations', headers=headers).status_code == 200
+    assert status_cache.get(('user', user.id)) is not None
+
+    # What another worker's toggle_user_status commits; this process's
+    # cache entry and polled version are left in place
+    db.session.execute(db.update(User).where(User.id == user.id).values(isActive=False))
+    increment_stat(ACCOUNTS_VERSION)
+    db.session.commit()
+
+    time.sleep(accounts_version.interval)
+    assert client.get('/api/donations', headers=headers).status_code == 403
+
+
+def test_deactivation_in_this_worker_takes_effect_at_once(app):
+    user, headers = make_user()
+    admin = Admin(email='admin@example.com', password='x')
+    db.session.add(admin)
+    db.session.commit()
+    admin_headers = {'Authorization': f"Bearer {create_token('admin', admin)}"}
+    client = app.test_client()
+    assert client.get('/api/donations', headers=headers).status_code == 200
+
+    response = client.put(f'/api/admin/users/{user.id}/status', json={'isActive': False}, headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get('/api/donations', headers=headers).status_code == 403
@@ -0,0 +1,31 @@
+import io
+from datetime import date, datetime, timedelta
+
+from accounts import create_token
+from archive import due_events
+from bulk_import import import_stream
+from models import db, Admin, Event
+
+
+def test_imported_completed_events_are_archivable(app):
+    lines = io.StringIO('{"name": "past", "date": "2024-01-01", "location": "Nairobi", "completed": true}\n'
+                        '{"name": "next", "date": "2030-01-01", "location": "Nairobi"}\n')
+    assert list(import_stream('events', lines, 'ndjson'))[-1] == {'imported': 2, 'failed': 0}
+
+    past, upcoming = Event.query.order_by(Event.id).all()
+    assert past.completed_at is not None
+    assert upcoming.completed_at is None
+    assert due_events(datetime.utcnow() + timedelta(seconds=1), 10) == [past.id]
+
+
+def test_completing_backfills_completed_at(app):
+    event = Event(name='past', date=date(2024, 1, 1), location='Nairobi', completed=True)
+    admin = Admin(email='archive-test@example.com', password='x')
+    db.session.add_all([event, admin])
+    db.session.commit()
+
+    response = app.test_client().patch(f'/api/admin/events/{event.id}/complete',
+                                       headers={'Authorization': f"Bearer {create_token('admin', admin)}"})
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Event, event.id).completed_at is not None
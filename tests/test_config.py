@@ -0,0 +1,28 @@
+import os
+
+import passwords
+from app import create_app
+from config import Config
+from models import db
+
+
+def test_create_app_takes_pool_and_hashing_settings_from_config(tmp_path, monkeypatch):
+    # Hashing settings are per process; put the defaults back afterwards
+    for name in ('HASH_METHOD', 'POOL_SIZE', 'MAX_PENDING', '_pool', '_pending', '_method_prefix'):
+        monkeypatch.setattr(passwords, name, getattr(passwords, name))
+
+    class Custom(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp_path, 'custom.db')}"
+        REPLICA_DATABASE_URI = None
+        OUTBOX_WORKER = STRIPE_EVENT_WORKER = SCHEDULER_WORKER = False
+        DB_POOL_SIZE = 3
+        DB_SQLITE_BUSY_TIMEOUT = 1234
+        PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+    app = create_app(Custom)
+    with app.app_context():
+        assert db.engine.pool.size() == 3
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 1234
+        db.engine.dispose()
+    assert passwords.hash_password('secret').startswith('pbkdf2:sha256:1000$')
@@ -0,0 +1,30 @@
+import os
+
+from app import create_app
+from config import Config
+from database import REPLICA_BIND, pool_status
+from models import db
+
+
+def test_pool_wait_stats_are_kept_per_bind(tmp_path):
+    class Custom(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp_path, 'primary.db')}"
+        REPLICA_DATABASE_URI = f"sqlite:///{os.path.join(tmp_path, 'replica.db')}"
+        OUTBOX_WORKER = STRIPE_EVENT_WORKER = SCHEDULER_WORKER = False
+
+    app = create_app(Custom)
+    with app.app_context():
+        primary, replica = db.engine, db.engines[REPLICA_BIND]
+        before = pool_status(primary)['wait']['checkouts'], pool_status(replica)['wait']['checkouts']
+        for _ in range(3):
+            with primary.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+        with replica.connect() as connection:
+            connection.exec_driver_sql('SELECT 1')
+
+        assert pool_status(primary)['wait']['checkouts'] == before[0] + 3
+        assert pool_status(replica)['wait']['checkouts'] == before[1] + 1
+        primary.dispose()
+        replica.dispose()
+        # Disposing replaces the pool but keeps its totals
+        assert pool_status(primary)['wait']['checkouts'] == before[0] + 3
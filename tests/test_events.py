@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from accounts import create_token
+from jobs import complete_past_events
+from models import db, Admin, ArchivedEvent, Event
+
+
+def test_upcoming_and_auto_completion_agree_on_today(app):
+    today = datetime.utcnow().date()
+    db.session.add_all([Event(name=name, date=today + timedelta(days=offset), location='Nairobi')
+                        for name, offset in (('yesterday', -1), ('today', 0), ('tomorrow', 1))])
+    db.session.commit()
+
+    assert complete_past_events(100, None)[0] == 1
+    db.session.commit()
+
+    upcoming = app.test_client().get('/api/events?upcoming=true').get_json()
+    assert [event['name'] for event in upcoming] == ['today', 'tomorrow']
+
+
+def test_undated_events_are_listed_last(app):
+    db.session.add_all([Event(name='undated one', date=None, location='Nairobi'),
+                        Event(name='dated', date=datetime(2030, 1, 1).date(), location='Nairobi'),
+                        Event(name='undated two', date=None, location='Nairobi')])
+    db.session.commit()
+    client = app.test_client()
+
+    for sort in ('date', '-date'):
+        names, after = [], ''
+        while True:
+            response = client.get(f'/api/events?sort={sort}&limit=1&after={after}')
+            assert response.status_code == 200
+            names += [event['name'] for event in response.get_json()]
+            after = response.headers.get('X-Next-Cursor')
+            if not after:
+                break
+        assert names == ['dated', 'undated one', 'undated two'] if sort == 'date' else \
+            ['dated', 'undated two', 'undated one']
+
+    # The admin list merges in the archive and must keep the same order
+    admin = Admin(email='events-test@example.com', password='x')
+    db.session.add_all([admin, ArchivedEvent(id=100, name='archived undated', date=None, location='Nairobi')])
+    db.session.commit()
+    headers = {'Authorization': f"Bearer {create_token('admin', admin)}"}
+    events = client.get('/api/admin/events?sort=-date', headers=headers).get_json()
+    assert [event['name'] for event in events] == ['dated', 'archived undated', 'undated two', 'undated one']
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from accounts import create_token
+from models import db, Admin, Donation, User
+
+
+def admin_headers():
+    admin = Admin(email='export-test@example.com', password='x')
+    db.session.add(admin)
+    db.session.commit()
+    return {'Authorization': f"Bearer {create_token('admin', admin)}"}
+
+
+def test_donations_export_by_date_range(app):
+    user = User(username='donor', email='donor@example.com', password='x')
+    db.session.add(user)
+    db.session.flush()
+    for day in (1, 2, 3):
+        db.session.add(Donation(amount=day, payment_intent_id=f'pi_{day}', user_id=user.id,
+                                created_at=datetime(2024, 5, day, 23, 30)))
+    db.session.add(Donation(amount=4, payment_intent_id='pi_undated', user_id=user.id, created_at=None))
+    db.session.commit()
+    headers = admin_headers()
+
+    response = app.test_client().get('/api/admin/export/donations?format=ndjson&from=2024-05-02&to=2024-05-02',
+                                     headers=headers)
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).splitlines() == [
+        '{"id": 2, "amount": 2, "message": null, "paymentIntentId": "pi_2", "userId": 1, '
+        '"email": "donor@example.com", "createdAt": "2024-05-02T23:30:00"}'
+    ]
+
+    response = app.test_client().get('/api/admin/export/donations?format=csv', headers=headers)
+    assert len(response.get_data(as_text=True).splitlines()) == 5
+
+
+def test_bad_date_ranges_are_rejected(app):
+    headers = admin_headers()
+    client = app.test_client()
+    assert client.get('/api/admin/export/users?from=2020-01-01', headers=headers).status_code == 400
+    assert client.get('/api/admin/export/donations?to=May', headers=headers).status_code == 400
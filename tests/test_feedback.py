@@ -0,0 +1,51 @@
+from sqlalchemy import event
+
+from accounts import create_token
+from models import db, Admin, Feedback, Reply, User
+
+
+def add_feedback(count, start):
+    for i in range(start, start + count):
+        user = User(username=f'feedback{i}', email=f'feedback{i}@example.com', password='x')
+        db.session.add(user)
+        db.session.flush()
+        feedback = Feedback(user_id=user.id, message=f'feedback {i}')
+        db.session.add(feedback)
+        db.session.flush()
+        db.session.add_all([Reply(user_id=user.id, feedback_id=feedback.id, message=f'reply {i}'),
+                            Reply(user_id=user.id, feedback_id=feedback.id, message=f'second reply {i}')])
+    db.session.commit()
+
+
+def count_statements(client, headers):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get('/api/admin/feedback?limit=100', headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements), response.get_json()['feedback']
+
+
+def test_feedback_statement_count_does_not_grow_with_rows(app):
+    admin = Admin(email='feedback-test@example.com', password='x')
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f"Bearer {create_token('admin', admin)}"}
+    client = app.test_client()
+    client.get('/api/admin/feedback', headers=headers)  # caches the admin's account status
+
+    add_feedback(3, 0)
+    few, feedback = count_statements(client, headers)
+    assert len(feedback) == 3
+
+    add_feedback(37, 3)
+    many, feedback = count_statements(client, headers)
+    assert len(feedback) == 40
+    assert all(len(item['replies']) == 2 and item['username'] != 'Unknown' for item in feedback)
+    assert many == few
@@ -0,0 +1,50 @@
+import collections
+import random
+import threading
+
+from accounts import create_token
+from models import db, Admin, Inventory
+
+START = 50
+
+
+def test_concurrent_adjustments_lose_no_update(app):
+    admin = Admin(email='inventory-test@example.com', password='x')
+    items = [Inventory(item_name=f'item {i}', quantity=START) for i in range(4)]
+    db.session.add(admin)
+    db.session.add_all(items)
+    db.session.commit()
+    item_ids = [item.id for item in items]
+    headers = {'Authorization': f"Bearer {create_token('admin', admin)}"}
+
+    applied = collections.Counter()
+    statuses = collections.Counter()
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = random.Random(seed)
+        test_client = app.test_client()
+        for _ in range(25):
+            # Overlapping batches on a few items, some of them overdrawing
+            batch = [{'id': item_id, 'delta': rng.randint(-15, 10)}
+                     for item_id in rng.sample(item_ids, rng.randint(1, len(item_ids)))]
+            response = test_client.post('/api/admin/inventory/adjustments', json={'adjustments': batch},
+                                        headers=headers)
+            with lock:
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    for adjustment in batch:
+                        applied[adjustment['id']] += adjustment['delta']
+
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(statuses) <= {200, 409}, statuses
+    assert statuses[200] and statuses[409]
+    db.session.expire_all()
+    final = dict(db.session.query(Inventory.id, Inventory.quantity).all())
+    assert final == {item_id: START + applied[item_id] for item_id in item_ids}
+    assert min(final.values()) >= 0
@@ -0,0 +1,25 @@
+import pytest
+
+from models import db
+from queryplan import audit
+
+
+def test_routes_use_indexes(app):
+    regressions, checked, undriven = audit(app)
+    assert checked > 0
+    assert regressions == {}
+    assert undriven == []
+
+
+@pytest.mark.parametrize('index, table', [
+    ('ix_feedback_user_id_id', 'feedback'),
+    ('ix_user_isActive_id', 'user'),
+    ('ix_donation_created_at_id', 'donation'),
+])
+def test_missing_index_is_reported(app, index, table):
+    # A filtered lookup with a LIMIT must still be caught once its index is gone
+    db.session.execute(db.text(f'DROP INDEX "{index}"'))
+    db.session.commit()
+
+    regressions, _, _ = audit(app)
+    assert any(scan.startswith(f'SCAN {table}') for scans in regressions.values() for scan in scans)
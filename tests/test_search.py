@@ -0,0 +1,14 @@
+from accounts import create_token
+from models import db, Admin
+
+
+def test_search_on_unsupported_database_is_501(app, monkeypatch):
+    admin = Admin(email='search-test@example.com', password='x')
+    db.session.add(admin)
+    db.session.commit()
+    monkeypatch.setattr(db.engine.dialect, 'name', 'mysql')
+
+    response = app.test_client().get('/api/admin/search?q=food',
+                                     headers={'Authorization': f"Bearer {create_token('admin', admin)}"})
+    assert response.status_code == 501
+    assert response.get_json() == {"error": "Full-text search is not available on mysql"}
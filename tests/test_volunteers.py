@@ -0,0 +1,56 @@
+import collections
+import random
+import threading
+from datetime import datetime, timedelta
+
+from accounts import create_token
+from models import db, Event, User, Volunteer
+
+CAPACITY = 5
+
+
+def test_concurrent_sign_ups_never_overbook(app):
+    event = Event(name='Food drive', date=datetime.utcnow().date() + timedelta(days=7), location='Nairobi',
+                  capacity=CAPACITY)
+    users = [User(username=f'rush{i}', email=f'rush{i}@example.com', password='x') for i in range(40)]
+    db.session.add(event)
+    db.session.add_all(users)
+    db.session.commit()
+    event_id = event.id
+    tokens = [create_token('user', user) for user in users]
+    url = f'/api/events/{event_id}/volunteers'
+
+    statuses = collections.Counter()
+    lock = threading.Lock()
+
+    def volunteer(chunk):
+        client = app.test_client()
+        for i in chunk:
+            rng = random.Random(i)
+            headers = {'Authorization': f'Bearer {tokens[i]}'}
+            calls = [('POST', 201)]
+            if rng.random() < 0.2:
+                calls.append(('POST', 409))
+            if rng.random() < 0.3:
+                calls.append(('DELETE', 200))
+            for method, expected in calls:
+                response = client.open(url, method=method, headers=headers)
+                with lock:
+                    statuses[(method, response.status_code, response.status_code == expected)] += 1
+
+    threads = [threading.Thread(target=volunteer, args=(range(start, len(users), 8),)) for start in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(expected for _, _, expected in statuses), statuses
+    db.session.expire_all()
+    event = db.session.get(Event, event_id)
+    counts = dict(db.session.query(Volunteer.status, db.func.count(Volunteer.id))
+                  .filter(Volunteer.event_id == event_id).group_by(Volunteer.status).all())
+    confirmed, waitlisted = counts.get('confirmed', 0), counts.get('waitlisted', 0)
+    assert confirmed <= CAPACITY
+    assert event.seats_taken == confirmed
+    # Every seat a cancellation freed went to someone on the waitlist
+    assert not (waitlisted and confirmed < CAPACITY)
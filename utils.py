@@ -1,14 +1,14 @@
 import random
 import string
-from flask_mail import Message
-from extensions import mail  # Corrected import statement
+from models import db
+from outbox import enqueue_email, wake_sender
 
 def generate_verification_code(length=6):
     """Generate a random verification code."""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
 def send_verification_email(to, code):
-    """Send a verification email."""
-    msg = Message('Verify your email', recipients=[to])
-    msg.body = f'Your verification code is: {code}'
-    mail.send(msg)
+    """Queue a verification email for the background sender."""
+    enqueue_email(to, 'Verify your email', f'Your verification code is: {code}')
+    db.session.commit()
+    wake_sender()
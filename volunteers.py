@@ -0,0 +1,187 @@
+"""Volunteer sign-up with per-event capacity and a first-come waitlist.
+
+Event.seats_taken counts confirmed volunteers and only changes through
+conditional UPDATEs such as
+
+    UPDATE event SET seats_taken = seats_taken + 1
+    WHERE id = :id AND (capacity IS NULL OR seats_taken < capacity)
+
+so however many sign-ups race for the last seat, the database lets exactly
+one of them through. Each sign-up then inserts its Volunteer row, confirmed
+or waitlisted, in the same transaction; the unique (event_id, user_id)
+index turns a double sign-up into a rollback, which also hands the seat
+back.
+
+A seat freed by a cancellation, or added by raising the capacity, goes to
+the oldest waitlisted volunteer (fill_seats), who is emailed through the
+outbox. A sign-up that finds the event full locks the event row before
+joining the waitlist, and a cancellation releases its seat (locking the
+same row) before looking at the waitlist, so one always sees the other:
+no seat stays empty while someone waits for it.
+"""
+from database import insert_ignore
+from models import db, Event, User, Volunteer
+from outbox import enqueue_email
+
+CONFIRMED = 'confirmed'
+WAITLISTED = 'waitlisted'
+
+
+class SignupError(ValueError):
+    """Raised when a sign-up or cancellation can't be made."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def claim_seat(event_id):
+    """Take a seat if the event has one free; True if it did."""
+    result = db.session.execute(
+        db.update(Event)
+        .where(Event.id == event_id,
+               Event.completed.isnot(True),
+               db.or_(Event.capacity.is_(None), Event.seats_taken < Event.capacity))
+        .values(seats_taken=Event.seats_taken + 1),
+        execution_options={'synchronize_session': False}
+    )
+    return result.rowcount == 1
+
+
+def release_seat(event_id):
+    db.session.execute(
+        db.update(Event)
+        .where(Event.id == event_id, Event.seats_taken > 0)
+        .values(seats_taken=Event.seats_taken - 1),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def insert_volunteer(event_id, user_id, status):
+    """Insert the sign-up unless the user already has one; True if inserted."""
+    values = {'event_id': event_id, 'user_id': user_id, 'status': status}
+    return insert_ignore(db.session, Volunteer, values, ['event_id', 'user_id'])
+
+
+def waitlist_position(event_id, user_id):
+    """1 for the next volunteer to be promoted; None if not waitlisted."""
+    own_id = db.session.query(Volunteer.id) \
+        .filter(Volunteer.event_id == event_id, Volunteer.user_id == user_id, Volunteer.status == WAITLISTED) \
+        .scalar()
+    if own_id is None:
+        return None
+    return db.session.query(db.func.count(Volunteer.id)) \
+        .filter(Volunteer.event_id == event_id, Volunteer.status == WAITLISTED, Volunteer.id <= own_id) \
+        .scalar()
+
+
+def sign_up(event_id, user_id):
+    """Sign user_id up for event_id in the caller's transaction.
+
+    Returns CONFIRMED or WAITLISTED. Raises SignupError after a seat may
+    already have been taken, so the caller must roll back.
+    """
+    if claim_seat(event_id):
+        status = CONFIRMED
+    else:
+        # Full, finished or missing. Lock the row so a cancellation in
+        # flight either finishes first (and the retry below gets its seat)
+        # or waits and then promotes us from the waitlist
+        event = db.session.query(Event.completed).filter(Event.id == event_id).with_for_update().first()
+        if event is None:
+            raise SignupError("Event not found", 404)
+        if event.completed:
+            raise SignupError("Event is already completed")
+        status = CONFIRMED if claim_seat(event_id) else WAITLISTED
+
+    if not insert_volunteer(event_id, user_id, status):
+        raise SignupError("Already signed up for this event", 409)
+    return status
+
+
+def fill_seats(event_id):
+    """Promote waitlisted volunteers, oldest first, while seats are free.
+
+    Queues an email to each one and returns how many were promoted.
+    """
+    promoted = 0
+    event = None
+    while True:
+        candidate = db.session.query(Volunteer.id, User.email) \
+            .join(User, User.id == Volunteer.user_id) \
+            .filter(Volunteer.event_id == event_id, Volunteer.status == WAITLISTED) \
+            .order_by(Volunteer.id).first()
+        if candidate is None or not claim_seat(event_id):
+            return promoted
+
+        result = db.session.execute(
+            db.update(Volunteer)
+            .where(Volunteer.id == candidate.id, Volunteer.status == WAITLISTED)
+            .values(status=CONFIRMED),
+            execution_options={'synchronize_session': False}
+        )
+        if result.rowcount == 0:
+            # They cancelled in the meantime; offer the seat to the next one
+            release_seat(event_id)
+            continue
+
+        promoted += 1
+        event = event or db.session.query(Event.name, Event.date).filter(Event.id == event_id).one()
+        when = f" on {event.date.isoformat()}" if event.date else ""
+        enqueue_email(candidate.email, f"You're volunteering at {event.name}",
+                      f"A spot opened up at {event.name}{when} and it's yours: "
+                      f"you have moved off the waitlist and are now confirmed as a volunteer.")
+
+
+def cancel(event_id, user_id):
+    """Withdraw user_id from event_id in the caller's transaction.
+
+    Returns the number of waitlisted volunteers promoted into the freed seat.
+    """
+    # Two passes: a concurrent promotion can flip the row from waitlisted
+    # to confirmed between the two DELETEs
+    for _ in range(2):
+        for status in (CONFIRMED, WAITLISTED):
+            deleted = db.session.execute(
+                db.delete(Volunteer).where(Volunteer.event_id == event_id,
+                                           Volunteer.user_id == user_id,
+                                           Volunteer.status == status),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            if deleted and status == CONFIRMED:
+                release_seat(event_id)
+                return fill_seats(event_id)
+            if deleted:
+                return 0
+    raise SignupError("Not signed up for this event", 404)
+
+
+def set_capacity(event_id, capacity):
+    """Change an event's capacity (None for no limit) and fill any new seats.
+
+    Lowering it below the seats already taken cancels nobody; new sign-ups
+    are waitlisted until enough volunteers withdraw. Returns the number of
+    waitlisted volunteers promoted.
+    """
+    updated = db.session.execute(
+        db.update(Event).where(Event.id == event_id).values(capacity=capacity),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    if not updated:
+        raise SignupError("Event not found", 404)
+    return fill_seats(event_id)
+
+
+def seats(event_id):
+    """Capacity, seats taken and remaining, and waitlist length for an event."""
+    event = db.session.query(Event.capacity, Event.seats_taken).filter(Event.id == event_id).first()
+    if event is None:
+        raise SignupError("Event not found", 404)
+    waitlisted = db.session.query(db.func.count(Volunteer.id)) \
+        .filter(Volunteer.event_id == event_id, Volunteer.status == WAITLISTED).scalar()
+    return {
+        'capacity': event.capacity,
+        'seatsTaken': event.seats_taken,
+        'seatsRemaining': None if event.capacity is None else max(event.capacity - event.seats_taken, 0),
+        'waitlisted': waitlisted,
+    }
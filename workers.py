@@ -0,0 +1,50 @@
+import os
+import threading
+
+
+class BackgroundWorker:
+    """Daemon thread that repeatedly calls drain() inside an app context.
+
+    drain() should process one batch and return how many items it handled;
+    the thread keeps calling it until it returns 0, then sleeps until
+    wake() or the poll interval. The thread is started lazily in each
+    worker process (on its first request or wake()), which keeps it out of
+    the gunicorn master when the app is preloaded.
+    """
+
+    def __init__(self, app, drain, name, poll_interval=10):
+        self.app = app
+        self.drain = drain
+        self.name = name
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _running(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._running():
+            return
+        with self._lock:
+            if not self._running():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    while self.drain():
+                        pass
+            except Exception as e:
+                self.app.logger.error(f"{self.name} error: {e}")
+            self._wakeup.wait(self.poll_interval)
@@ -1,4 +1,6 @@
-from app import app  # Import the Flask app instance from your app module
+from app import create_app
+
+app = create_app()
 
 if __name__ == "__main__":
-    app.run()
+    app.run(debug=True)